@@ -0,0 +1,87 @@
+#!/usr/bin/python3
+#  File: audit.py
+#  Description: Headless batch password strength audit, without the GUI
+#  Author: Christopher Hindson
+#  Date: 18/10/2026
+
+# Imports
+import argparse
+import csv
+import json
+import sys
+from engine.batch_scoring import CHUNK_SIZE, score_stream
+
+# CONSTANTS
+FIELDS = ('line', 'strength_id', 'strength_desc', 'expiry_days')
+
+
+# Globals
+
+# Main processing
+def read_candidates(stream):
+    """
+    Read one password candidate per line, keeping any whitespace other than the line ending
+    :param stream: text file or stdin
+    :return: generator of password candidates
+    """
+    for line in stream:
+        yield line.rstrip('\r\n')
+
+
+def write_results(results, output, output_format, include_password):
+    """
+    Write each scored candidate as JSON lines or CSV
+    :param results: iterable of (password, strength) as returned by score_stream
+    :param output: text file or stdout
+    :param output_format: 'jsonl' or 'csv'
+    :param include_password: If True include the plain text candidate in the output
+    :return: number of candidates written
+    """
+    fields = FIELDS + ('password',) if include_password else FIELDS
+    writer = None
+    if output_format == 'csv':
+        writer = csv.writer(output)
+        writer.writerow(fields)
+    count = 0
+    for count, (password, strength) in enumerate(results, start=1):
+        row = (count, strength['id'], strength['strength_desc'], strength['expiry_days'])
+        if include_password:
+            row += (password,)
+        if writer is not None:
+            writer.writerow(row)
+        else:
+            output.write(json.dumps(dict(zip(fields, row))) + '\n')
+    return count
+
+
+def main():
+    """
+    Score password candidates from a file or stdin using all cores
+    :return:
+    """
+    parser = argparse.ArgumentParser(description='Score password candidates, one per line, with criteria_check')
+    parser.add_argument('input', nargs='?', default='-', help='file of password candidates, - for stdin')
+    parser.add_argument('-o', '--output', default='-', help='results file, - for stdout')
+    parser.add_argument('-f', '--format', choices=('jsonl', 'csv'), default='jsonl')
+    parser.add_argument('-w', '--workers', type=int, default=None, help='worker processes, defaults to all cores')
+    parser.add_argument('-c', '--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--numpy', action='store_true', help='score with the vectorised NumPy engine')
+    parser.add_argument('--include-password', action='store_true', help='include the candidate in the results')
+    args = parser.parse_args()
+
+    source = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8', errors='replace')
+    output = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8', newline='')
+    try:
+        results = score_stream(read_candidates(source), workers=args.workers, chunk_size=args.chunk_size,
+                               vectorized=args.numpy)
+        count = write_results(results, output, args.format, args.include_password)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+    print(f'{count} candidates scored', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/python3
+#  File: bench_async_db.py
+#  Description: Database calls from asyncio clients, async_db against the sync layer called in the event loop or on
+#  a thread pool, by concurrent client count
+#  Author: Christopher Hindson
+#  Date: 18/10/2026
+
+# Imports
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from engine import async_db
+from engine.db_access import HISTORY_DAYS, HISTORY_DEPTH, POOL_SIZE
+from engine.storage import SQLiteStorage, configure_storage, get_storage
+from benchmarks.bench_credential_history import build_database
+
+# CONSTANTS
+USER_COUNT = 20000
+HISTORY_PER_USER = 10
+REQUESTS = 4000
+CONCURRENCY = (1, 16, 128)
+EXECUTOR_WORKERS = 16  # As service.py
+HEARTBEAT = 0.001  # Seconds between event loop responsiveness checks
+
+
+# Main processing
+def workload(user_count, requests, seed):
+    """
+    Half username checks (a third of them names not in use), half password history reads
+    :return: list of (Storage method, args)
+    """
+    rng = random.Random(seed)
+    since = datetime.now() - timedelta(days=HISTORY_DAYS)
+    calls = []
+    for _ in range(requests):
+        user = f'user_{rng.randint(1, user_count * 3 // 2)}'
+        if rng.random() < 0.5:
+            calls.append(('check_username', (user,)))
+        else:
+            calls.append(('credential_history', (user, since, HISTORY_DEPTH)))
+    return calls
+
+
+def sync_in_loop(executor):
+    async def call(method, args):
+        return getattr(get_storage(), method)(*args)
+    return call
+
+
+def sync_executor(executor):
+    async def call(method, args):
+        return await asyncio.get_running_loop().run_in_executor(executor, getattr(get_storage(), method), *args)
+    return call
+
+
+def async_layer(executor):
+    async def call(method, args):
+        return await async_db.submit(method, *args)
+    return call
+
+
+async def heartbeat(lags, stopped):
+    # Longest time the event loop was unable to run a ready task
+    while not stopped.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(HEARTBEAT)
+        lags.append(time.perf_counter() - start - HEARTBEAT)
+
+
+async def client(call, calls, latencies):
+    for method, args in calls:
+        start = time.perf_counter()
+        await call(method, args)
+        latencies.append(time.perf_counter() - start)
+
+
+async def run_load(call, calls, concurrency):
+    latencies = []
+    lags = []
+    stopped = asyncio.Event()
+    monitor = asyncio.create_task(heartbeat(lags, stopped))
+    start = time.perf_counter()
+    await asyncio.gather(*(client(call, calls[i::concurrency], latencies) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    stopped.set()
+    await monitor
+    latencies.sort()
+    return (len(calls) / elapsed, latencies[len(latencies) // 2] * 1e3,
+            latencies[min(len(latencies) - 1, len(latencies) * 99 // 100)] * 1e3, max(lags, default=0) * 1e3)
+
+
+def run(user_count, history_per_user, requests, concurrencies, seed, directory):
+    path = os.path.join(directory, 'async.sqlite')
+    build_database(path, user_count, history_per_user, seed)
+    # The pool is as large as the executor, so the thread pool is not held back waiting for connections
+    storage = configure_storage(SQLiteStorage(path, pool_size=max(POOL_SIZE, EXECUTOR_WORKERS)))
+    storage.apply_migrations()
+    calls = workload(user_count, requests, seed)
+    methods = (('sync in loop', sync_in_loop), ('sync executor', sync_executor), ('async_db', async_layer))
+
+    print(f'users: {user_count}, history rows: {user_count * history_per_user}, {requests} calls per run')
+    print(f'{"clients":>7} {"method":<14} {"calls/s":>9} {"p50 ms":>8} {"p99 ms":>8} {"loop lag ms":>12} '
+          f'{"db calls":>9}')
+    with ThreadPoolExecutor(max_workers=EXECUTOR_WORKERS) as executor:
+        for concurrency in concurrencies:
+            for label, method in methods:
+                thread = async_db.start_database_thread()
+                thread.calls = 0
+                throughput, p50, p99, lag = asyncio.run(run_load(method(executor), calls, concurrency))
+                db_calls = thread.calls if label == 'async_db' else len(calls)
+                print(f'{concurrency:>7} {label:<14} {throughput:>9.0f} {p50:>8.2f} {p99:>8.2f} {lag:>12.2f} '
+                      f'{db_calls:>9}')
+    async_db.stop_database_thread()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Async database layer concurrency benchmark')
+    parser.add_argument('--users', type=int, default=USER_COUNT)
+    parser.add_argument('--history', type=int, default=HISTORY_PER_USER)
+    parser.add_argument('--requests', type=int, default=REQUESTS)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=CONCURRENCY)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        run(args.users, args.history, args.requests, args.concurrency, args.seed, directory)
+
+
+if __name__ == '__main__':
+    main()
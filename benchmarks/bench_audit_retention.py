@@ -0,0 +1,85 @@
+#!/usr/bin/python3
+#  File: bench_audit_retention.py
+#  Description: Password history query latency and database size as user_cred_audit grows, before and after retention
+#  Author: Christopher Hindson
+#  Date: 18/10/2026
+
+# Imports
+import argparse
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta
+from time import perf_counter
+from engine import db_access
+from engine.audit_retention import purge_history, reclaim_space
+from benchmarks.bench_credential_history import build_database, time_lookups
+
+# CONSTANTS
+USER_COUNT = 5000
+HISTORY_SIZES = (20, 100, 200)  # Password changes per user, spread over the last two years
+LOOKUPS = 500
+
+
+# Main processing
+def history_latency(users, since):
+    with db_access.pooled_connection() as conn:
+        history_sql = db_access.credential_retrieval()
+        return time_lookups(conn, history_sql, [(user, since, db_access.HISTORY_DEPTH, user) for user in users])
+
+
+def history_rows(conn):
+    return conn.execute("SELECT count(*) FROM user_cred_audit;").fetchone()[0]
+
+
+def run(user_count, history_sizes, lookups, seed, directory):
+    rng = random.Random(seed)
+    since = datetime.now() - timedelta(days=db_access.HISTORY_DAYS)
+    users = [f'user_{rng.randint(1, user_count)}' for _ in range(lookups)]
+    print(f'{"rows":>9} {"MB":>7} {"query us":>9} | {"purge s":>8} {"vacuum s":>9} | '
+          f'{"rows":>7} {"MB":>7} {"query us":>9}')
+    for history_per_user in history_sizes:
+        path = os.path.join(directory, f'history_{history_per_user}.sqlite')
+        build_database(path, user_count, history_per_user, seed)
+        db_access.configure_pool(db_path=path)
+        db_access.apply_migrations()
+        with db_access.pooled_connection() as conn:
+            before_rows = history_rows(conn)
+            expected = {user: conn.execute(db_access.credential_retrieval(),
+                                           (user, since, db_access.HISTORY_DEPTH, user)).fetchall()
+                        for user in users[:50]}
+        before_size = os.path.getsize(path)
+        before = history_latency(users, since)
+
+        start = perf_counter()
+        purge_history(now=datetime.now())
+        purge_time = perf_counter() - start
+        start = perf_counter()
+        reclaim_space()
+        vacuum_time = perf_counter() - start
+        with db_access.pooled_connection() as conn:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+            after_rows = history_rows(conn)
+            # Retention must not change what the password history check sees
+            for user, history in expected.items():
+                assert conn.execute(db_access.credential_retrieval(),
+                                    (user, since, db_access.HISTORY_DEPTH, user)).fetchall() == history, user
+        after = history_latency(users, since)
+        print(f'{before_rows:>9} {before_size / 2 ** 20:>7.1f} {before:>9.1f} | {purge_time:>8.2f} '
+              f'{vacuum_time:>9.2f} | {after_rows:>7} {os.path.getsize(path) / 2 ** 20:>7.1f} {after:>9.1f}')
+        db_access.connection_pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Password history retention benchmark')
+    parser.add_argument('--users', type=int, default=USER_COUNT)
+    parser.add_argument('--history', type=int, nargs='+', default=HISTORY_SIZES, help='password changes per user')
+    parser.add_argument('--lookups', type=int, default=LOOKUPS)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        run(args.users, args.history, args.lookups, args.seed, directory)
+
+
+if __name__ == '__main__':
+    main()
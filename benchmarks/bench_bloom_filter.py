@@ -0,0 +1,86 @@
+#!/usr/bin/python3
+#  File: bench_bloom_filter.py
+#  Description: False positive rate, lookup time and resident memory of the breached password Bloom filter,
+#  against holding the same passwords in a Python set
+#  Author: Christopher Hindson
+#  Date: 18/10/2026
+
+# Imports
+import argparse
+import os
+import random
+import string
+import tempfile
+from time import perf_counter
+from engine.bloom_filter import DEFAULT_FP_RATE, BloomFilter, build_bloom_filter, filter_size
+
+# CONSTANTS
+ENTRIES = 1000000
+QUERIES = 200000
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+
+
+# Main processing
+def rss():
+    # Current resident set size in bytes
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * PAGE_SIZE
+
+
+def passwords(count, seed):
+    generator = random.Random(seed)
+    alphabet = string.ascii_lowercase + string.digits
+    for _ in range(count):
+        yield ''.join(generator.choices(alphabet, k=generator.randint(6, 14)))
+
+
+def run(entries, queries, fp_rate):
+    bits, hashes = filter_size(entries, fp_rate)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'breached.bloom')
+        start = perf_counter()
+        build_bloom_filter(passwords(entries, 1), path, entries, fp_rate)
+        build_seconds = perf_counter() - start
+        disk_bytes = os.path.getsize(path)
+
+        members = list(passwords(min(queries, entries), 1))
+        others = [password + '#' for password in passwords(queries, 2)]  # Never added, '#' is outside the alphabet
+        before_open = rss()
+        breach_filter = BloomFilter(path)
+        after_open = rss()
+        start = perf_counter()
+        found = sum(password in breach_filter for password in members)
+        member_seconds = perf_counter() - start
+        start = perf_counter()
+        false_positives = sum(password in breach_filter for password in others)
+        other_seconds = perf_counter() - start
+        after_lookups = rss()
+        breach_filter.close()
+
+    before_set = rss()
+    password_set = set(passwords(entries, 1))
+    set_bytes = rss() - before_set
+    del password_set
+
+    print(f'{entries} entries, {bits} bits ({disk_bytes} bytes on disk), {hashes} hashes, '
+          f'built in {build_seconds:.1f}s')
+    print(f'members found          {found}/{len(members)}')
+    print(f'false positive rate    {false_positives / len(others):.5f} (target {fp_rate})')
+    print(f'lookup, member         {member_seconds / len(members) * 1e6:.2f} us')
+    print(f'lookup, not present    {other_seconds / len(others) * 1e6:.2f} us')
+    print(f'RSS after open         {(after_open - before_open) / 2 ** 20:+.1f} MiB')
+    print(f'RSS after lookups      {(after_lookups - before_open) / 2 ** 20:+.1f} MiB (pages touched by lookups)')
+    print(f'RSS of a Python set    {set_bytes / 2 ** 20:+.1f} MiB')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Breached password Bloom filter benchmark')
+    parser.add_argument('--entries', type=int, default=ENTRIES)
+    parser.add_argument('--queries', type=int, default=QUERIES)
+    parser.add_argument('--fp-rate', type=float, default=DEFAULT_FP_RATE)
+    args = parser.parse_args()
+    run(args.entries, args.queries, args.fp_rate)
+
+
+if __name__ == '__main__':
+    main()
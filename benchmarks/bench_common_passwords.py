@@ -0,0 +1,82 @@
+#!/usr/bin/python3
+#  File: bench_common_passwords.py
+#  Description: Benchmark the common password matcher against the original linear substring scan
+#  Author: Christopher Hindson
+#  Date: 18/10/2026
+
+# Imports
+import argparse
+import random
+import string
+from timeit import timeit
+from engine.common_matcher import CommonPasswordMatcher
+
+# CONSTANTS
+LIST_SIZES = (1000, 100000, 1000000)
+CANDIDATE_COUNT = 200
+ALPHABET = string.ascii_lowercase + string.digits
+
+
+# Main processing
+def linear_check(password_input, password_list):
+    """
+    Original check_common_passwords loop, kept for comparison only
+    """
+    for common in password_list:
+        if password_input == common[1]:
+            return True, common[0]
+        elif common[1] in password_input:
+            return True, common[0] / 10
+    return False, 0.0
+
+
+def matcher_check(password_input, matcher):
+    """
+    Equivalent of linear_check using the compiled matcher
+    """
+    match = matcher.search(password_input)
+    if match is None:
+        return False, 0.0
+    if match[1] == len(password_input):
+        return True, match[0]
+    return True, match[0] / 10
+
+
+def random_word(rng, min_len, max_len):
+    return ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(min_len, max_len)))
+
+
+def run(sizes, candidate_count, seed):
+    rng = random.Random(seed)
+    candidates = [random_word(rng, 8, 20) for _ in range(candidate_count)]
+    print(f'{"entries":>10} {"build s":>10} {"linear us":>12} {"matcher us":>12} {"speedup":>8}')
+    for size in sizes:
+        password_list = [(i + 1, random_word(rng, 4, 10)) for i in range(size)]
+        # Seed some candidates with list entries so both exact and contains matches are exercised
+        checks = candidates + [password_list[rng.randrange(size)][1] for _ in range(candidate_count // 4)]
+        checks += ['x' + password_list[rng.randrange(size)][1] + '1' for _ in range(candidate_count // 4)]
+
+        build_time = timeit(lambda: CommonPasswordMatcher(password_list), number=1)
+        matcher = CommonPasswordMatcher(password_list)
+        for candidate in checks:
+            assert linear_check(candidate, password_list) == matcher_check(candidate, matcher), candidate
+
+        linear_time = timeit(lambda: [linear_check(c, password_list) for c in checks], number=1)
+        matcher_time = timeit(lambda: [matcher_check(c, matcher) for c in checks], number=5) / 5
+        per_linear = linear_time / len(checks) * 1e6
+        per_matcher = matcher_time / len(checks) * 1e6
+        print(f'{size:>10} {build_time:>10.2f} {per_linear:>12.1f} {per_matcher:>12.1f} '
+              f'{per_linear / per_matcher:>7.0f}x')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Common password matcher benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=LIST_SIZES)
+    parser.add_argument('--candidates', type=int, default=CANDIDATE_COUNT)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    run(args.sizes, args.candidates, args.seed)
+
+
+if __name__ == '__main__':
+    main()
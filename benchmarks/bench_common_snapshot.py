@@ -0,0 +1,71 @@
+#!/usr/bin/python3
+#  File: bench_common_snapshot.py
+#  Description: Startup and lookup cost of the common password snapshot against compiling the matcher on each launch
+#  Author: Christopher Hindson
+#  Date: 18/10/2026
+
+# Imports
+import argparse
+import os
+import random
+import string
+import tempfile
+from timeit import timeit
+from engine.common_matcher import CommonPasswordMatcher
+from engine.common_snapshot import load_snapshot, read_wordlist, wordlist_state
+
+# CONSTANTS
+LIST_SIZES = (1000, 100000, 1000000)
+CANDIDATE_COUNT = 2000
+ALPHABET = string.ascii_lowercase + string.digits
+
+
+# Main processing
+def random_word(rng, min_len, max_len):
+    return ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(min_len, max_len)))
+
+
+def run(sizes, candidate_count, seed, directory):
+    rng = random.Random(seed)
+    print(f'{"entries":>10} {"build s":>10} {"compile ms":>12} {"snapshot ms":>12} {"matcher us":>12} '
+          f'{"snapshot us":>12}')
+    for size in sizes:
+        words = [random_word(rng, 4, 10) for _ in range(size)]
+        wordlist = os.path.join(directory, f'{size}.txt')
+        path = os.path.join(directory, f'{size}.snap')
+        with open(wordlist, 'w') as file:
+            file.write('\n'.join(words))
+        checks = [random_word(rng, 8, 20) for _ in range(candidate_count)]
+        checks += ['x' + rng.choice(words) + '1' for _ in range(candidate_count)]
+
+        def read_rows():
+            return read_wordlist(wordlist)
+
+        # First launch writes the snapshot, later launches map it
+        build_time = timeit(lambda: load_snapshot(path, wordlist_state(wordlist), read_rows).close(), number=1)
+        compile_time = timeit(lambda: CommonPasswordMatcher(read_rows()), number=1)
+        open_time = timeit(lambda: load_snapshot(path, wordlist_state(wordlist), read_rows).close(), number=20) / 20
+
+        matcher = CommonPasswordMatcher(read_rows())
+        snapshot = load_snapshot(path, wordlist_state(wordlist), read_rows)
+        for candidate in checks:
+            assert matcher.search(candidate) == snapshot.search(candidate), candidate
+        matcher_time = timeit(lambda: [matcher.search(c) for c in checks], number=5) / 5 / len(checks)
+        snapshot_time = timeit(lambda: [snapshot.search(c) for c in checks], number=5) / 5 / len(checks)
+        snapshot.close()
+        print(f'{size:>10} {build_time:>10.2f} {compile_time * 1000:>12.1f} {open_time * 1000:>12.2f} '
+              f'{matcher_time * 1e6:>12.1f} {snapshot_time * 1e6:>12.1f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Common password snapshot benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=LIST_SIZES)
+    parser.add_argument('--candidates', type=int, default=CANDIDATE_COUNT)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        run(args.sizes, args.candidates, args.seed, directory)
+
+
+if __name__ == '__main__':
+    main()
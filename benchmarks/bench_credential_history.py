@@ -0,0 +1,94 @@
+#!/usr/bin/python3
+#  File: bench_credential_history.py
+#  Description: Password history query latency against a generated database, the query plan is checked by
+#  tests/test_query_plan.py
+#  Author: Christopher Hindson
+#  Date: 18/10/2026
+
+# Imports
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta
+from timeit import timeit
+from engine import db_access
+
+# CONSTANTS
+USER_COUNT = 20000
+HISTORY_PER_USER = 20
+LOOKUPS = 500
+SETUP_SCRIPT = 'db/setup.sql'
+
+# Original credential_retrieval SQL, limited across all users before filtering by user
+ORIGINAL_HISTORY_SQL = "SELECT * FROM " \
+                       "(SELECT * FROM (SELECT ua.user_name, uca.user_cred " \
+                       "FROM user_accounts ua " \
+                       "JOIN user_cred_audit uca ON ua.user_id = uca.user_id " \
+                       "WHERE uca.date_of_change > ? " \
+                       "ORDER BY uca.date_of_change desc LIMIT 10)" \
+                       "UNION ALL " \
+                       "SELECT u.user_name, uc.user_cred " \
+                       "FROM user_accounts u " \
+                       "JOIN user_credentials uc ON u.user_id = uc.user_id) a " \
+                       "WHERE a.user_name = ?"
+
+
+# Main processing
+def build_database(path, user_count, history_per_user, seed):
+    """
+    Create the schema from setup.sql and fill it with generated users and password history
+    """
+    rng = random.Random(seed)
+    now = datetime.now()
+    with open(SETUP_SCRIPT) as script, sqlite3.connect(path) as conn:
+        conn.executescript(script.read())
+        conn.executemany("INSERT INTO user_accounts (user_id, user_name, forename, surname, created_date) "
+                         "VALUES (?, ?, 'Fore', 'Sur', ?)",
+                         ((i, f'user_{i}', now) for i in range(1, user_count + 1)))
+        conn.executemany("INSERT INTO user_credentials (user_id, user_cred, expiry_date, last_updated) "
+                         "VALUES (?, ?, ?, ?)",
+                         ((i, f'cred_{i}', now + timedelta(days=90), now) for i in range(1, user_count + 1)))
+        conn.executemany("INSERT INTO user_cred_audit (user_id, user_cred, date_of_change) VALUES (?, ?, ?)",
+                         ((rng.randint(1, user_count), f'old_{i}', now - timedelta(minutes=rng.randint(0, 10 ** 6)))
+                          for i in range(user_count * history_per_user)))
+
+
+def time_lookups(conn, sql_string, parameter_sets):
+    return timeit(lambda: [conn.execute(sql_string, p).fetchall() for p in parameter_sets], number=1) \
+        / len(parameter_sets) * 1e6
+
+
+def run(user_count, history_per_user, lookups, seed):
+    rng = random.Random(seed)
+    since = datetime.now() - timedelta(days=365)
+    users = [f'user_{rng.randint(1, user_count)}' for _ in range(lookups)]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'history.sqlite')
+        build_database(path, user_count, history_per_user, seed)
+        db_access.configure_pool(db_path=path)
+
+        with db_access.pooled_connection() as conn:
+            before = time_lookups(conn, ORIGINAL_HISTORY_SQL, [(since, user) for user in users])
+        db_access.apply_migrations()
+        with db_access.pooled_connection() as conn:
+            history_sql = db_access.credential_retrieval()
+            after = time_lookups(conn, history_sql, [(user, since, db_access.HISTORY_DEPTH, user) for user in users])
+
+    print(f'audit rows: {user_count * history_per_user}')
+    print(f'original query {before:.1f} us, indexed per-user query {after:.1f} us ({before / after:.0f}x)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Password history query benchmark')
+    parser.add_argument('--users', type=int, default=USER_COUNT)
+    parser.add_argument('--history', type=int, default=HISTORY_PER_USER)
+    parser.add_argument('--lookups', type=int, default=LOOKUPS)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    run(args.users, args.history, args.lookups, args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/python3
+#  File: bench_db_connection.py
+#  Description: Per-call overhead of a fresh connection against the shared connection pool
+#  Author: Christopher Hindson
+#  Date: 18/10/2026
+
+# Imports
+import argparse
+import threading
+from contextlib import closing
+from timeit import timeit
+from engine import db_access
+
+# CONSTANTS
+CALLS = 2000
+THREADS = 8
+
+
+# Main processing
+def check_username_unpooled(username):
+    """
+    check_username as it was before pooling, opening and closing a connection per call
+    """
+    with closing(db_access.sql_connection()) as db:
+        with closing(db.cursor()) as cursor:
+            return cursor.execute("SELECT * FROM user_accounts WHERE user_name = ?; ", (username,)).fetchall()
+
+
+def threaded(function, calls, threads):
+    # Split the calls across threads, to exercise the pool under concurrent callers
+    def worker():
+        for i in range(calls // threads):
+            function(f'user_{i}')
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+
+def run(calls, threads, pool_size):
+    db_access.configure_pool(size=pool_size)
+    print(f'{"mode":>10} {"threads":>8} {"unpooled us":>12} {"pooled us":>10}')
+    unpooled = timeit(lambda: [check_username_unpooled(f'user_{i}') for i in range(calls)], number=1) / calls
+    pooled = timeit(lambda: [db_access.check_username(f'user_{i}') for i in range(calls)], number=1) / calls
+    print(f'{"serial":>10} {1:>8} {unpooled * 1e6:>12.1f} {pooled * 1e6:>10.1f}')
+    unpooled = timeit(lambda: threaded(check_username_unpooled, calls, threads), number=1) / calls
+    pooled = timeit(lambda: threaded(db_access.check_username, calls, threads), number=1) / calls
+    print(f'{"threaded":>10} {threads:>8} {unpooled * 1e6:>12.1f} {pooled * 1e6:>10.1f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Database connection overhead benchmark')
+    parser.add_argument('--calls', type=int, default=CALLS)
+    parser.add_argument('--threads', type=int, default=THREADS)
+    parser.add_argument('--pool-size', type=int, default=db_access.POOL_SIZE)
+    args = parser.parse_args()
+    run(args.calls, args.threads, args.pool_size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/python3
+#  File: bench_expiry_sweep.py
+#  Description: Expiry sweep time as the credential table grows, with a fixed number of accounts due
+#  Author: Christopher Hindson
+#  Date: 18/10/2026
+
+# Imports
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta
+from time import perf_counter
+from engine import db_access
+from engine.expiry_scheduler import NOTICE_DAYS, PAGE_SIZE, sweep
+
+# CONSTANTS
+SIZES = (10000, 100000, 1000000)
+DUE = 1000  # Accounts expired or inside the notice period, the rest expire later
+SETUP_SCRIPT = 'db/setup.sql'
+
+# Expiry query without the partial index, as a sweep would be without it
+FULL_SCAN_SQL = "SELECT uc.expiry_date, uc.rowid, ua.user_name " \
+                "FROM user_credentials uc NOT INDEXED " \
+                "JOIN user_accounts ua ON ua.user_id = uc.user_id " \
+                "WHERE uc.expiry_state < ? " \
+                "AND uc.expiry_date <= ? " \
+                "ORDER BY uc.expiry_date, uc.rowid LIMIT ?;"
+
+
+# Main processing
+def build_database(path, size, due, seed):
+    """
+    Create the schema with size accounts, due of them expired or expiring within the notice period
+    """
+    rng = random.Random(seed)
+    now = datetime.now()
+    with open(SETUP_SCRIPT) as script, sqlite3.connect(path) as conn:
+        conn.executescript(script.read())
+        conn.executemany("INSERT INTO user_accounts (user_id, user_name, forename, surname, created_date) "
+                         "VALUES (?, ?, 'Fore', 'Sur', ?)",
+                         ((i, f'user_{i}', now) for i in range(1, size + 1)))
+        due_users = set(rng.sample(range(1, size + 1), due))
+        conn.executemany("INSERT INTO user_credentials (user_id, user_cred, expiry_date, last_updated) "
+                         "VALUES (?, ?, ?, ?)",
+                         ((i, f'cred_{i}',
+                           now + timedelta(days=rng.uniform(-30, NOTICE_DAYS) if i in due_users
+                                           else rng.uniform(NOTICE_DAYS + 1, 365)), now)
+                          for i in range(1, size + 1)))
+    db_access.configure_pool(db_path=path)
+    db_access.apply_migrations()
+
+
+def discard(event, accounts):
+    pass
+
+
+def run(sizes, due, seed, directory):
+    print(f'{"accounts":>9} {"due":>6} {"sweep ms":>9} {"re-sweep ms":>12} {"full scan ms":>13}')
+    for size in sizes:
+        build_database(os.path.join(directory, f'{size}.sqlite'), size, due, seed)
+        now = datetime.now()
+        with db_access.pooled_connection() as conn:
+            start = perf_counter()
+            conn.execute(FULL_SCAN_SQL, (db_access.EXPIRY_NOTIFIED, now + timedelta(days=NOTICE_DAYS),
+                                         PAGE_SIZE)).fetchall()
+            full_scan = perf_counter() - start
+        start = perf_counter()
+        swept = sweep(now, notifier=discard)
+        first = perf_counter() - start
+        assert sum(swept.values()) == due, swept
+        # Nothing is newly due, the sweep run every interval in between expiries
+        start = perf_counter()
+        swept = sweep(now, notifier=discard)
+        again = perf_counter() - start
+        assert sum(swept.values()) == 0, swept
+        print(f'{size:>9} {due:>6} {first * 1e3:>9.1f} {again * 1e3:>12.2f} {full_scan * 1e3:>13.1f}')
+        db_access.connection_pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Password expiry sweep benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--due', type=int, default=DUE)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        run(args.sizes, args.due, args.seed, directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/python3
+#  File: bench_hash_index.py
+#  Description: Cold and warm lookup latency of the memory-mapped breached password hash index
+#  Author: Christopher Hindson
+#  Date: 18/10/2026
+
+# Imports
+import argparse
+import os
+import random
+import tempfile
+from time import perf_counter
+from engine.hash_index import COUNT, HEADER, HashIndex, build_hash_index
+
+# CONSTANTS
+RECORDS = 100000000
+DIGEST_SIZE = 20  # SHA-1
+COLD_LOOKUPS = 200
+WARM_LOOKUPS = 200000
+SAMPLES = 1000  # Records read back from random positions as known members, for hit lookups
+
+
+# Main processing
+def synthetic_records(records, seed):
+    """
+    Uniformly spread SHA-1 sized digests in ascending order, as a sorted HIBP download would be, without sorting
+    :return: generator of (digest, count)
+    """
+    generator = random.Random(seed)
+    spacing = 2 ** (DIGEST_SIZE * 8) // records
+    for i in range(records):
+        yield (i * spacing + generator.randrange(spacing)).to_bytes(DIGEST_SIZE, 'big'), generator.randint(1, 1000)
+
+
+def sample_digests(path, samples, seed):
+    # Digests at random positions of the index file, read with ordinary file I/O
+    generator = random.Random(seed)
+    with open(path, 'rb') as file:
+        records = HEADER.unpack(file.read(HEADER.size))[4]
+        digests = []
+        for _ in range(samples):
+            file.seek(HEADER.size + generator.randrange(records) * (DIGEST_SIZE + COUNT.size))
+            digests.append(file.read(DIGEST_SIZE))
+    return digests
+
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def lookups(path, digests, cold):
+    """
+    Time a lookup of each digest, when cold the index pages are dropped from the page cache and the file is
+    mapped again before every lookup, when warm every lookup has been made once before
+    :return: latencies in microseconds
+    """
+    latencies = []
+    index = None if cold else HashIndex(path)
+    if not cold:
+        # Warm up pass, so the pages of every lookup are resident before timing
+        for digest in digests:
+            index.count(digest)
+    for digest in digests:
+        if cold:
+            with open(path, 'rb') as file:
+                os.posix_fadvise(file.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+            start = perf_counter()
+            index = HashIndex(path)
+            index.count(digest)
+            latencies.append((perf_counter() - start) * 1e6)
+            index.close()
+        else:
+            start = perf_counter()
+            index.count(digest)
+            latencies.append((perf_counter() - start) * 1e6)
+    if not cold:
+        index.close()
+    return latencies
+
+
+def run(path, records, cold_lookups, warm_lookups):
+    if not os.path.exists(path):
+        start = perf_counter()
+        build_hash_index(synthetic_records(records, 1), path, presorted=True)
+        print(f'built {records} records in {perf_counter() - start:.0f}s')
+
+    index = HashIndex(path)
+    print(f'{len(index)} records, {os.path.getsize(path) / 2 ** 30:.2f} GiB')
+    index.close()
+    members = sample_digests(path, SAMPLES, 3)
+    generator = random.Random(2)
+    others = [generator.randbytes(DIGEST_SIZE) for _ in range(warm_lookups)]
+
+    print(f'{"lookup":<20}{"p50 us":>10}{"p99 us":>10}')
+    for label, digests, cold in (('cold, present', members[:cold_lookups], True),
+                                 ('cold, absent', others[:cold_lookups], True),
+                                 ('warm, present', (members * (warm_lookups // len(members) + 1))[:warm_lookups],
+                                  False),
+                                 ('warm, absent', others, False)):
+        latencies = lookups(path, digests, cold)
+        print(f'{label:<20}{percentile(latencies, 0.5):>10.1f}{percentile(latencies, 0.99):>10.1f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Breached password hash index benchmark')
+    parser.add_argument('--records', type=int, default=RECORDS)
+    parser.add_argument('--path', help='existing index to reuse, or where to build it (kept for later runs)')
+    parser.add_argument('--cold', type=int, default=COLD_LOOKUPS)
+    parser.add_argument('--warm', type=int, default=WARM_LOOKUPS)
+    args = parser.parse_args()
+
+    if args.path:
+        run(args.path, args.records, args.cold, args.warm)
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            run(os.path.join(directory, 'breached.idx'), args.records, args.cold, args.warm)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/python3
+#  File: bench_instrumentation.py
+#  Description: Cost of criteria_check with timings disabled, enabled, and with the session profiled
+#  Author: Christopher Hindson
+#  Date: 18/10/2026
+
+# Imports
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+# CONSTANTS
+CANDIDATES = 20000
+RUNS = 5
+# Run in a fresh interpreter for each mode, as instrumentation is fixed when the engine is imported
+CHILD = '''
+import random, string, sys
+from timeit import timeit
+from engine import instrumentation
+from engine.password_check import criteria_check, get_common_password_list, get_user_list
+get_common_password_list()
+get_user_list(lazy=True)
+rng = random.Random(1)
+candidates = [''.join(rng.choice(string.printable[:94]) for _ in range(rng.randint(6, 20)))
+              for _ in range({candidates})]
+best = min(timeit(lambda: [criteria_check('', c) for c in candidates], number=1) for _ in range({runs}))
+print(best / len(candidates) * 1e6, hasattr(criteria_check, '__wrapped__'))
+'''
+
+
+# Main processing
+def measure(environment, candidates, runs):
+    """
+    :return: best microseconds per criteria_check call, and whether criteria_check was wrapped
+    """
+    result = subprocess.run([sys.executable, '-c', CHILD.format(candidates=candidates, runs=runs)],
+                            capture_output=True, text=True, check=True, env=dict(os.environ, **environment))
+    per_call, wrapped = result.stdout.split()
+    return float(per_call), wrapped == 'True'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Instrumentation overhead benchmark')
+    parser.add_argument('--candidates', type=int, default=CANDIDATES)
+    parser.add_argument('--runs', type=int, default=RUNS)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        modes = (('disabled', {}),
+                 ('PWD_METRICS=1', {'PWD_METRICS': '1'}),
+                 ('PWD_PROFILE', {'PWD_PROFILE': os.path.join(directory, 'session.pstats')}))
+        print(f'{"mode":<16}{"us/call":>10}{"overhead":>10}  wrapped')
+        baseline = None
+        for label, environment in modes:
+            per_call, wrapped = measure(environment, args.candidates, args.runs)
+            baseline = baseline or per_call
+            print(f'{label:<16}{per_call:>10.2f}{per_call / baseline - 1:>10.1%}  {wrapped}')
+
+
+if __name__ == '__main__':
+    main()
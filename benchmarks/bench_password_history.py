@@ -0,0 +1,58 @@
+#!/usr/bin/python3
+#  File: bench_password_history.py
+#  Description: Wall-clock time of serial against parallel password history verification by history depth
+#  Author: Christopher Hindson
+#  Date: 18/10/2026
+
+# Imports
+import argparse
+from time import perf_counter
+from engine.text_hashing import (VERIFY_POOL_SIZE, hash_password, invalidate_verifications, verification_pool,
+                                 verify_any_hashed_password)
+
+# CONSTANTS
+HISTORY_DEPTHS = (1, 2, 5, 10, 20)
+
+
+# Main processing
+def timed(function, *args, **kwargs):
+    # Each run verifies in full, rather than from the outcomes remembered by the previous run
+    invalidate_verifications()
+    start = perf_counter()
+    result = function(*args, **kwargs)
+    return perf_counter() - start, result
+
+
+def run(depths, pool_size):
+    history = [hash_password(f'previous password {i}') for i in range(max(depths))]
+    # Start the worker processes before timing, as the GUI would have done on an earlier amend
+    verification_pool(pool_size).submit(int).result()
+
+    print(f'pool size {pool_size}')
+    print(f'{"depth":>6} {"serial miss s":>14} {"parallel miss s":>16} {"serial hit s":>13} {"parallel hit s":>15}')
+    for depth in depths:
+        hashes = history[:depth]
+        # A new password checks the full history, a reused one stops at its match (here the oldest)
+        serial_miss, found = timed(verify_any_hashed_password, 'new password', hashes)
+        assert not found
+        parallel_miss, found = timed(verify_any_hashed_password, 'new password', hashes,
+                                     parallel=True, pool_size=pool_size)
+        assert not found
+        reused = f'previous password {depth - 1}'
+        serial_hit, found = timed(verify_any_hashed_password, reused, hashes)
+        assert found
+        parallel_hit, found = timed(verify_any_hashed_password, reused, hashes, parallel=True, pool_size=pool_size)
+        assert found
+        print(f'{depth:>6} {serial_miss:>14.2f} {parallel_miss:>16.2f} {serial_hit:>13.2f} {parallel_hit:>15.2f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Password history verification benchmark')
+    parser.add_argument('--depths', type=int, nargs='+', default=HISTORY_DEPTHS)
+    parser.add_argument('--pool-size', type=int, default=VERIFY_POOL_SIZE)
+    args = parser.parse_args()
+    run(args.depths, args.pool_size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/python3
+#  File: bench_sequence_check.py
+#  Description: Compare sequence_check against the original find/concatenate implementation
+#  Author: Christopher Hindson
+#  Date: 18/10/2026
+
+# Imports
+import argparse
+import random
+import string
+from timeit import timeit
+from engine.password_check import sequence_check, sequences
+
+# CONSTANTS
+INPUT_LENGTHS = (50, 100, 250, 500, 1000)
+# Weighted towards sequence characters so that long runs are common in the generated inputs
+ALPHABET = sequences + string.ascii_uppercase + ' ?/.,'
+
+
+# Main processing
+def original_sequence_check(password_input):
+    """
+    Original sequence_check implementation, kept for comparison and as the oracle of tests/test_sequence_check.py
+    """
+    sequences_length = 0
+    i = 0
+    while i < len(password_input):
+        password = password_input[i:]
+        j = -1
+        common_length = 1
+        while True:
+            j = sequences.find(password[0], j + 1)
+            if j == -1:
+                break
+            common_here = ''
+            for a, b in zip(password, sequences[j:]):
+                if a != b:
+                    break
+                else:
+                    common_here += a
+            common_length = max(common_length, len(common_here))
+        if common_length > 2:
+            sequences_length += common_length
+        i += common_length
+    return sequences_length
+
+
+def random_input(rng, length):
+    """
+    Build a candidate from random characters and slices of the sequences string
+    """
+    parts = []
+    while sum(map(len, parts)) < length:
+        if rng.random() < 0.5:
+            start = rng.randrange(len(sequences))
+            parts.append(sequences[start:start + rng.randint(1, 12)])
+        else:
+            parts.append(rng.choice(ALPHABET))
+    return ''.join(parts)[:length]
+
+
+def run(lengths, seed):
+    rng = random.Random(seed)
+    print(f'{"length":>8} {"original us":>12} {"table us":>10} {"speedup":>8}')
+    for length in lengths:
+        candidates = [random_input(rng, length) for _ in range(20)]
+        original = timeit(lambda: [original_sequence_check(c) for c in candidates], number=3) / 60 * 1e6
+        table = timeit(lambda: [sequence_check(c) for c in candidates], number=30) / 600 * 1e6
+        print(f'{length:>8} {original:>12.1f} {table:>10.1f} {original / table:>7.1f}x')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='sequence_check benchmark')
+    parser.add_argument('--lengths', type=int, nargs='+', default=INPUT_LENGTHS)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    run(args.lengths, args.seed)
+
+
+if __name__ == '__main__':
+    main()
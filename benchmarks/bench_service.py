@@ -0,0 +1,121 @@
+#!/usr/bin/python3
+#  File: bench_service.py
+#  Description: Load test of the strength service, p50 / p99 latency and throughput by concurrent client count
+#  Author: Christopher Hindson
+#  Date: 18/10/2026
+
+# Imports
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+
+# CONSTANTS
+HOST = '127.0.0.1'
+PORT = 8080
+REQUESTS = 2000
+CONCURRENCY = (1, 16, 128)
+PASSWORDS = ('password', 'Tr0ub4dor&3', 'correct horse battery staple', 'qwerty123', 'abcdefgh1!A', 'zZ9!zZ9!zZ9!')
+
+
+# Main processing
+def strength_request(i):
+    body = json.dumps({'username': 'benchmark', 'password': PASSWORDS[i % len(PASSWORDS)] + str(i)}).encode('utf-8')
+    return (f'POST /strength HTTP/1.1\r\nHost: {HOST}\r\nContent-Type: application/json\r\n'
+            f'Content-Length: {len(body)}\r\n\r\n').encode('latin-1') + body
+
+
+def username_request(i):
+    return f'GET /username?name=benchmark_{i} HTTP/1.1\r\nHost: {HOST}\r\n\r\n'.encode('latin-1')
+
+
+async def read_response(reader):
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def client(host, port, requests, build_request, latencies):
+    # A single keep-alive connection, sending each request once the previous response has arrived
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for i in requests:
+            start = time.perf_counter()
+            writer.write(build_request(i))
+            await writer.drain()
+            if await read_response(reader) != 200:
+                raise RuntimeError('Request failed')
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, concurrency, requests, build_request):
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, range(i, requests, concurrency), build_request, latencies)
+                           for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return (latencies[len(latencies) // 2] * 1000, latencies[min(len(latencies) - 1, len(latencies) * 99 // 100)]
+            * 1000, len(latencies) / elapsed)
+
+
+async def wait_for_service(host, port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+
+async def bench(args):
+    endpoints = [('/strength', strength_request)]
+    if args.username:
+        endpoints.append(('/username', username_request))
+    await wait_for_service(args.host, args.port)
+    print(f'{"endpoint":<12}{"clients":>8}{"p50 ms":>10}{"p99 ms":>10}{"req/s":>10}')
+    for path, build_request in endpoints:
+        for concurrency in args.concurrency:
+            p50, p99, rate = await run_load(args.host, args.port, concurrency, args.requests, build_request)
+            print(f'{path:<12}{concurrency:>8}{p50:>10.2f}{p99:>10.2f}{rate:>10.0f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--requests', type=int, default=REQUESTS)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=CONCURRENCY)
+    parser.add_argument('--username', action='store_true', help='also load the username availability endpoint')
+    parser.add_argument('--spawn', action='store_true', help='start service.py on the port for the run')
+    args = parser.parse_args()
+
+    service = None
+    if args.spawn:
+        service = subprocess.Popen([sys.executable, 'service.py', '--host', args.host, '--port', str(args.port)])
+    try:
+        asyncio.run(bench(args))
+    finally:
+        if service is not None:
+            service.terminate()
+            service.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/python3
+#  File: bench_startup.py
+#  Description: Import time of the engine and GUI modules (python -X importtime), and time to first paint of main.py
+#  Author: Christopher Hindson
+#  Date: 18/10/2026
+
+# Imports
+import argparse
+import importlib.util
+import os
+import subprocess
+import sys
+import time
+from statistics import median
+
+# CONSTANTS
+RUNS = 5
+ENGINE_MODULES = ('engine.password_check', 'engine.strength_evaluator')
+GUI_MODULES = ('gui.main_window',)
+TOP_MODULES = 10
+# Imported by the engine modules alone, neither Qt nor a database connection should be
+ISOLATION_CHECK = ('import sys, engine.password_check, engine.strength_evaluator, engine.db_access as db; '
+                   'print(any(name.startswith("PyQt5") for name in sys.modules), db.connection_pool is not None)')
+
+
+# Main processing
+def import_times(modules):
+    """
+    Import the modules in a fresh interpreter under -X importtime
+    :return: {module: (self us, cumulative us)} for every module imported
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {", ".join(modules)}'],
+                            capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def first_paint():
+    """
+    Launch main.py with the startup probe enabled
+    :return: seconds from launch to first paint, and to the engine data being loaded
+    """
+    environment = dict(os.environ, PWD_STARTUP_PROBE='1')
+    environment.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    launched = time.time()
+    result = subprocess.run([sys.executable, 'main.py'], capture_output=True, text=True, env=environment,
+                            timeout=60)
+    events = dict(line.split() for line in result.stdout.splitlines() if line.startswith(('first_paint', 'data_')))
+    if 'data_loaded' not in events:
+        raise RuntimeError(f'main.py did not load its data: {result.stdout} {result.stderr}')
+    return float(events['first_paint']) - launched, float(events['data_loaded']) - launched
+
+
+def report_imports(label, modules, runs):
+    samples = [import_times(modules) for _ in range(runs)]
+    print(f'{label} import, median of {runs} runs')
+    for module in modules:
+        print(f'  {module:<40}{median(sample[module][1] for sample in samples) / 1000:>10.1f} ms')
+    slowest = sorted(samples[-1].items(), key=lambda item: item[1][0], reverse=True)[:TOP_MODULES]
+    print('  slowest modules by self time (last run)')
+    for module, (self_us, _) in slowest:
+        print(f'    {module:<38}{self_us / 1000:>10.1f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Startup benchmark')
+    parser.add_argument('--runs', type=int, default=RUNS)
+    args = parser.parse_args()
+
+    report_imports('engine', ENGINE_MODULES, args.runs)
+    qt_imported, db_opened = subprocess.run([sys.executable, '-c', ISOLATION_CHECK], capture_output=True, text=True,
+                                            check=True).stdout.split()
+    print(f'  engine import loads Qt: {qt_imported}, opens the database: {db_opened}')
+
+    if importlib.util.find_spec('PyQt5') is None:
+        print('PyQt5 not installed, GUI import and first paint skipped')
+        return
+    report_imports('GUI', GUI_MODULES, args.runs)
+    timings = [first_paint() for _ in range(args.runs)]
+    print(f'main.py, median of {args.runs} runs')
+    print(f'  {"first paint":<40}{median(paint for paint, _ in timings) * 1000:>10.1f} ms')
+    print(f'  {"data loaded":<40}{median(loaded for _, loaded in timings) * 1000:>10.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/python3
+#  File: bench_storage.py
+#  Description: Latency of each storage operation, SQLite against in-memory, and of the engine calls using them
+#  Author: Christopher Hindson
+#  Date: 18/10/2026
+
+# Imports
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta
+from timeit import timeit
+from engine import password_check
+from engine.db_access import HISTORY_DAYS, HISTORY_DEPTH
+from engine.memory_storage import MemoryStorage
+from engine.password_check import credential_amend, credential_verify, criteria_check
+from engine.storage import SQLiteStorage, configure_storage
+from engine.text_hashing import configure_hash_rounds, hash_password
+from benchmarks.bench_credential_history import build_database
+
+# CONSTANTS
+USER_COUNT = 20000
+HISTORY_PER_USER = 20
+CALLS = 2000
+# Hashing is cheapened so the storage share of credential_amend and credential_verify is visible
+ROUNDS = 1000
+PASSWORD = 'Xk#9v!Qm2@pLz9'
+
+
+# Main processing
+def operations(storage, users, since):
+    """
+    :return: list of (label, function of a username) timed for each storage
+    """
+    return [('check_username', storage.check_username),
+            ('user_detail', storage.user_detail),
+            ('current_credentials', storage.current_credentials),
+            ('credential_history', lambda user: storage.credential_history(user, since, HISTORY_DEPTH)),
+            ('credential_update', lambda user: storage.credential_update(hash_password(PASSWORD), user,
+                                                                         datetime.now() + timedelta(days=90))),
+            ('criteria_check', lambda user: criteria_check(user, PASSWORD)),
+            ('credential_verify', lambda user: credential_verify(user, PASSWORD)),
+            ('credential_amend', lambda user: credential_amend(user, f'{PASSWORD}{random.random()}', 90,
+                                                               parallel=False))]
+
+
+def time_storage(storage, users, since):
+    """
+    :return: {label: microseconds per call}
+    """
+    configure_storage(storage)
+    password_check.get_common_password_list()
+    password_check.get_user_list(lazy=True)
+    return {label: timeit(lambda: [function(user) for user in users], number=1) / len(users) * 1e6
+            for label, function in operations(storage, users, since)}
+
+
+def run(user_count, history_per_user, calls, seed, directory):
+    rng = random.Random(seed)
+    since = datetime.now() - timedelta(days=HISTORY_DAYS)
+    users = [f'user_{rng.randint(1, user_count)}' for _ in range(calls)]
+    path = os.path.join(directory, 'storage.sqlite')
+    build_database(path, user_count, history_per_user, seed)
+    sqlite_storage = SQLiteStorage(path)
+    configure_storage(sqlite_storage)
+    sqlite_storage.apply_migrations()
+    # Real hashes in place of the generated placeholders, so the history and current password can be verified
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE user_credentials SET user_cred = ?;", (hash_password(PASSWORD),))
+        conn.execute("UPDATE user_cred_audit SET user_cred = ?;", (hash_password('previous password'),))
+    memory = time_storage(MemoryStorage().load_database(path), users, since)
+    sqlite = time_storage(sqlite_storage, users, since)
+    print(f'users: {user_count}, history rows: {user_count * history_per_user}, pbkdf2 rounds: {ROUNDS}')
+    print(f'{"operation":<20} {"sqlite us":>10} {"memory us":>10} {"ratio":>6}')
+    for label, sqlite_time in sqlite.items():
+        print(f'{label:<20} {sqlite_time:>10.1f} {memory[label]:>10.1f} {sqlite_time / memory[label]:>6.1f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Storage backend benchmark')
+    parser.add_argument('--users', type=int, default=USER_COUNT)
+    parser.add_argument('--history', type=int, default=HISTORY_PER_USER)
+    parser.add_argument('--calls', type=int, default=CALLS)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    configure_hash_rounds(ROUNDS)
+    with tempfile.TemporaryDirectory() as directory:
+        run(args.users, args.history, args.calls, args.seed, directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/python3
+#  File: bench_typing_session.py
+#  Description: Replay typing sessions keystroke by keystroke through criteria_check
+#  Author: Christopher Hindson
+#  Date: 18/10/2026
+
+# Imports
+import argparse
+import re
+from timeit import timeit
+from engine.password_check import criteria_check, character_scan, get_common_password_list, get_user_list
+from engine.strength_evaluator import PasswordEvaluator
+
+# CONSTANTS
+SESSIONS = (
+    ('cherry_pick', 'Password1!'),
+    ('iron_man', 'Tr0ub4dor&3'),
+    ('new_user', 'correct horse battery staple'),
+    ('gold_mine', 'Th1s is my 50 character passphrase, it is long!!!!'),
+    ('atlantis', 'qwertyuiop1234567890!!!aaaBBB'),
+)
+REPEATS = 200
+
+
+# Main processing
+def original_character_checks(password_input):
+    """
+    Original criteria_check character class and repeated character detection, kept for comparison only
+    """
+    upper_check = bool(re.match(r'(?=.*[A-Z])', password_input))
+    lower_check = bool(re.match(r'(?=.*[a-z])', password_input))
+    number_check = bool(re.match(r'(?=.*[0-9])', password_input))
+    special_check = bool(re.match(r'(?=.*[\W])', password_input))
+    repeated_count = 0
+    if bool(re.findall(r'((\w)\2{2,})', password_input)):
+        for match in re.findall(r'((\w)\2{2,})', password_input):
+            repeated_count += len(match[0])
+    return upper_check, lower_check, number_check, special_check, repeated_count
+
+
+def keystrokes(password):
+    # Every prefix of the password, as seen by the key release handlers
+    return [password[:i] for i in range(1, len(password) + 1)]
+
+
+def replay(username, typed):
+    # Feed each keystroke through a fresh evaluator, as a window would while the password is typed
+    evaluator = PasswordEvaluator()
+    return [evaluator.evaluate(username, p) for p in typed]
+
+
+def run(repeats):
+    print(f'{"session":>52} {"keys":>5} {"orig scan us":>13} {"scan us":>8} {"criteria us":>12} '
+          f'{"evaluator us":>13}')
+    for username, password in SESSIONS:
+        typed = keystrokes(password)
+        for prefix in typed:
+            assert original_character_checks(prefix) == character_scan(prefix), prefix
+        assert replay(username, typed) == [criteria_check(username, p) for p in typed], password
+        calls = repeats * len(typed)
+        original = timeit(lambda: [original_character_checks(p) for p in typed], number=repeats) / calls * 1e6
+        scan = timeit(lambda: [character_scan(p) for p in typed], number=repeats) / calls * 1e6
+        criteria = timeit(lambda: [criteria_check(username, p) for p in typed], number=repeats) / calls * 1e6
+        incremental = timeit(lambda: replay(username, typed), number=repeats) / calls * 1e6
+        print(f'{password:>52} {len(typed):>5} {original:>13.2f} {scan:>8.2f} {criteria:>12.2f} '
+              f'{incremental:>13.2f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Keystroke replay benchmark for criteria_check')
+    parser.add_argument('--repeats', type=int, default=REPEATS)
+    args = parser.parse_args()
+    get_common_password_list()
+    get_user_list()
+    run(args.repeats)
+
+
+if __name__ == '__main__':
+    main()
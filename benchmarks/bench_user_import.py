@@ -0,0 +1,112 @@
+#!/usr/bin/python3
+#  File: bench_user_import.py
+#  Description: Users created per second by the bulk import against create_new_user one user at a time
+#  Author: Christopher Hindson
+#  Date: 18/10/2026
+
+# Imports
+import argparse
+import os
+import sqlite3
+import tempfile
+from time import perf_counter
+from engine import db_access
+from engine.db_access import (apply_migrations, check_username, configure_pool, create_new_user, create_new_users,
+                              existing_usernames)
+from engine.password_check import criteria_check, get_common_password_list
+from engine.text_hashing import configure_hash_rounds, hash_password
+from engine.user_import import IMPORT_CHUNK_SIZE, import_users
+
+# CONSTANTS
+SIZES = (1000, 10000, 100000)
+SINGLE_MAX = 10000  # Largest size also run one user at a time
+# Hashing is cheapened so the database path is measured, at production rounds the import is bound by
+# cores / hash time instead
+ROUNDS = 1000
+
+
+# Main processing
+def fresh_database(directory, name):
+    # New database from db/setup.sql with the migrations applied, used through the shared pool
+    path = os.path.join(directory, f'{name}.sqlite')
+    with open('db/setup.sql') as script, sqlite3.connect(path) as conn:
+        conn.executescript(script.read())
+    configure_pool(db_path=path)
+    apply_migrations()
+    get_common_password_list()
+    return path
+
+
+def users(size, prefix):
+    return [(f'{prefix}{i:07d}', 'Forename', 'Surname', f'Xk#{i}v!Qm2@pLz9') for i in range(size)]
+
+
+def one_at_a_time(records):
+    """
+    As the Create New User form, check the username, judge and hash the password, then create the user
+    :return: number of users created
+    """
+    created = 0
+    for username, forename, surname, password in records:
+        if not check_username(username)[0]:
+            continue
+        expiry_days = criteria_check(username, password)['strength']['expiry_days']
+        created += create_new_user(username, forename, surname, hash_password(password), expiry_days)[0]
+    return created
+
+
+def database_only(records, chunk_size, bulk):
+    """
+    The database work alone, with every password hashed beforehand
+    :return: seconds taken
+    """
+    hashed = hash_password(records[0][3])
+    users_hashed = [(username, forename, surname, hashed, 90) for username, forename, surname, _ in records]
+    start = perf_counter()
+    if bulk:
+        for index in range(0, len(users_hashed), chunk_size):
+            chunk = users_hashed[index:index + chunk_size]
+            existing_usernames([user[0] for user in chunk])
+            create_new_users(chunk)
+    else:
+        for user in users_hashed:
+            check_username(user[0])
+            create_new_user(*user)
+    return perf_counter() - start
+
+
+def run(sizes, workers, chunk_size, single_max, directory):
+    print(f'{"users":>8} {"method":<16} {"seconds":>9} {"users/s":>9} {"db users/s":>11}')
+    for size in sizes:
+        methods = [('bulk', lambda records: import_users(records, workers=workers, chunk_size=chunk_size)[0])]
+        if size <= single_max:
+            methods.insert(0, ('one at a time', one_at_a_time))
+        for label, method in methods:
+            fresh_database(directory, f'{size}_{label.replace(" ", "_")}')
+            records = users(size, 'user')
+            start = perf_counter()
+            created = method(records)
+            elapsed = perf_counter() - start
+            assert created == size, f'{created} of {size} created'
+            fresh_database(directory, f'{size}_{label.replace(" ", "_")}_db')
+            database_time = database_only(records, chunk_size, label == 'bulk')
+            print(f'{size:>8} {label:<16} {elapsed:>9.2f} {size / elapsed:>9.0f} {size / database_time:>11.0f}')
+    db_access.connection_pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk user import benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--workers', type=int, default=None, help='worker processes, defaults to all cores')
+    parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE)
+    parser.add_argument('--rounds', type=int, default=ROUNDS, help='pbkdf2_sha256 rounds')
+    parser.add_argument('--single-max', type=int, default=SINGLE_MAX)
+    args = parser.parse_args()
+
+    configure_hash_rounds(args.rounds)
+    with tempfile.TemporaryDirectory() as directory:
+        run(args.sizes, args.workers, args.chunk_size, args.single_max, directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/python3
+#  File: bench_vector_scoring.py
+#  Description: Speedup of the NumPy vector_scoring engine over scalar criteria_check
+#  Author: Christopher Hindson
+#  Date: 18/10/2026
+
+# Imports
+import argparse
+import random
+import string
+from time import perf_counter
+from engine.password_check import criteria_check
+from engine.vector_scoring import score_batch
+
+# CONSTANTS
+BATCH_SIZES = (10000, 1000000, 10000000)
+SCALAR_SAMPLE = 100000  # Larger batches time the scalar path on a sample, scaled up
+GENERATE_CHUNK = 1000000
+ALPHABET = string.ascii_letters + string.digits + string.punctuation + ' '
+
+
+# Main processing
+def generate(rng, count):
+    return [''.join(rng.choices(ALPHABET, k=rng.randint(6, 20))) for _ in range(count)]
+
+
+def run(sizes, seed):
+    rng = random.Random(seed)
+    print(f'{"passwords":>10} {"scalar s":>10} {"vector s":>10} {"speedup":>8}')
+    for size in sizes:
+        scalar = vector = 0.0
+        scalar_counted = 0
+        # Generate and score in chunks so 10M passwords are never held as Python strings at once
+        for start in range(0, size, GENERATE_CHUNK):
+            passwords = generate(rng, min(GENERATE_CHUNK, size - start))
+            began = perf_counter()
+            scores = score_batch(passwords)
+            vector += perf_counter() - began
+            if scalar_counted < SCALAR_SAMPLE:
+                sample = passwords[:SCALAR_SAMPLE - scalar_counted]
+                began = perf_counter()
+                expected = [criteria_check('', password)['strength']['id'] for password in sample]
+                scalar += perf_counter() - began
+                assert expected == scores['strength_id'][:len(sample)].tolist()
+                scalar_counted += len(sample)
+        scalar *= size / scalar_counted
+        note = '' if scalar_counted == size else f' (scalar extrapolated from {scalar_counted})'
+        print(f'{size:>10} {scalar:>10.2f} {vector:>10.2f} {scalar / vector:>7.1f}x{note}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Vectorised scoring benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=BATCH_SIZES)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    run(args.sizes, args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/python3
+#  File: bench_verify_cache.py
+#  Description: Cost of a retried password amend, verifying the current password and history, with the cache cold
+#  and warm
+#  Author: Christopher Hindson
+#  Date: 18/10/2026
+
+# Imports
+import argparse
+from time import perf_counter
+from engine.db_access import HISTORY_DEPTH
+from engine.text_hashing import (hash_password, invalidate_verifications, verify_any_hashed_password,
+                                 verify_hashed_password)
+
+# CONSTANTS
+RETRIES = 3
+
+
+# Main processing
+def amend_attempt(current_hash, history, current_password, new_password):
+    # The hashing work of amend_attempt: credential_verify, then the credential_amend history check
+    assert verify_hashed_password(current_password, current_hash)
+    assert not verify_any_hashed_password(new_password, history)
+
+
+def run(depth, retries):
+    current_hash = hash_password('current password')
+    history = [hash_password(f'previous password {i}') for i in range(depth)] + [current_hash]
+    invalidate_verifications()
+
+    print(f'history depth {depth}')
+    print(f'{"attempt":>8} {"seconds":>12}')
+    for attempt in range(1, retries + 1):
+        start = perf_counter()
+        # The user retries with the same new password, as after a mistyped confirmation
+        amend_attempt(current_hash, history, 'current password', 'new password')
+        print(f'{attempt:>8} {perf_counter() - start:>12.6f}')
+
+    invalidate_verifications(current_hash)
+    start = perf_counter()
+    amend_attempt(current_hash, history, 'current password', 'new password')
+    print(f'{"replaced":>8} {perf_counter() - start:>12.6f}  (current hash invalidated, as by credential_update)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Verification cache benchmark')
+    parser.add_argument('--depth', type=int, default=HISTORY_DEPTH)
+    parser.add_argument('--retries', type=int, default=RETRIES)
+    args = parser.parse_args()
+    run(args.depth, args.retries)
+
+
+if __name__ == '__main__':
+    main()
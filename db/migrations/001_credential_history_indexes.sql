@@ -0,0 +1,7 @@
+-- COVERING INDEXES FOR PASSWORD HISTORY LOOKUPS
+-- credential_retrieval reads the most recent audit rows of a single user, newest first,
+-- so (user_id, date_of_change DESC) serves it as an index range scan without sorting
+create index if not exists user_cred_audit_history
+    on user_cred_audit (user_id, date_of_change DESC, user_cred);
+create index if not exists user_credentials_user
+    on user_credentials (user_id, user_cred);
@@ -0,0 +1,13 @@
+-- ONLY WRITE PASSWORD HISTORY WHEN THE PASSWORD IS CHANGED
+-- credential_update always sets last_updated, while credential_rehash replaces the hash of the current
+-- password alone, which must not add the same password to the history again.
+-- Also replaces SYSDATE (not available in SQLite) with current_timestamp
+drop trigger if exists password_amend;
+create trigger password_amend
+    AFTER UPDATE OF last_updated
+    ON user_credentials
+    WHEN old.last_updated IS NOT new.last_updated
+BEGIN
+    INSERT INTO user_cred_audit (user_id, user_cred, date_of_change)
+    VALUES (old.user_id, old.user_cred, current_timestamp);
+END;
@@ -0,0 +1,39 @@
+-- TRACK CHANGES TO common_passwords FOR THE COMMON PASSWORD SNAPSHOT (engine/common_snapshot.py)
+-- The snapshot records this single row when written and is rebuilt when it no longer matches, so checking
+-- it at startup costs one row read whatever the size of the list.
+-- token is new each time the state is created, so a reloaded list (setup.sql) never matches an older snapshot
+drop table if exists common_password_state;
+create table common_password_state
+(
+    id           integer PRIMARY KEY CHECK (id = 1),
+    token        varchar(16) NOT NULL,
+    row_count    integer     NOT NULL,
+    change_count integer     NOT NULL
+);
+INSERT INTO common_password_state (id, token, row_count, change_count)
+SELECT 1, lower(hex(randomblob(8))), count(*), 0
+FROM common_passwords;
+
+drop trigger if exists common_password_insert;
+create trigger common_password_insert
+    AFTER INSERT
+    ON common_passwords
+BEGIN
+    UPDATE common_password_state SET row_count = row_count + 1, change_count = change_count + 1;
+END;
+
+drop trigger if exists common_password_update;
+create trigger common_password_update
+    AFTER UPDATE
+    ON common_passwords
+BEGIN
+    UPDATE common_password_state SET change_count = change_count + 1;
+END;
+
+drop trigger if exists common_password_delete;
+create trigger common_password_delete
+    AFTER DELETE
+    ON common_passwords
+BEGIN
+    UPDATE common_password_state SET row_count = row_count - 1, change_count = change_count + 1;
+END;
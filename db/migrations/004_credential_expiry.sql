@@ -0,0 +1,11 @@
+-- TRACK PASSWORD EXPIRY FOR THE EXPIRY SWEEP (engine/expiry_scheduler.py)
+-- expiry_state: 0 = active, 1 = expiry notice sent, 2 = reset required (password expired)
+-- credential_update returns the state to 0 when the password is changed
+alter table user_credentials add column expiry_state integer NOT NULL DEFAULT 0;
+
+-- Only credentials still to be swept (state below 2) are indexed, in expiry order. Expired accounts leave
+-- the index once flagged, so a sweep reads the accounts newly due and never the table, or every account
+-- expired in the past. Queries must repeat "expiry_state < 2" for SQLite to use this partial index
+create index if not exists user_credentials_expiry
+    on user_credentials (expiry_date)
+    WHERE expiry_state < 2;
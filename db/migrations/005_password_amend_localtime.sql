@@ -0,0 +1,13 @@
+-- WRITE PASSWORD HISTORY IN LOCAL TIME
+-- current_timestamp (migration 002) is UTC, while last_updated, expiry_date and the dates the history is compared
+-- against (credential_amend, audit_retention) are local time, so outside UTC the reuse window and retention cutoff
+-- were out by the zone offset
+drop trigger if exists password_amend;
+create trigger password_amend
+    AFTER UPDATE OF last_updated
+    ON user_credentials
+    WHEN old.last_updated IS NOT new.last_updated
+BEGIN
+    INSERT INTO user_cred_audit (user_id, user_cred, date_of_change)
+    VALUES (old.user_id, old.user_cred, datetime('now', 'localtime'));
+END;
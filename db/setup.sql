@@ -1,7 +1,13 @@
+-- LETS engine/audit_retention.py RETURN THE SPACE OF PURGED HISTORY, ONLY TAKES EFFECT ON A NEW DATABASE FILE,
+-- SO MUST COME BEFORE ANY OTHER STATEMENT
+PRAGMA auto_vacuum = INCREMENTAL;
+-- SCHEMA CHANGES ARE APPLIED FROM db/migrations, RESET THE VERSION SO THEY ARE RE-APPLIED
+PRAGMA user_version = 0;
 drop table if exists user_accounts;
 drop table if exists user_credentials;
 drop table if exists user_cred_audit;
 drop table if exists common_passwords;
+drop table if exists common_password_state;
 drop trigger if exists password_amend;
 
 create table common_passwords
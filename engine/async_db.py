@@ -0,0 +1,294 @@
+#  File: async_db.py
+#  Description: Awaitable data access for asyncio code, storage calls run on a dedicated database thread fed by
+#  a request queue, with concurrent reads batched
+#  Author: Christopher Hindson
+#  Date: 18/10/2026
+
+# Imports
+import asyncio
+import queue
+import threading
+from copy import copy
+from datetime import datetime, timedelta
+from functools import partial
+from .db_access import HISTORY_DAYS, HISTORY_DEPTH
+from .password_check import PARALLEL_HISTORY_CHECK, verify_current_credentials
+from .storage import get_storage
+from .text_hashing import hash_password, verify_any_hashed_password
+
+# Consts
+MAX_BATCH = 256  # Requests taken from the queue at a time, reads among them are batched
+# Storage methods that only read, identical concurrent calls are made once and the result shared
+READS = ('check_username', 'existing_usernames', 'user_detail', 'user_list', 'current_credentials',
+         'credential_history', 'common_passwords', 'common_passwords_state')
+
+# Globals
+database_thread = None
+database_thread_lock = threading.Lock()
+
+
+# Main processing
+def deliver(future, result, error):
+    # Run on the event loop of the caller
+    if future.cancelled():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+class DatabaseThread(threading.Thread):
+    """
+    Thread making every storage call for asyncio callers, so the event loop never waits on the database.
+    Requests are taken from the queue in batches. Consecutive reads in a batch are grouped: identical reads are made
+    once, and check_username calls for different names become a single existing_usernames query. Writes run one at a
+    time in the order received, and reads are never moved across a write, so a caller sees its own writes
+    """
+
+    def __init__(self, storage=None, max_batch=MAX_BATCH):
+        """
+        :param storage: Storage called, defaults to get_storage() at the time of each batch
+        :param max_batch: maximum requests taken from the queue at a time
+        """
+        super().__init__(name='async-db', daemon=True)
+        self.storage = storage
+        self.max_batch = max_batch
+        self.requests = queue.SimpleQueue()
+        self.batches = 0
+        self.calls = 0
+
+    def submit(self, method, *args):
+        """
+        Queue a storage call, must be called from a running event loop
+        :param method: name of the Storage method
+        :return: asyncio future of the result
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.requests.put((method, args, loop, future))
+        return future
+
+    def stop(self):
+        """
+        Stop once the requests already queued are done
+        :return: None
+        """
+        self.requests.put(None)
+
+    def run(self):
+        while True:
+            batch = [self.requests.get()]
+            while batch[-1] is not None and len(batch) < self.max_batch:
+                try:
+                    batch.append(self.requests.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = batch[-1] is None
+            if stopping:
+                batch.pop()
+            if batch:
+                self.batches += 1
+                self.run_batch(batch)
+            if stopping:
+                return
+
+    def run_batch(self, batch):
+        storage = self.storage or get_storage()
+        reads = []
+        for request in batch:
+            if request[0] in READS:
+                reads.append(request)
+                continue
+            self.run_reads(storage, reads)
+            reads = []
+            self.reply(request, *self.call(storage, request[0], request[1]))
+        self.run_reads(storage, reads)
+
+    def run_reads(self, storage, reads):
+        if not reads:
+            return
+        usernames = list(dict.fromkeys(args[0] for method, args, _, _ in reads if method == 'check_username'))
+        if len(usernames) > 1:
+            existing, error = self.call(storage, 'existing_usernames', (usernames,))
+            if existing is None and error is None:
+                result = (False, "There was a problem creating user account")
+                available = {username: result for username in usernames}
+            elif error is None:
+                available = {username: (False, "Username is unavailable") if username in existing
+                             else (True, "Username is available") for username in usernames}
+            for request in reads:
+                if request[0] == 'check_username':
+                    self.reply(request, None if error else available[request[1][0]], error)
+            reads = [request for request in reads if request[0] != 'check_username']
+        results = {}
+        for request in reads:
+            key = request[:2]
+            try:
+                shared = key in results
+                if not shared:
+                    results[key] = self.call(storage, *key)
+                result, error = results[key]
+            except TypeError:
+                # Arguments that cannot be compared (e.g. lists) are not shared
+                shared = False
+                result, error = self.call(storage, *key)
+            # Each caller of a shared read gets its own copy, so one changing its result does not affect another
+            self.reply(request, copy(result) if shared else result, error)
+
+    def call(self, storage, method, args):
+        """
+        :return: (result, None), or (None, exception) if the call raised
+        """
+        self.calls += 1
+        try:
+            return getattr(storage, method)(*args), None
+        except Exception as error:
+            return None, error
+
+    @staticmethod
+    def reply(request, result, error):
+        _, _, loop, future = request
+        try:
+            loop.call_soon_threadsafe(deliver, future, result, error)
+        except RuntimeError:
+            # The event loop of the caller has closed
+            pass
+
+
+def start_database_thread(storage=None, max_batch=MAX_BATCH):
+    """
+    Start the shared database thread, if not already running
+    :param storage: Storage called, defaults to get_storage()
+    :return: the running DatabaseThread
+    """
+    global database_thread
+
+    with database_thread_lock:
+        if database_thread is None or not database_thread.is_alive():
+            database_thread = DatabaseThread(storage, max_batch)
+            database_thread.start()
+        return database_thread
+
+
+def stop_database_thread():
+    """
+    Stop the shared database thread, once the requests already queued are done
+    :return: None
+    """
+    global database_thread
+
+    with database_thread_lock:
+        if database_thread is not None:
+            database_thread.stop()
+            database_thread.join()
+            database_thread = None
+
+
+def submit(method, *args):
+    """
+    Queue a storage call on the shared database thread, started on first use
+    :return: asyncio future of the result
+    """
+    thread = database_thread
+    if thread is None or not thread.is_alive():
+        thread = start_database_thread()
+    return thread.submit(method, *args)
+
+
+async def check_username(username):
+    """
+    As db_access.check_username
+    :return: True if available, False if already in use, and message string about result
+    """
+    return await submit('check_username', username)
+
+
+async def existing_usernames(usernames):
+    """
+    As db_access.existing_usernames
+    """
+    return await submit('existing_usernames', tuple(usernames))
+
+
+async def user_detail(username):
+    """
+    As Storage.user_detail
+    """
+    return await submit('user_detail', username)
+
+
+async def current_credentials(username):
+    """
+    As db_access.current_credentials
+    """
+    return await submit('current_credentials', username)
+
+
+async def credential_history(username, since, depth):
+    """
+    As db_access.credential_history
+    """
+    return await submit('credential_history', username, since, depth)
+
+
+async def create_new_user(username, forename, surname, password, expiry_days):
+    """
+    As db_access.create_new_user, password is the hashed password
+    :return: If INSERT successful, True, else False and a message string
+    """
+    return await submit('create_new_user', username, forename, surname, password, expiry_days)
+
+
+async def create_new_users(users):
+    """
+    As db_access.create_new_users
+    """
+    return await submit('create_new_users', list(users))
+
+
+async def credential_update(password, username, expiry_date):
+    """
+    As db_access.credential_update
+    """
+    return await submit('credential_update', password, username, expiry_date)
+
+
+async def credential_rehash(username, hashed, new_hash):
+    """
+    As db_access.credential_rehash
+    """
+    return await submit('credential_rehash', username, hashed, new_hash)
+
+
+async def credential_verify(username, password, executor=None):
+    """
+    As password_check.credential_verify, the password is verified on executor rather than the database thread
+    :param executor: concurrent.futures executor for the hashing, None for the default executor of the loop
+    :return: if password can be verified, True, else False
+    """
+    user_credentials = await current_credentials(username)
+    return await asyncio.get_running_loop().run_in_executor(
+        executor, verify_current_credentials, username, password, user_credentials)
+
+
+async def credential_amend(username, password, expiry_days, history_depth=None, parallel=None, pool_size=None,
+                           executor=None):
+    """
+    As password_check.credential_amend, hashing runs on executor rather than the database thread
+    :param executor: concurrent.futures executor for the hashing, None for the default executor of the loop
+    :return: If password is verified, True, else False
+    """
+    loop = asyncio.get_running_loop()
+    expiration_date = datetime.now(tz=None) - timedelta(days=HISTORY_DAYS)
+    expiry_date = datetime.now(tz=None) + timedelta(days=expiry_days)
+    history_depth = HISTORY_DEPTH if history_depth is None else history_depth
+    parallel = PARALLEL_HISTORY_CHECK if parallel is None else parallel
+    user_credentials = await credential_history(username, expiration_date, history_depth)
+    if user_credentials is None:
+        return False
+    if await loop.run_in_executor(executor, partial(verify_any_hashed_password, password, user_credentials,
+                                                    parallel=parallel, pool_size=pool_size)):
+        return False
+    hashed_password = await loop.run_in_executor(executor, hash_password, password)
+    return await credential_update(hashed_password, username, expiry_date)
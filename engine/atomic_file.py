@@ -0,0 +1,36 @@
+#  File: atomic_file.py
+#  Description: Replace a file so that readers only ever see the previous or the complete new contents
+#  Author: Christopher Hindson
+#  Date: 18/10/2026
+
+# Imports
+import os
+import threading
+from contextlib import contextmanager
+
+# Consts
+
+# Globals
+
+
+# Main processing
+@contextmanager
+def atomic_write(path, mode='wb'):
+    """
+    Write a file alongside path, renamed into place once the block completes, so a running reader (e.g. a mapped
+    snapshot, filter or index) never sees a partial file. The temporary name is per process and thread, as builders
+    may run at the same time. Should the block raise, the temporary file is removed and path is left as it was
+    Usage: with atomic_write(path) as file:
+    :param path: file to create or replace
+    :param mode: binary mode of the temporary file, e.g. 'w+b' to memory-map it while writing
+    :return: context manager yielding the open temporary file
+    """
+    temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        with open(temp_path, mode) as file:
+            yield file
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    os.replace(temp_path, path)
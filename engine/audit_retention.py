@@ -0,0 +1,105 @@
+#!/usr/bin/python3
+#  File: audit_retention.py
+#  Description: Retention of the password history (user_cred_audit), purging or archiving rows no longer checked
+#  Author: Christopher Hindson
+#  Date: 18/10/2026
+
+# Imports
+import argparse
+import time
+from datetime import datetime, timedelta
+from .db_access import HISTORY_DAYS, HISTORY_DEPTH
+from .storage import get_storage
+
+# Consts
+KEEP_COUNT = HISTORY_DEPTH  # Most recent changes kept per user, credential_amend checks no more than these
+KEEP_DAYS = HISTORY_DAYS  # Changes older than this are purged, credential_amend checks no older
+BATCH_SIZE = 500  # Rows purged in one transaction, keeps each write lock short
+VACUUM_STEP = 1000  # Pages released by one incremental vacuum transaction
+VACUUM_MIN_FREE = 0.1  # Free pages, as a fraction of the file, before space is returned to the file system
+
+
+# Main processing
+def purge_history(keep_count=KEEP_COUNT, keep_days=KEEP_DAYS, batch_size=BATCH_SIZE, archive_path=None, pause=0,
+                  now=None):
+    """
+    Purge the password history not required by the policy, a batch per transaction
+    A change is kept while it is both within the keep_count most recent of its user and within keep_days
+    :param keep_count: most recent changes kept per user, at least the history_depth credential_amend is called with
+    :param keep_days: age in days of the oldest change kept
+    :param batch_size: rows purged per transaction
+    :param archive_path: SQLite database the purged rows are copied to, None to delete only
+    :param pause: seconds to wait between batches, giving way to other writers on a busy database
+    :param now: time of the purge, defaults to the current time
+    :return: number of rows purged, None if a batch failed (rows purged by earlier batches stay purged)
+    """
+    cutoff = (now or datetime.now(tz=None)) - timedelta(days=keep_days)
+    purged = 0
+    after_user = 0
+    while True:
+        result = get_storage().purge_credential_history(cutoff, keep_count, after_user, batch_size, archive_path)
+        if result is None:
+            return None
+        count, after_user = result
+        purged += count
+        if count < batch_size:
+            return purged
+        if pause:
+            time.sleep(pause)
+
+
+def reclaim_space(min_free=VACUUM_MIN_FREE, step=VACUUM_STEP, pause=0):
+    """
+    Return the free pages left by a purge to the file system by incremental vacuum, a step per transaction
+    Does nothing unless free pages are at least min_free of the file, or the database is not in incremental mode
+    :param min_free: fraction of the pages that must be free
+    :param step: pages released per transaction
+    :param pause: seconds to wait between steps
+    :return: number of pages released
+    """
+    space = get_storage().database_space()
+    if space is None:
+        return 0
+    auto_vacuum, page_count, free_pages, _ = space
+    if auto_vacuum != 2 or not free_pages or free_pages < page_count * min_free:
+        return 0
+    remaining = free_pages
+    while remaining:
+        left = get_storage().incremental_vacuum(step)
+        if left is None or left >= remaining:
+            break
+        remaining = left
+        if pause:
+            time.sleep(pause)
+    return free_pages - remaining
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Purge password history no longer required by the retention policy')
+    parser.add_argument('--keep-count', type=int, default=KEEP_COUNT, help='most recent changes kept per user')
+    parser.add_argument('--keep-days', type=int, default=KEEP_DAYS, help='age in days of the oldest change kept')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--pause', type=float, default=0, help='seconds between batches')
+    parser.add_argument('--archive', help='copy purged rows to this SQLite database before deleting')
+    parser.add_argument('--enable-incremental-vacuum', action='store_true',
+                        help='switch an existing database to incremental vacuum, a one off full VACUUM')
+    args = parser.parse_args()
+
+    if get_storage().apply_migrations() is None:
+        parser.exit(1, 'Database could not be updated\n')
+    if args.keep_count < HISTORY_DEPTH or args.keep_days < HISTORY_DAYS:
+        print(f'Warning: passwords older than {args.keep_count} changes or {args.keep_days} days can be reused, '
+              f'the password history checks {HISTORY_DEPTH} changes over {HISTORY_DAYS} days')
+    if args.enable_incremental_vacuum and not get_storage().enable_incremental_vacuum():
+        parser.exit(1, 'Database could not be switched to incremental vacuum\n')
+    start = time.perf_counter()
+    purged = purge_history(args.keep_count, args.keep_days, args.batch_size, args.archive, args.pause)
+    if purged is None:
+        parser.exit(1, 'Purge failed, run again to continue\n')
+    released = reclaim_space(pause=args.pause)
+    print(f'{purged} history rows {"archived" if args.archive else "purged"}, {released} pages released, '
+          f'in {time.perf_counter() - start:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+#  File: batch_scoring.py
+#  Description: Score large numbers of password candidates across worker processes
+#  Author: Christopher Hindson
+#  Date: 18/10/2026
+
+# Imports
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from .password_check import criteria_check, strength_list
+
+# Consts
+CHUNK_SIZE = 5000  # Candidates sent to a worker process at a time
+CHUNKS_PER_WORKER = 2  # Chunks queued per worker, bounds memory to workers * CHUNKS_PER_WORKER * CHUNK_SIZE
+
+
+# Main processing
+def score_chunk(passwords):
+    """
+    Score a chunk of password candidates with criteria_check, no username is applied
+    :param passwords: list of password candidates
+    :return: list of strength ids, index into strength_list, in the same order as passwords
+    """
+    return [criteria_check('', password)['strength']['id'] for password in passwords]
+
+
+def score_stream(passwords, workers=None, chunk_size=CHUNK_SIZE, vectorized=False):
+    """
+    Score a stream of password candidates across a process pool, in chunks, keeping the input order
+    Only a bounded number of chunks are read ahead, so memory depends on chunk_size and not on the input size
+    :param passwords: iterable of password candidates, i.e. lines of a file
+    :param workers: number of worker processes, defaults to all cores, 1 scores in the current process
+    :param chunk_size: number of candidates sent to a worker at a time
+    :param vectorized: If True score each chunk with the NumPy vector_scoring engine
+    :return: generator of (password, strength) where strength is the entry from strength_list
+    """
+    workers = workers or os.cpu_count() or 1
+    scorer = score_chunk
+    if vectorized:
+        # NumPy is only required when the vectorised engine is requested
+        from .vector_scoring import strength_ids
+        scorer = strength_ids
+    passwords = iter(passwords)
+    if workers == 1:
+        while True:
+            chunk = list(islice(passwords, chunk_size))
+            if not chunk:
+                return
+            yield from zip(chunk, (strength_list[strength_id] for strength_id in scorer(chunk)))
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque()
+        exhausted = False
+        while True:
+            while not exhausted and len(in_flight) < workers * CHUNKS_PER_WORKER:
+                chunk = list(islice(passwords, chunk_size))
+                if not chunk:
+                    exhausted = True
+                    break
+                in_flight.append((chunk, executor.submit(scorer, chunk)))
+            if not in_flight:
+                return
+            chunk, future = in_flight.popleft()
+            yield from zip(chunk, (strength_list[strength_id] for strength_id in future.result()))
@@ -0,0 +1,142 @@
+#!/usr/bin/python3
+#  File: bloom_filter.py
+#  Description: On-disk Bloom filter of breached passwords, memory-mapped for exact-match checks
+#  Author: Christopher Hindson
+#  Date: 18/10/2026
+
+# Imports
+import argparse
+import mmap
+import struct
+from hashlib import blake2b
+from math import ceil, log
+from .atomic_file import atomic_write
+
+# Consts
+MAGIC = b'PWBLOOM'
+VERSION = 1
+HEADER = struct.Struct('<7sBQIQ')  # magic, version, bit count, hash count, entry count
+DEFAULT_FP_RATE = 0.001
+
+
+# Main processing
+def filter_size(entries, fp_rate=DEFAULT_FP_RATE):
+    """
+    Optimal Bloom filter dimensions for the number of entries and false positive rate
+    :param entries: number of passwords to be added
+    :param fp_rate: acceptable false positive rate, e.g. 0.001
+    :return: bit count, hash count
+    """
+    entries = max(entries, 1)
+    bits = max(64, ceil(-entries * log(fp_rate) / log(2) ** 2))
+    hashes = max(1, round(bits / entries * log(2)))
+    return bits, hashes
+
+
+def bit_positions(password, bits, hashes):
+    """
+    Bit positions of a password, by double hashing a single 128 bit BLAKE2b digest
+    :param password: lower case password
+    :param bits: bit count of the filter
+    :param hashes: hash count of the filter
+    :return: list of bit positions
+    """
+    digest = int.from_bytes(blake2b(password.encode('utf-8'), digest_size=16).digest(), 'little')
+    first = digest & 0xFFFFFFFFFFFFFFFF
+    second = digest >> 64 | 1
+    return [(first + i * second) % bits for i in range(hashes)]
+
+
+class BloomFilter:
+    """
+    Read only Bloom filter memory-mapped from a file written by build_bloom_filter
+    Opening costs the same whatever the filter size, pages are read by the OS as lookups touch them
+    """
+
+    def __init__(self, path):
+        """
+        :param path: filter file
+        """
+        with open(path, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.bits, self.hashes, self.entries = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError(f'{path} is not a version {VERSION} password Bloom filter')
+        if len(self._map) < HEADER.size + (self.bits + 7) // 8:
+            self._map.close()
+            raise ValueError(f'{path} is truncated')
+
+    def __contains__(self, password):
+        """
+        :param password: lower case password
+        :return: False if the password was never added, True if it was (or rarely, a false positive)
+        """
+        data = self._map
+        offset = HEADER.size
+        for position in bit_positions(password, self.bits, self.hashes):
+            if not data[offset + (position >> 3)] & (1 << (position & 7)):
+                return False
+        return True
+
+    def __len__(self):
+        return self.entries
+
+    def close(self):
+        self._map.close()
+
+
+def read_passwords(path):
+    """
+    Passwords from a text file, one per line, lower cased to match check_common_passwords
+    :param path: text file
+    :return: generator of passwords, blank lines skipped
+    """
+    with open(path, encoding='utf-8', errors='replace') as file:
+        for line in file:
+            password = line.rstrip('\r\n')
+            if password:
+                yield password.lower()
+
+
+def build_bloom_filter(passwords, path, entries, fp_rate=DEFAULT_FP_RATE):
+    """
+    Write a Bloom filter of the passwords, built in a memory-mapped file so the filter is never held in memory
+    The file is replaced through atomic_write
+    :param passwords: iterable of lower case passwords
+    :param path: filter file to create
+    :param entries: expected number of passwords, sizes the filter for fp_rate
+    :param fp_rate: acceptable false positive rate
+    :return: number of passwords added
+    """
+    bits, hashes = filter_size(entries, fp_rate)
+    offset = HEADER.size
+    added = 0
+    with atomic_write(path, 'w+b') as file:
+        file.truncate(offset + (bits + 7) // 8)
+        with mmap.mmap(file.fileno(), 0) as data:
+            for password in passwords:
+                for position in bit_positions(password, bits, hashes):
+                    data[offset + (position >> 3)] |= 1 << (position & 7)
+                added += 1
+            HEADER.pack_into(data, 0, MAGIC, VERSION, bits, hashes, added)
+            data.flush()
+    return added
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build a breached password Bloom filter from a text file')
+    parser.add_argument('passwords', help='text file, one password per line')
+    parser.add_argument('output', help='filter file, e.g. db/breached.bloom')
+    parser.add_argument('--fp-rate', type=float, default=DEFAULT_FP_RATE)
+    parser.add_argument('--entries', type=int, help='number of passwords, counted from the file if not supplied')
+    args = parser.parse_args()
+
+    entries = args.entries or sum(1 for _ in read_passwords(args.passwords))
+    added = build_bloom_filter(read_passwords(args.passwords), args.output, entries, args.fp_rate)
+    bits, hashes = filter_size(entries, args.fp_rate)
+    print(f'{added} passwords, {bits} bits ({(bits + 7) // 8} bytes), {hashes} hashes written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+#  File: common_matcher.py
+#  Description: Multi-pattern (Aho-Corasick) matcher for the common password list
+#  Author: Christopher Hindson
+#  Date: 18/10/2026
+
+# Imports
+from collections import deque
+
+# Consts
+ROOT_STATE = 0
+NO_MATCH = None
+
+
+# Main processing
+
+class CommonPasswordMatcher:
+    """
+    Aho-Corasick automaton compiled once from the (id, password_text) rows of common_passwords
+    Each state records the most common (lowest id) password ending at that state, including those reached through
+    the failure links, so a single pass over the candidate finds the best placement regardless of list size
+    """
+
+    def __init__(self, password_list):
+        """
+        Compile the automaton from the common password rows
+        :param password_list: iterable of (id, password_text) tuples, lower id = more common
+        """
+        # Transitions are held in one flat dict keyed by (state, character) to keep memory low for large lists
+        self._goto = {}
+        self._fail = [ROOT_STATE]
+        # (id, length) of the most common password recognised at each state, None if no password ends here
+        self._match = [NO_MATCH]
+        self._depth = [0]
+        self._size = 0
+
+        for password_id, password_text in password_list:
+            self._size += 1
+            if password_text:
+                self._add(password_id, password_text)
+        self._build_links()
+
+    def __len__(self):
+        # Number of rows the matcher was compiled from, used for the placement feedback
+        return self._size
+
+    def _add(self, password_id, password_text):
+        """
+        Add a single password to the trie, keeping the lowest id where a password is duplicated
+        """
+        state = ROOT_STATE
+        for char in password_text:
+            next_state = self._goto.get((state, char))
+            if next_state is None:
+                next_state = len(self._fail)
+                self._goto[(state, char)] = next_state
+                self._fail.append(ROOT_STATE)
+                self._match.append(NO_MATCH)
+                self._depth.append(self._depth[state] + 1)
+            state = next_state
+        current = self._match[state]
+        if current is NO_MATCH or password_id < current[0]:
+            self._match[state] = (password_id, len(password_text))
+
+    def _build_links(self):
+        """
+        Breadth first pass to set the failure links, merging the best match of each failure state into its children
+        """
+        children = [[] for _ in self._fail]
+        for (state, char), next_state in self._goto.items():
+            children[state].append((char, next_state))
+
+        queue = deque()
+        for char, next_state in children[ROOT_STATE]:
+            queue.append(next_state)
+        while queue:
+            state = queue.popleft()
+            for char, next_state in children[state]:
+                fail = self._fail[state]
+                while fail != ROOT_STATE and (fail, char) not in self._goto:
+                    fail = self._fail[fail]
+                fail = self._goto.get((fail, char), ROOT_STATE)
+                self._fail[next_state] = fail
+                self._match[next_state] = self.best_match(self._match[next_state], self._match[fail])
+                queue.append(next_state)
+
+    def tables(self):
+        """
+        The compiled automaton, serialised by common_snapshot.py
+        :return: transitions {(state, char): next state}, then the failure link and (id, length) match of each state
+        """
+        return self._goto, self._fail, self._match
+
+    @staticmethod
+    def best_match(first, second):
+        """
+        Return the more common of two (id, length) matches, either of which may be None
+        """
+        if first is NO_MATCH:
+            return second
+        if second is NO_MATCH or first[0] <= second[0]:
+            return first
+        return second
+
+    def step(self, state, char):
+        """
+        Advance the automaton by a single character
+        :param state: current automaton state, ROOT_STATE at the start of the candidate
+        :param char: next character of the candidate
+        :return: new state, and the (id, length) of the most common password ending at the new state or None
+        """
+        goto = self._goto
+        while True:
+            next_state = goto.get((state, char))
+            if next_state is not None:
+                return next_state, self._match[next_state]
+            if state == ROOT_STATE:
+                return ROOT_STATE, NO_MATCH
+            state = self._fail[state]
+
+    def search(self, password_input):
+        """
+        Find the most common password contained within the candidate
+        :param password_input: password candidate
+        :return: (id, length) of the most common password found, or None if no common password is contained
+        """
+        goto = self._goto
+        fail = self._fail
+        match = self._match
+        best = NO_MATCH
+        state = ROOT_STATE
+        for char in password_input:
+            while True:
+                next_state = goto.get((state, char))
+                if next_state is not None:
+                    state = next_state
+                    break
+                if state == ROOT_STATE:
+                    break
+                state = fail[state]
+            found = match[state]
+            if found is not NO_MATCH and (best is NO_MATCH or found[0] < best[0]):
+                best = found
+        return best
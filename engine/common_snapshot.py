@@ -0,0 +1,298 @@
+#!/usr/bin/python3
+#  File: common_snapshot.py
+#  Description: Memory-mapped snapshot of the common password list and its compiled matcher
+#  Author: Christopher Hindson
+#  Date: 18/10/2026
+
+# Imports
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from .atomic_file import atomic_write
+from .bloom_filter import read_passwords
+from .common_matcher import NO_MATCH, ROOT_STATE, CommonPasswordMatcher
+from .storage import get_storage
+
+# Consts
+MAGIC = b'PWSNAP'
+VERSION = 1
+# Arrays are written in the native layout (byte order and item size), a snapshot is only valid on like hosts
+LAYOUT = (sys.byteorder == 'big') << 7 | array('I').itemsize
+# magic, version, layout, row count, strings blob size, state count, transition count, source digest, row checksum
+HEADER = struct.Struct('<6sBBQQII32s32s')
+SOURCE_OFFSET = HEADER.size - 64  # Offset of the source digest within the header
+NO_SOURCE = bytes(32)  # Source digest of a snapshot whose source state was not known, checked by row checksum only
+NO_ID = 0xFFFFFFFF  # Match id of a state no password ends at
+
+
+# Main processing
+def source_digest(state):
+    """
+    :param state: state of the source the rows were read from, e.g. common_passwords_state() or wordlist_state()
+    :return: 32 byte digest stored in the snapshot header, NO_SOURCE if state is None
+    """
+    if state is None:
+        return NO_SOURCE
+    return hashlib.sha256(repr(tuple(state)).encode('utf-8')).digest()
+
+
+def rows_checksum(rows):
+    """
+    :param rows: iterable of (id, password_text)
+    :return: SHA-256 digest of the rows, in the order given
+    """
+    digest = hashlib.sha256()
+    for password_id, password_text in rows:
+        text = (password_text or '').encode('utf-8')
+        digest.update(struct.pack('<QI', password_id, len(text)) + text)
+    return digest.digest()
+
+
+def wordlist_state(path):
+    """
+    State of a word list used in place of the common_passwords table, changes when the file is replaced or edited
+    """
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_size, stat.st_mtime_ns
+
+
+def read_wordlist(path):
+    """
+    :param path: text file, one password per line, most common first
+    :return: list of (id, password_text), ids numbered from 1 in file order as common_passwords
+    """
+    return list(enumerate(read_passwords(path), 1))
+
+
+class CommonPasswordSnapshot:
+    """
+    Read only snapshot written by build_snapshot, a sequence of the (id, password_text) rows and a drop in for
+    CommonPasswordMatcher. Opening maps the file whatever the list size, the rows are held in a packed UTF-8 blob
+    with offsets and the automaton in compressed sparse row arrays (transitions of each state sorted by character)
+    """
+
+    def __init__(self, path):
+        """
+        :param path: snapshot file
+        """
+        with open(path, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < HEADER.size:
+            self._map.close()
+            raise ValueError(f'{path} is truncated')
+        magic, version, layout, self.rows, blob_size, self.states, self.transitions, self.source, self.checksum = \
+            HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION or layout != LAYOUT or self.states < 1:
+            self._map.close()
+            raise ValueError(f'{path} is not a version {VERSION} common password snapshot for this host')
+
+        view = memoryview(self._map)
+        self._views = [view]
+        offset = HEADER.size
+        for count in (self.rows, self.rows + 1, self.states + 1, self.transitions, self.transitions,
+                      self.states, self.states, self.states):
+            end = offset + count * array('I').itemsize
+            if end > len(self._map):
+                self.close()
+                raise ValueError(f'{path} is truncated')
+            self._views.append(view[offset:end].cast('I'))
+            offset = end
+        if offset + blob_size > len(self._map):
+            self.close()
+            raise ValueError(f'{path} is truncated')
+        self._views.append(view[offset:offset + blob_size])
+        (self._ids, self._offsets, self._edge_start, self._edge_char, self._edge_target, self._fail, self._match_id,
+         self._match_len, self._blob) = self._views[1:]
+        # Most characters of a candidate are read at the root, its transitions (one per distinct first character)
+        # are held in a dict rather than searched
+        self._root = {self._edge_char[position]: self._edge_target[position]
+                      for position in range(self._edge_start[ROOT_STATE], self._edge_start[ROOT_STATE + 1])}
+
+    def __len__(self):
+        # Number of rows the snapshot was built from, used for the placement feedback
+        return self.rows
+
+    def __getitem__(self, index):
+        """
+        :param index: row number, in the order the rows were read (id order for common_passwords)
+        :return: (id, password_text)
+        """
+        if not -self.rows <= index < self.rows:
+            raise IndexError('snapshot row out of range')
+        index %= self.rows
+        return self._ids[index], str(self._blob[self._offsets[index]:self._offsets[index + 1]], 'utf-8')
+
+    best_match = staticmethod(CommonPasswordMatcher.best_match)
+
+    def step(self, state, char):
+        """
+        Advance the automaton by a single character, as CommonPasswordMatcher.step
+        :return: new state, and the (id, length) of the most common password ending at the new state or None
+        """
+        edge_start = self._edge_start
+        edge_char = self._edge_char
+        code = ord(char)
+        while True:
+            start, end = edge_start[state], edge_start[state + 1]
+            position = bisect_left(edge_char, code, start, end)
+            if position < end and edge_char[position] == code:
+                state = self._edge_target[position]
+                password_id = self._match_id[state]
+                return state, NO_MATCH if password_id == NO_ID else (password_id, self._match_len[state])
+            if state == ROOT_STATE:
+                return ROOT_STATE, NO_MATCH
+            state = self._fail[state]
+
+    def search(self, password_input):
+        """
+        Find the most common password contained within the candidate, as CommonPasswordMatcher.search
+        :param password_input: password candidate
+        :return: (id, length) of the most common password found, or None if no common password is contained
+        """
+        edge_start = self._edge_start
+        edge_char = self._edge_char
+        edge_target = self._edge_target
+        fail = self._fail
+        match_id = self._match_id
+        root = self._root
+        best_id, best_state = NO_ID, ROOT_STATE
+        state = ROOT_STATE
+        for char in password_input:
+            code = ord(char)
+            while True:
+                if state == ROOT_STATE:
+                    state = root.get(code, ROOT_STATE)
+                    break
+                start, end = edge_start[state], edge_start[state + 1]
+                position = bisect_left(edge_char, code, start, end)
+                if position < end and edge_char[position] == code:
+                    state = edge_target[position]
+                    break
+                state = fail[state]
+            if match_id[state] < best_id:
+                best_id, best_state = match_id[state], state
+        if best_id == NO_ID:
+            return NO_MATCH
+        return best_id, self._match_len[best_state]
+
+    def close(self):
+        for view in reversed(self._views):
+            view.release()
+        self._map.close()
+
+
+def build_snapshot(rows, path, source=NO_SOURCE):
+    """
+    Compile the rows and write them with the automaton as a snapshot, through atomic_write
+    :param rows: iterable of (id, password_text), lower id = more common, ids below 2**32 - 1
+    :param path: snapshot file to create
+    :param source: source_digest of the state the rows were read at
+    :return: number of rows written
+    """
+    rows = list(rows)
+    goto, fail, match = CommonPasswordMatcher(rows).tables()
+    ids = array('I', (password_id for password_id, _ in rows))
+    offsets = array('I', [0])
+    blob = bytearray()
+    for _, password_text in rows:
+        blob += (password_text or '').encode('utf-8')
+        offsets.append(len(blob))
+
+    transitions = sorted((state, ord(char), next_state) for (state, char), next_state in goto.items())
+    edge_start = array('I', [0]) * (len(fail) + 1)
+    for state, _, _ in transitions:
+        edge_start[state + 1] += 1
+    for state in range(len(fail)):
+        edge_start[state + 1] += edge_start[state]
+    edge_char = array('I', (code for _, code, _ in transitions))
+    edge_target = array('I', (next_state for _, _, next_state in transitions))
+    match_id = array('I', (NO_ID if found is NO_MATCH else found[0] for found in match))
+    match_len = array('I', (0 if found is NO_MATCH else found[1] for found in match))
+
+    with atomic_write(path) as file:
+        file.write(HEADER.pack(MAGIC, VERSION, LAYOUT, len(rows), len(blob), len(fail), len(transitions),
+                               source, rows_checksum(rows)))
+        for section in (ids, offsets, edge_start, edge_char, edge_target, array('I', fail), match_id, match_len):
+            section.tofile(file)
+        file.write(blob)
+    return len(rows)
+
+
+def open_snapshot(path):
+    """
+    :param path: snapshot file
+    :return: CommonPasswordSnapshot, None if the file does not exist or is not a valid snapshot
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        return CommonPasswordSnapshot(path)
+    except (OSError, ValueError) as error:
+        print(error)
+        return None
+
+
+def load_snapshot(path, state, read_rows):
+    """
+    Map the snapshot, rebuilding it from read_rows when it is missing or was built from another state of the source.
+    With state unchanged no rows are read, so the cost is the same whatever the list size
+    :param path: snapshot file
+    :param state: current state of the source, e.g. common_passwords_state(), None if not known
+    :param read_rows: function returning the (id, password_text) rows of the source, None on failure
+    :return: CommonPasswordSnapshot, None if there is no snapshot and it could not be built
+    """
+    source = source_digest(state)
+    snapshot = open_snapshot(path)
+    if snapshot is not None and source != NO_SOURCE and snapshot.source == source:
+        return snapshot
+
+    rows = read_rows()
+    if rows is None:
+        # Source unavailable, a snapshot of an earlier state is better than none
+        return snapshot
+    if snapshot is not None and snapshot.checksum == rows_checksum(rows):
+        # The state moved on without changing the rows (e.g. a row updated to the same text), record the new state
+        if source != NO_SOURCE:
+            try:
+                with open(path, 'r+b') as file:
+                    file.seek(SOURCE_OFFSET)
+                    file.write(source)
+                snapshot.source = source
+            except OSError as error:
+                print(error)
+        return snapshot
+
+    if snapshot is not None:
+        snapshot.close()
+    try:
+        build_snapshot(rows, path, source)
+    except OSError as error:
+        print(error)
+        return None
+    return open_snapshot(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the common password snapshot from the database or a word list')
+    parser.add_argument('output', nargs='?', default='db/common_passwords.snap', help='snapshot file')
+    parser.add_argument('--wordlist', help='text file, one password per line most common first, in place of the '
+                                           'common_passwords table')
+    args = parser.parse_args()
+
+    if args.wordlist:
+        state, rows = wordlist_state(args.wordlist), read_wordlist(args.wordlist)
+    else:
+        state, rows = get_storage().common_passwords_state(), get_storage().common_passwords()
+        if rows is None:
+            parser.error('common_passwords could not be read')
+    written = build_snapshot(rows, args.output, source_digest(state))
+    print(f'{written} passwords written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -4,16 +4,41 @@
 #  Date: 12/11/2020
 
 # Imports
+import json
+import os
+import queue
 import sqlite3
-from contextlib import closing
+import threading
+from collections import OrderedDict
+from contextlib import closing, contextmanager
 from datetime import datetime, timedelta
 from sqlite3 import Error
+from .instrumentation import timed_query, timer
 
 # Consts
 DB_PATH = 'db/pwd_db.sqlite'
+MIGRATION_PATH = 'db/migrations'
+HISTORY_DEPTH = 10  # Number of previous passwords a new password is checked against
+HISTORY_DAYS = 365  # Age in days of the oldest previous password a new password is checked against
+EXPIRY_ACTIVE = 0  # user_credentials.expiry_state, see migration 004
+EXPIRY_NOTIFIED = 1
+EXPIRY_RESET = 2
+USER_CACHE_SIZE = 1024  # Maximum number of user details held by cached_user_detail
+POOL_SIZE = 4  # Maximum number of open connections held by the connection pool
+POOL_TIMEOUT = 30  # Seconds to wait for a free pooled connection before failing
+# Applied once to each new pooled connection
+POOL_PRAGMAS = (('journal_mode', 'WAL'),
+                ('synchronous', 'NORMAL'),
+                ('cache_size', -16000),  # negative values are KiB, i.e. 16MB page cache
+                ('mmap_size', 67108864))  # 64MB memory mapped I/O
 
 # Globals
 user_credential_list = []
+user_detail_cache = OrderedDict()
+user_detail_lock = threading.Lock()
+user_detail_generation = 0  # Incremented by invalidate_user_detail, see cached_user_detail
+connection_pool = None
+connection_pool_lock = threading.Lock()
 
 
 # Main processing
@@ -30,45 +55,359 @@ def sql_connection():
         print(Error)
 
 
+class ConnectionPool:
+    """
+    Pool of SQLite connections reused across calls, each connection is only used by one thread at a time
+    """
+
+    def __init__(self, db_path, size=POOL_SIZE, pragmas=POOL_PRAGMAS, timeout=POOL_TIMEOUT):
+        """
+        :param db_path: path of the SQLite database
+        :param size: maximum number of connections to open
+        :param pragmas: (name, value) pragmas applied to each new connection
+        :param timeout: seconds to wait for a free connection once size connections are in use
+        """
+        self.db_path = db_path
+        self.size = size
+        self._pragmas = pragmas
+        self._timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+        self.closed = False
+
+    def _connect(self):
+        """
+        Open a new connection, configured with the pool pragmas
+        :return: valid database connection
+        """
+        connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        for name, value in self._pragmas:
+            connection.execute(f"PRAGMA {name} = {value};")
+        return connection
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            open_new = self._opened < self.size
+            if open_new:
+                self._opened += 1
+        if open_new:
+            try:
+                return self._connect()
+            except Error:
+                with self._lock:
+                    self._opened -= 1
+                raise
+        try:
+            return self._idle.get(timeout=self._timeout)
+        except queue.Empty:
+            raise Error("Timed out waiting for a database connection")
+
+    def _release(self, connection):
+        # Never hand on a connection part way through a transaction
+        if connection.in_transaction:
+            connection.rollback()
+        with self._lock:
+            closed = self.closed
+            if closed:
+                self._opened -= 1
+        if closed:
+            connection.close()
+        else:
+            self._idle.put(connection)
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection from the pool for the duration of a with block
+        :return: valid database connection
+        """
+        connection = self._acquire()
+        try:
+            yield connection
+        finally:
+            self._release(connection)
+
+    def close(self):
+        """
+        Close the pool. Idle connections are closed now, connections in use are closed when they are returned
+        :return: None
+        """
+        with self._lock:
+            self.closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._opened -= 1
+
+
+def configure_pool(size=POOL_SIZE, db_path=None, pragmas=POOL_PRAGMAS):
+    """
+    Replace the shared connection pool, closing the previous pool (connections still in use are closed on return)
+    :param size: maximum number of connections to open
+    :param db_path: path of the SQLite database, defaults to DB_PATH
+    :param pragmas: (name, value) pragmas applied to each new connection
+    :return: the new connection pool
+    """
+    global connection_pool
+
+    with connection_pool_lock:
+        if connection_pool is not None:
+            connection_pool.close()
+        connection_pool = ConnectionPool(db_path or DB_PATH, size=size, pragmas=pragmas)
+        return connection_pool
+
+
+def pooled_connection():
+    """
+    Borrow a connection from the shared pool, created on first use with the default settings
+    Usage: with pooled_connection() as conn:
+    :return: context manager yielding a valid database connection
+    """
+    global connection_pool
+
+    if connection_pool is None:
+        with connection_pool_lock:
+            if connection_pool is None:
+                connection_pool = ConnectionPool(DB_PATH)
+    return connection_pool.connection()
+
+
+def apply_migrations(migration_path=MIGRATION_PATH):
+    """
+    Bring the database schema up to date, applying in order each numbered script (e.g. 001_name.sql) within
+    migration_path that is newer than the database user_version. Each script is applied in its own transaction
+    :param migration_path: directory holding the migration scripts
+    :return: schema version of the database, None if a migration failed
+    """
+    scripts = sorted((int(name.split('_', 1)[0]), name) for name in os.listdir(migration_path)
+                     if name.endswith('.sql'))
+    try:
+        with pooled_connection() as conn:
+            version = conn.execute("PRAGMA user_version;").fetchone()[0]
+            for number, name in scripts:
+                if number <= version:
+                    continue
+                with open(os.path.join(migration_path, name)) as script:
+                    conn.executescript(f"BEGIN;\n{script.read()}\nPRAGMA user_version = {number};\nCOMMIT;")
+                version = number
+            return version
+    except Error as error:
+        print(error)
+        return None
+
+
 def credential_retrieval():
     """
     Generate the SQL required for user credential retrieval history
+    The user is filtered before the history is limited, so the user_cred_audit_history index serves the
+    most recent changes of that user only. user_cred_audit.user_id is declared without a type, so the join compares
+    against ua.user_id + 0 (no affinity) to allow the index to be used
+    Parameters: username, earliest date_of_change, history depth (e.g. HISTORY_DEPTH), username
     :return: SQL string to join user_accounts with user_cred_audit for user
     """
     sql_string = "SELECT * FROM " \
-                 "(SELECT * FROM (SELECT ua.user_name, uca.user_cred " \
+                 "(SELECT ua.user_name, uca.user_cred " \
                  "FROM user_accounts ua " \
-                 "JOIN user_cred_audit uca ON ua.user_id = uca.user_id " \
-                 "WHERE uca.date_of_change > ? " \
-                 "ORDER BY uca.date_of_change desc LIMIT 10)" \
+                 "JOIN user_cred_audit uca ON uca.user_id = ua.user_id + 0 " \
+                 "WHERE ua.user_name = ? " \
+                 "AND uca.date_of_change > ? " \
+                 "ORDER BY uca.date_of_change desc LIMIT ?) " \
                  "UNION ALL " \
                  "SELECT u.user_name, uc.user_cred " \
                  "FROM user_accounts u " \
-                 "JOIN user_credentials uc ON u.user_id = uc.user_id) a " \
-                 "WHERE a.user_name = ?"
+                 "JOIN user_credentials uc ON u.user_id = uc.user_id " \
+                 "WHERE u.user_name = ?"
     return sql_string
 
 
+@timed_query
 def credential_update(password, username, expiry_date):
     """
-    Update the password of the user to the new supplied details
+    Update the password of the user to the new supplied details, clearing any expiry notice or reset flag
     :param password: updated password for user
     :param username: username for the password update to be applied to
     :param expiry_date: the expiry date of the new password
     :return: If update is successful True, else False
     """
     try:
-        with closing(sql_connection()) as conn:
+        with pooled_connection() as conn:
             with closing(conn.cursor()) as cursor:
                 cursor.execute(
                     "UPDATE user_credentials "
                     "SET user_cred = ?, "
                     "expiry_date = ?, "
-                    "last_updated = ? "
+                    "last_updated = ?, "
+                    "expiry_state = ? "
                     "WHERE user_id = (SELECT user_id FROM user_accounts WHERE user_name = ?);",
-                    (password, expiry_date, datetime.now(), username))
+                    (password, expiry_date, datetime.now(), EXPIRY_ACTIVE, username))
+                conn.commit()
+    except Error:
+        return False
+    return True
+
+
+@timed_query
+def credential_rehash(username, hashed, new_hash):
+    """
+    Replace the stored hash of the current password with a stronger hash of the same password
+    Expiry and last_updated are unchanged, so no password history is written (see migration 002)
+    :param username: username of the verified user
+    :param hashed: hash the password was verified against, nothing is replaced if it is no longer current
+    :param new_hash: replacement hash of the same password
+    :return: If the hash was replaced True, else False
+    """
+    try:
+        with pooled_connection() as conn:
+            with closing(conn.cursor()) as cursor:
+                cursor.execute(
+                    "UPDATE user_credentials "
+                    "SET user_cred = ? "
+                    "WHERE user_cred = ? "
+                    "AND user_id = (SELECT user_id FROM user_accounts WHERE user_name = ?);",
+                    (new_hash, hashed, username))
                 conn.commit()
-                return True
+                replaced = cursor.rowcount == 1
+    except Error:
+        return False
+    return replaced
+
+
+@timed_query
+def flag_due_credentials(due_date, state, after=None, page_size=500):
+    """
+    Move the next page of credentials expiring on or before due_date, and not yet at state, to state
+    The page is read and flagged in one transaction, so a password changed meanwhile is never flagged
+    Served by the user_credentials_expiry partial index, the cost depends on the accounts due and not the table size
+    Expiry dates not stored as text are not dates (SQLite orders numbers before text) and are never flagged
+    :param due_date: latest expiry date to flag
+    :param state: EXPIRY_NOTIFIED or EXPIRY_RESET
+    :param after: (expiry_date, rowid) of the last credential of the previous page, None for the first page
+    :param page_size: maximum number of credentials flagged
+    :return: list of (expiry_date, rowid, user_name) flagged in expiry order, None if the update failed
+    """
+    sql_string = "SELECT uc.expiry_date, uc.rowid, ua.user_name " \
+                 "FROM user_credentials uc " \
+                 "JOIN user_accounts ua ON ua.user_id = uc.user_id " \
+                 "WHERE uc.expiry_state < 2 " \
+                 "AND uc.expiry_state < ? " \
+                 "AND uc.expiry_date <= ? " \
+                 "AND (uc.expiry_date, uc.rowid) > (?, ?) " \
+                 "ORDER BY uc.expiry_date, uc.rowid LIMIT ?;"
+    after_date, after_rowid = after or ('', 0)
+    try:
+        with pooled_connection() as conn:
+            with closing(conn.cursor()) as cursor:
+                cursor.execute("BEGIN IMMEDIATE;")
+                page = cursor.execute(sql_string, (state, due_date, after_date, after_rowid, page_size)).fetchall()
+                cursor.executemany("UPDATE user_credentials SET expiry_state = ? WHERE rowid = ?;",
+                                   [(state, rowid) for _, rowid, _ in page])
+                conn.commit()
+                return page
+    except Error:
+        return None
+
+
+@timed_query
+def purge_credential_history(cutoff, keep_count, after_user=0, batch_size=500, archive_path=None):
+    """
+    Delete the next batch of password history rows no longer needed by credential_amend: those changed on or before
+    cutoff, or beyond the keep_count most recent changes of their user. Users are visited in user_id order, read
+    through the user_cred_audit_history index, so each batch only reads the history of the users it reaches
+    :param cutoff: date_of_change on or before which history is purged
+    :param keep_count: number of most recent changes kept per user
+    :param after_user: user_id returned by the previous batch, 0 for the first batch
+    :param batch_size: maximum number of rows purged in one transaction
+    :param archive_path: SQLite database the purged rows are copied to before deletion, None to only delete
+    :return: (rows purged, user_id to continue from), None if the purge failed
+    """
+    sql_string = "SELECT audit_id, user_id FROM " \
+                 "(SELECT audit_id, user_id, date_of_change, " \
+                 "row_number() OVER (PARTITION BY user_id ORDER BY date_of_change DESC) AS position " \
+                 "FROM user_cred_audit WHERE user_id >= ?) " \
+                 "WHERE position > ? OR date_of_change <= ? LIMIT ?;"
+    archive_sql = "INSERT OR IGNORE INTO archive.user_cred_audit " \
+                  "SELECT audit_id, user_id, user_cred, date_of_change, ? FROM main.user_cred_audit " \
+                  "WHERE audit_id IN (SELECT value FROM json_each(?));"
+    try:
+        with pooled_connection() as conn:
+            with closing(conn.cursor()) as cursor:
+                if archive_path is not None:
+                    cursor.execute("ATTACH DATABASE ? AS archive;", (archive_path,))
+                try:
+                    if archive_path is not None:
+                        cursor.execute("CREATE TABLE IF NOT EXISTS archive.user_cred_audit "
+                                       "(audit_id integer PRIMARY KEY, user_id, user_cred, date_of_change, "
+                                       "archived_date);")
+                    cursor.execute("BEGIN IMMEDIATE;")
+                    batch = cursor.execute(sql_string, (after_user, keep_count, cutoff, batch_size)).fetchall()
+                    if not batch:
+                        conn.commit()
+                        return 0, after_user
+                    audit_ids = json.dumps([audit_id for audit_id, _ in batch])
+                    if archive_path is not None:
+                        cursor.execute(archive_sql, (datetime.now(), audit_ids))
+                    cursor.execute("DELETE FROM user_cred_audit WHERE audit_id IN (SELECT value FROM json_each(?));",
+                                   (audit_ids,))
+                    conn.commit()
+                    # The last user may have more rows to purge, so the next batch starts from that user
+                    return len(batch), batch[-1][1]
+                finally:
+                    if archive_path is not None:
+                        if conn.in_transaction:
+                            conn.rollback()
+                        cursor.execute("DETACH DATABASE archive;")
+    except Error:
+        return None
+
+
+def database_space():
+    """
+    Page usage of the database, for deciding whether to reclaim the space of deleted rows
+    :return: (auto_vacuum mode, page count, free page count, page size), None if unavailable
+    """
+    try:
+        with pooled_connection() as conn:
+            return tuple(conn.execute(f"PRAGMA {name};").fetchone()[0]
+                         for name in ('auto_vacuum', 'page_count', 'freelist_count', 'page_size'))
+    except Error:
+        return None
+
+
+def incremental_vacuum(pages):
+    """
+    Return up to pages free pages to the file system, needs auto_vacuum = INCREMENTAL (see enable_incremental_vacuum)
+    Each call is a short write transaction, so the space is reclaimed in steps without holding up other writers
+    :param pages: maximum number of pages released
+    :return: free pages remaining, None if the vacuum failed
+    """
+    try:
+        with pooled_connection() as conn:
+            conn.execute(f"PRAGMA incremental_vacuum({int(pages)});").fetchall()
+            return conn.execute("PRAGMA freelist_count;").fetchone()[0]
+    except Error:
+        return None
+
+
+def enable_incremental_vacuum():
+    """
+    Switch the database to auto_vacuum = INCREMENTAL. The mode of an existing database only changes on a full VACUUM,
+    which rewrites the whole file and blocks writers meanwhile, so this is a one off step run during maintenance
+    :return: True if the database is in incremental mode, else False
+    """
+    try:
+        with pooled_connection() as conn:
+            if conn.execute("PRAGMA auto_vacuum;").fetchone()[0] != 2:
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL;")
+                conn.execute("VACUUM;")
+            return conn.execute("PRAGMA auto_vacuum;").fetchone()[0] == 2
     except Error:
         return False
 
@@ -85,6 +424,37 @@ def credential_find():
     return sql_string
 
 
+def credential_history(username, since, depth):
+    """
+    Hashes a new password of the user is checked against, the current password and the most recent changes
+    :param username: username of attempted password amend
+    :param since: earliest date_of_change included
+    :param depth: maximum number of previous passwords
+    :return: list of hashes, None if the history could not be read
+    """
+    try:
+        with pooled_connection() as db, timer('credential_history'):
+            with closing(db.cursor()) as cursor:
+                return [row[1] for row in cursor.execute(credential_retrieval(), (username, since, depth, username))]
+    except Error:
+        return None
+
+
+def current_credentials(username):
+    """
+    Hash of the current password of the user, for verification prior to update
+    :param username: username of attempted password amend
+    :return: list of hashes, empty if the user or password does not exist or could not be read
+    """
+    try:
+        with pooled_connection() as db, timer('credential_verify'):
+            with closing(db.cursor()) as cursor:
+                return [row[1] for row in cursor.execute(credential_find(), (username,)) if row[1] is not None]
+    except Error:
+        return []
+
+
+@timed_query
 def create_new_user(username, forename, surname, password, expiry_days):
     """
     Creation of a new user within the database, from the details supplied by the user, within the
@@ -99,7 +469,7 @@ def create_new_user(username, forename, surname, password, expiry_days):
     creation_date = datetime.now(tz=None)
     expiry_date = datetime.now(tz=None) + timedelta(days=expiry_days)
     try:
-        with closing(sql_connection()) as conn:
+        with pooled_connection() as conn:
             with closing(conn.cursor()) as cursor:
                 """
                 Create new record within user accounts
@@ -118,11 +488,74 @@ def create_new_user(username, forename, surname, password, expiry_days):
                     "INSERT INTO user_credentials (user_id, user_cred, expiry_date, last_updated) VALUES (?, ?, ?, ?);",
                     (user_id, password, expiry_date, creation_date))
                 conn.commit()
+                invalidate_user_detail(username)
                 return True, f"User account successfully created. Your password will expire in {expiry_days} days"
     except Error:
         return False, "There was a problem creating user account"
 
 
+@timed_query
+def create_new_users(users):
+    """
+    Creation of many new users in a single transaction, as create_new_user, for bulk imports
+    Should any user conflict (e.g. a username created since it was checked) the users are inserted one at a time
+    within the same transaction, so only the conflicting users are not created
+    :param users: list of (username, forename, surname, hashed password, expiry_days)
+    :return: list of (index into users, message) of the users not created, empty if all were created
+    """
+    creation_date = datetime.now(tz=None)
+    accounts = [(username, forename, surname, creation_date) for username, forename, surname, _, _ in users]
+    credentials = [(password, creation_date + timedelta(days=expiry_days), creation_date, username)
+                   for username, _, _, password, expiry_days in users]
+    account_sql = "INSERT INTO user_accounts (user_name, forename, surname, created_date) VALUES (?, ?, ?, ?);"
+    # The user_id of each account is found through the unique user_name index, as executemany has no lastrowid
+    credential_sql = "INSERT INTO user_credentials (user_id, user_cred, expiry_date, last_updated) " \
+                     "SELECT user_id, ?, ?, ? FROM user_accounts WHERE user_name = ?;"
+    failed = []
+    try:
+        with pooled_connection() as conn:
+            with closing(conn.cursor()) as cursor:
+                try:
+                    cursor.executemany(account_sql, accounts)
+                    cursor.executemany(credential_sql, credentials)
+                    conn.commit()
+                except sqlite3.IntegrityError:
+                    conn.rollback()
+                    cursor.execute("BEGIN;")
+                    for index, (account, credential) in enumerate(zip(accounts, credentials)):
+                        cursor.execute("SAVEPOINT new_user;")
+                        try:
+                            cursor.execute(account_sql, account)
+                            cursor.execute(credential_sql, credential)
+                        except sqlite3.IntegrityError:
+                            cursor.execute("ROLLBACK TO new_user;")
+                            failed.append((index, "Username is unavailable"))
+                        cursor.execute("RELEASE new_user;")
+                    conn.commit()
+    except Error:
+        return [(index, "There was a problem creating user account") for index in range(len(users))]
+    for username, _, _, _, _ in users:
+        invalidate_user_detail(username)
+    return failed
+
+
+@timed_query
+def existing_usernames(usernames):
+    """
+    Find which of the usernames are already in use, in a single query whatever the number of usernames
+    :param usernames: list of potential new usernames
+    :return: set of the usernames already in use, None if the check failed
+    """
+    sql_string = "SELECT user_name FROM user_accounts WHERE user_name IN (SELECT value FROM json_each(?));"
+    try:
+        with pooled_connection() as db:
+            with closing(db.cursor()) as cursor:
+                return {row[0] for row in cursor.execute(sql_string, (json.dumps(usernames),))}
+    except Error:
+        return None
+
+
+@timed_query
 def check_username(username):
     """
     Check if the selected username is available when creating a new user
@@ -131,7 +564,7 @@ def check_username(username):
     """
     sql_string = "SELECT * FROM user_accounts WHERE user_name = ?; "
     try:
-        with closing(sql_connection()) as db:
+        with pooled_connection() as db:
             with closing(db.cursor()) as cursor:
                 user_credentials = cursor.execute(sql_string, (username,)).fetchall()
                 if len(user_credentials) == 0:
@@ -142,6 +575,7 @@ def check_username(username):
         return False, "There was a problem creating user account"
 
 
+@timed_query
 def common_passwords():
     """
     Gather the 1000 most common password phrases/sequences from the database into a list,
@@ -150,7 +584,7 @@ def common_passwords():
     """
     sql_string = "SELECT id, password_text FROM common_passwords ORDER BY id;"
     try:
-        with closing(sql_connection()) as db:
+        with pooled_connection() as db:
             with closing(db.cursor()) as cursor:
                 password_list = cursor.execute(sql_string).fetchall()
                 return password_list
@@ -158,6 +592,22 @@ def common_passwords():
         return None
 
 
+@timed_query
+def common_passwords_state():
+    """
+    Change state of the common_passwords table, maintained by triggers (migration 003) so it is read in constant time
+    :return: (token, row count, change count), None if unavailable
+    """
+    sql_string = "SELECT token, row_count, change_count FROM common_password_state WHERE id = 1;"
+    try:
+        with pooled_connection() as db:
+            with closing(db.cursor()) as cursor:
+                return cursor.execute(sql_string).fetchone()
+    except Error:
+        return None
+
+
+@timed_query
 def user_list():
     """
     Gather a list of user credentials to check if username, forename, or surname is used within the password
@@ -168,9 +618,58 @@ def user_list():
     """
     sql_string = "SELECT user_name, forename, surname FROM user_accounts ORDER BY user_name;"
     try:
-        with closing(sql_connection()) as db:
+        with pooled_connection() as db:
             with closing(db.cursor()) as cursor:
                 user_details = cursor.execute(sql_string).fetchall()
                 return user_details
     except Error:
         return None
+
+
+def cached_user_detail(username):
+    """
+    Gather the details of a single user by username, held in a least recently used cache of USER_CACHE_SIZE entries
+    Used in place of user_list where the whole user table is too large to hold in memory. Unknown users are not
+    cached, so a user created by another process is found on the next lookup
+    :param username: username to retrieve details for
+    :return: (user_name, forename, surname) of the user, None if the user does not exist
+    """
+    with user_detail_lock:
+        if username in user_detail_cache:
+            user_detail_cache.move_to_end(username)
+            return user_detail_cache[username]
+        generation = user_detail_generation
+
+    sql_string = "SELECT user_name, forename, surname FROM user_accounts WHERE user_name = ?;"
+    try:
+        with pooled_connection() as db, timer('user_detail'):
+            with closing(db.cursor()) as cursor:
+                user_detail = cursor.execute(sql_string, (username,)).fetchone()
+    except Error:
+        # Do not cache failed lookups
+        return None
+    if user_detail is None:
+        return None
+
+    with user_detail_lock:
+        # An invalidation during the read (e.g. the user was just created) may make the result stale, do not cache it
+        if generation != user_detail_generation:
+            return user_detail
+        user_detail_cache[username] = user_detail
+        user_detail_cache.move_to_end(username)
+        while len(user_detail_cache) > USER_CACHE_SIZE:
+            user_detail_cache.popitem(last=False)
+    return user_detail
+
+
+def invalidate_user_detail(username):
+    """
+    Remove a user from the cached_user_detail cache, so the next lookup reads from the database
+    :param username: username to remove
+    :return: None
+    """
+    global user_detail_generation
+
+    with user_detail_lock:
+        user_detail_generation += 1
+        user_detail_cache.pop(username, None)
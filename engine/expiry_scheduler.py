@@ -0,0 +1,165 @@
+#!/usr/bin/python3
+#  File: expiry_scheduler.py
+#  Description: Periodic sweep of expiring and expired passwords, flagging accounts and sending notices in batches
+#  Author: Christopher Hindson
+#  Date: 18/10/2026
+
+# Imports
+import argparse
+import json
+import threading
+from datetime import datetime, timedelta
+from .db_access import EXPIRY_NOTIFIED, EXPIRY_RESET
+from .storage import get_storage
+
+# Consts
+SWEEP_INTERVAL = 3600  # Seconds between the sweeps of the scheduler
+NOTICE_DAYS = 14  # Accounts are sent an expiry notice this many days before their password expires
+PAGE_SIZE = 500  # Credentials flagged in one transaction and notified in one batch
+EVENTS = {EXPIRY_NOTIFIED: 'expiring', EXPIRY_RESET: 'reset_required'}
+
+# Globals
+scheduler = None
+scheduler_lock = threading.Lock()
+
+
+# Main processing
+def print_notifications(event, accounts):
+    """
+    Default notifier, a line per batch
+    :param event: 'expiring' or 'reset_required'
+    :param accounts: list of (username, expiry_date)
+    :return: None
+    """
+    print(f'{len(accounts)} accounts {event}, expiring {accounts[0][1]} to {accounts[-1][1]}', flush=True)
+
+
+def outbox_notifier(path):
+    """
+    Notifier appending a JSON line per account to path, for a mail or messaging job to send on
+    :param path: outbox file
+    :return: notifier function
+    """
+    lock = threading.Lock()
+
+    def notify(event, accounts):
+        lines = ''.join(json.dumps({'event': event, 'username': username, 'expiry_date': expiry_date}) + '\n'
+                        for username, expiry_date in accounts)
+        with lock, open(path, 'a', encoding='utf-8') as file:
+            file.write(lines)
+    return notify
+
+
+def sweep_state(due_date, state, notifier, page_size):
+    """
+    Flag the credentials due for state a page at a time, notifying each page once it is flagged
+    Notices are sent at most once, a page is not sent again should the notifier fail
+    :return: number of accounts moved to state
+    """
+    swept = 0
+    after = None
+    while True:
+        page = get_storage().flag_due_credentials(due_date, state, after, page_size)
+        if not page:
+            return swept
+        swept += len(page)
+        notifier(EVENTS[state], [(username, expiry_date) for expiry_date, _, username in page])
+        if len(page) < page_size:
+            return swept
+        after = page[-1][:2]
+
+
+def sweep(now=None, notice_days=NOTICE_DAYS, page_size=PAGE_SIZE, notifier=print_notifications):
+    """
+    Flag expired passwords for reset, then send notices for passwords expiring within notice_days
+    Expired passwords are flagged first, so an account is not sent a notice and flagged in the same sweep
+    :param now: time of the sweep, defaults to the current time
+    :param notice_days: days before expiry a notice is sent
+    :param page_size: credentials per transaction and notification batch
+    :param notifier: called with (event, list of (username, expiry_date)) for each batch
+    :return: {event: number of accounts}
+    """
+    now = now or datetime.now(tz=None)
+    return {EVENTS[EXPIRY_RESET]: sweep_state(now, EXPIRY_RESET, notifier, page_size),
+            EVENTS[EXPIRY_NOTIFIED]: sweep_state(now + timedelta(days=notice_days), EXPIRY_NOTIFIED, notifier,
+                                                 page_size)}
+
+
+class ExpiryScheduler(threading.Thread):
+    """
+    Background thread sweeping every interval seconds, starting straight away
+    """
+
+    def __init__(self, interval=SWEEP_INTERVAL, notifier=print_notifications, notice_days=NOTICE_DAYS,
+                 page_size=PAGE_SIZE):
+        super().__init__(name='expiry-scheduler', daemon=True)
+        self.interval = interval
+        self.notifier = notifier
+        self.notice_days = notice_days
+        self.page_size = page_size
+        self._stopped = threading.Event()
+
+    def run(self):
+        while True:
+            try:
+                sweep(notice_days=self.notice_days, page_size=self.page_size, notifier=self.notifier)
+            except Exception as error:
+                # A failed sweep is retried at the next interval
+                print(f'Expiry sweep failed: {error}', flush=True)
+            if self._stopped.wait(self.interval):
+                return
+
+    def stop(self):
+        self._stopped.set()
+
+
+def start_expiry_scheduler(interval=SWEEP_INTERVAL, notifier=print_notifications, notice_days=NOTICE_DAYS):
+    """
+    Start the shared scheduler thread, if not already running
+    :return: the running ExpiryScheduler
+    """
+    global scheduler
+
+    with scheduler_lock:
+        if scheduler is None or not scheduler.is_alive():
+            scheduler = ExpiryScheduler(interval, notifier, notice_days)
+            scheduler.start()
+        return scheduler
+
+
+def stop_expiry_scheduler():
+    """
+    Stop the shared scheduler thread, a sweep in progress finishes first
+    :return: None
+    """
+    global scheduler
+
+    with scheduler_lock:
+        if scheduler is not None:
+            scheduler.stop()
+            scheduler.join()
+            scheduler = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Flag expired passwords and send expiry notices')
+    parser.add_argument('--once', action='store_true', help='sweep once and exit, e.g. from cron')
+    parser.add_argument('--interval', type=float, default=SWEEP_INTERVAL, help='seconds between sweeps')
+    parser.add_argument('--notice-days', type=int, default=NOTICE_DAYS)
+    parser.add_argument('--outbox', help='append notices to this file as JSON lines, else print a line per batch')
+    args = parser.parse_args()
+
+    if get_storage().apply_migrations() is None:
+        parser.exit(1, 'Database could not be updated\n')
+    notifier = outbox_notifier(args.outbox) if args.outbox else print_notifications
+    if args.once:
+        print(sweep(notice_days=args.notice_days, notifier=notifier))
+        return
+    try:
+        start_expiry_scheduler(args.interval, notifier, args.notice_days).join()
+    except KeyboardInterrupt:
+        stop_expiry_scheduler()
+
+
+if __name__ == '__main__':
+    main()
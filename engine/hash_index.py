@@ -0,0 +1,243 @@
+#!/usr/bin/python3
+#  File: hash_index.py
+#  Description: Sorted fixed width index of breached password hashes (HIBP style), memory-mapped for lookups
+#  Author: Christopher Hindson
+#  Date: 18/10/2026
+
+# Imports
+import argparse
+import hashlib
+import heapq
+import mmap
+import os
+import struct
+import tempfile
+from .atomic_file import atomic_write
+
+# Consts
+MAGIC = b'PWHASH'
+VERSION = 1
+HEADER = struct.Struct('<6sBBIQ')  # magic, version, algorithm id, digest size, record count
+COUNT = struct.Struct('>I')  # Breach count stored after each digest, saturates at 2**32 - 1
+MAX_COUNT = 2 ** 32 - 1
+RUN_SIZE = 2000000  # Records sorted in memory at once, larger inputs are merged from temporary run files
+# Algorithm name: (id, digest size, key struct over the digest for comparisons without copying)
+ALGORITHMS = {'sha1': (1, 20, struct.Struct('>QQI')),
+              'ntlm': (2, 16, struct.Struct('>QQ'))}
+ALGORITHM_NAMES = {algorithm_id: name for name, (algorithm_id, _, _) in ALGORITHMS.items()}
+
+
+# Main processing
+def password_digest(password, algorithm='sha1'):
+    """
+    Digest of a password as held in the breach dumps, SHA-1 of the UTF-8 password or NTLM (MD4 of UTF-16LE)
+    :param password: password candidate, case sensitive
+    :param algorithm: 'sha1' or 'ntlm', ntlm requires MD4 support in the hashlib OpenSSL build
+    :return: digest bytes
+    """
+    if algorithm == 'ntlm':
+        return hashlib.new('md4', password.encode('utf-16-le')).digest()
+    return hashlib.sha1(password.encode('utf-8')).digest()
+
+
+class HashIndex:
+    """
+    Read only, memory-mapped index written by build_hash_index
+    Lookups unpack the digests in place with struct.unpack_from, no record is copied out of the map
+    """
+
+    def __init__(self, path):
+        """
+        :param path: index file
+        """
+        with open(path, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, algorithm_id, self.digest_size, self.records = HEADER.unpack_from(self._map)
+        self.algorithm = ALGORITHM_NAMES.get(algorithm_id)
+        if magic != MAGIC or version != VERSION or self.algorithm is None:
+            self._map.close()
+            raise ValueError(f'{path} is not a version {VERSION} password hash index')
+        if hasattr(mmap, 'MADV_RANDOM'):
+            # Lookups touch a few scattered pages, read ahead would only pull in pages that are never used
+            self._map.madvise(mmap.MADV_RANDOM)
+        self._key = ALGORITHMS[self.algorithm][2]
+        self._record_size = self.digest_size + COUNT.size
+        if len(self._map) < HEADER.size + self.records * self._record_size:
+            self._map.close()
+            raise ValueError(f'{path} is truncated')
+
+    def __len__(self):
+        return self.records
+
+    def count(self, digest):
+        """
+        Breach count of a digest, interpolation search on the leading 64 bits (hashes are uniformly distributed),
+        narrowing to binary search should the interpolation stop converging
+        :param digest: digest bytes of the index algorithm
+        :return: number of times seen in the breach dumps, 0 if not present
+        """
+        data = self._map
+        key = self._key
+        record_size = self._record_size
+        target = key.unpack(digest)
+        low, high = 0, self.records - 1
+        interpolate = True
+        while low <= high:
+            low_key = key.unpack_from(data, HEADER.size + low * record_size)
+            high_key = key.unpack_from(data, HEADER.size + high * record_size)
+            if target < low_key or target > high_key:
+                return 0
+            if interpolate and high_key[0] > low_key[0]:
+                middle = low + (high - low) * (target[0] - low_key[0]) // (high_key[0] - low_key[0])
+            else:
+                middle = (low + high) // 2
+            offset = HEADER.size + middle * record_size
+            middle_key = key.unpack_from(data, offset)
+            if middle_key == target:
+                return COUNT.unpack_from(data, offset + self.digest_size)[0]
+            # Interpolation is only kept while it removes at least half of the range
+            width = high - low
+            if middle_key < target:
+                low = middle + 1
+            else:
+                high = middle - 1
+            interpolate = high - low < width // 2
+        return 0
+
+    def password_count(self, password):
+        """
+        :param password: password candidate, case sensitive
+        :return: breach count of the password
+        """
+        return self.count(password_digest(password, self.algorithm))
+
+    def close(self):
+        self._map.close()
+
+
+def read_hash_file(path, digest_size, plain=False):
+    """
+    Records from a breach dump, either HIBP 'HEXDIGEST:COUNT' lines or plain passwords (one per line, counted 1)
+    :param path: text file
+    :param digest_size: digest size of the algorithm, hex digests of another length are skipped
+    :param plain: If True lines are passwords to be hashed with SHA-1
+    :return: generator of (digest bytes, count)
+    """
+    with open(path, encoding='utf-8', errors='replace') as file:
+        for line in file:
+            line = line.rstrip('\r\n')
+            if not line:
+                continue
+            if plain:
+                yield password_digest(line), 1
+                continue
+            hex_digest, _, count = line.partition(':')
+            if len(hex_digest) == digest_size * 2:
+                yield bytes.fromhex(hex_digest), int(count or 1)
+
+
+def sorted_records(records, directory):
+    """
+    Sort records by digest, in memory sorted runs of RUN_SIZE merged from temporary files
+    :param records: iterable of (digest, count)
+    :param directory: directory for the temporary run files
+    :return: iterator of (digest, count) in digest order
+    """
+    runs = []
+    run = []
+    for record in records:
+        run.append(record)
+        if len(run) >= RUN_SIZE:
+            runs.append(write_run(sorted(run), directory))
+            run = []
+    if not runs:
+        return iter(sorted(run))
+    runs.append(write_run(sorted(run), directory))
+    return heapq.merge(*(read_run(path) for path in runs))
+
+
+def checked_order(records):
+    """
+    Pass through records expected in digest order (as HIBP downloads are), raising ValueError if they are not
+    """
+    previous = b''
+    for digest, count in records:
+        if digest < previous:
+            raise ValueError('Records are not in hash order, build without presorted')
+        previous = digest
+        yield digest, count
+
+
+def write_run(run, directory):
+    handle, path = tempfile.mkstemp(dir=directory, suffix='.run')
+    with os.fdopen(handle, 'wb') as file:
+        for digest, count in run:
+            file.write(struct.pack('>B', len(digest)) + digest + COUNT.pack(min(count, MAX_COUNT)))
+    return path
+
+
+def read_run(path):
+    with open(path, 'rb') as file:
+        while True:
+            size = file.read(1)
+            if not size:
+                break
+            record = file.read(size[0] + COUNT.size)
+            yield record[:size[0]], COUNT.unpack_from(record, size[0])[0]
+    os.remove(path)
+
+
+def build_hash_index(records, path, algorithm='sha1', presorted=False):
+    """
+    Write a sorted fixed width index of (digest, breach count) records, duplicate digests have their counts summed
+    The file is replaced through atomic_write
+    :param records: iterable of (digest bytes, count)
+    :param path: index file to create
+    :param algorithm: 'sha1' or 'ntlm'
+    :param presorted: If True records are already in digest order and are streamed straight to the index,
+    else they are sorted through temporary run files
+    :return: number of records written
+    """
+    algorithm_id, digest_size, _ = ALGORITHMS[algorithm]
+    written = 0
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(path))) as directory, \
+            atomic_write(path) as file:
+        file.write(HEADER.pack(MAGIC, VERSION, algorithm_id, digest_size, 0))
+        current, total = None, 0
+        ordered = checked_order(records) if presorted else sorted_records(records, directory)
+        for digest, count in ordered:
+            if digest != current:
+                if len(digest) != digest_size:
+                    raise ValueError(f'{digest.hex()} is not a {algorithm} digest')
+                if current is not None:
+                    file.write(current + COUNT.pack(min(total, MAX_COUNT)))
+                    written += 1
+                current, total = digest, 0
+            total += count
+        if current is not None:
+            file.write(current + COUNT.pack(min(total, MAX_COUNT)))
+            written += 1
+        file.seek(0)
+        file.write(HEADER.pack(MAGIC, VERSION, algorithm_id, digest_size, written))
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build a breached password hash index from a breach dump')
+    parser.add_argument('dump', help='HIBP style HEXDIGEST:COUNT lines, or passwords with --plain')
+    parser.add_argument('output', help='index file, e.g. db/breached.idx')
+    parser.add_argument('--algorithm', choices=sorted(ALGORITHMS), default='sha1')
+    parser.add_argument('--plain', action='store_true', help='dump holds plain passwords, hashed with SHA-1')
+    parser.add_argument('--sorted', action='store_true', help='dump is already in hash order, as HIBP downloads')
+    args = parser.parse_args()
+    if args.plain and args.algorithm != 'sha1':
+        parser.error('--plain builds a sha1 index')
+
+    digest_size = ALGORITHMS[args.algorithm][1]
+    written = build_hash_index(read_hash_file(args.dump, digest_size, args.plain), args.output, args.algorithm,
+                               presorted=args.sorted)
+    print(f'{written} {args.algorithm} hashes written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
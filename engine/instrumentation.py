@@ -0,0 +1,262 @@
+#!/usr/bin/python3
+#  File: instrumentation.py
+#  Description: Opt-in timing histograms of engine functions and database queries, and cProfile session reports
+#  Author: Christopher Hindson
+#  Date: 18/10/2026
+
+# Imports
+import atexit
+import cProfile
+import json
+import os
+import pstats
+import sys
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from time import perf_counter
+
+# Consts
+METRICS_ENV = 'PWD_METRICS'  # 1, true, yes or on to record timings, read once when the engine is imported
+METRICS_ENV_ON = ('1', 'true', 'yes', 'on')  # Any other value (e.g. 0, false) leaves timings off
+METRICS_FILE_ENV = 'PWD_METRICS_FILE'  # Also enables timings, written to this file at exit (.json, else Prometheus)
+PROFILE_ENV = 'PWD_PROFILE'  # cProfile the session, pstats written to this file at exit and a report to stderr
+PROFILE_LINES = 30  # Functions listed in the stderr report, by cumulative time
+FUNCTION_METRIC = 'pwd_function_seconds'
+QUERY_METRIC = 'pwd_db_query_seconds'
+# Metric name: (label name, help text)
+METRICS = {FUNCTION_METRIC: ('function', 'Time spent in engine functions'),
+           QUERY_METRIC: ('query', 'Time spent in database queries, including fetching the rows')}
+# Histogram bucket upper bounds in seconds, from the microsecond checks up to password hashing
+BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+           0.25, 0.5, 1.0, 2.5, 5.0)
+NULL_TIMER = nullcontext()  # Returned by timer when timings are disabled
+
+# Globals
+metrics_enabled = False
+histograms = {}  # (metric, label): Histogram
+histograms_lock = threading.Lock()
+profiles = []  # cProfile.Profile of each profiled thread
+profiles_lock = threading.Lock()
+
+
+# Main processing
+class Histogram:
+    """
+    Cumulative timing histogram of a single function or query, safe to observe from several threads
+    """
+
+    def __init__(self, bounds=BUCKETS):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)  # Last bucket holds observations above the largest bound
+        self.count = 0
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        index = bisect_left(self.bounds, seconds)
+        with self._lock:
+            self.buckets[index] += 1
+            self.count += 1
+            self.total += seconds
+
+    def snapshot(self):
+        """
+        :return: count, sum of seconds, and the cumulative count of each bucket ('+Inf' last)
+        """
+        with self._lock:
+            buckets, count, total = list(self.buckets), self.count, self.total
+        cumulative = {}
+        running = 0
+        for bound, bucket in zip(self.bounds + ('+Inf',), buckets):
+            running += bucket
+            cumulative[str(bound)] = running
+        return {'count': count, 'sum': total, 'buckets': cumulative}
+
+    def reset(self):
+        with self._lock:
+            self.buckets = [0] * len(self.buckets)
+            self.count = 0
+            self.total = 0.0
+
+
+def histogram(metric, label):
+    """
+    :return: the Histogram of label within metric, created on first use
+    """
+    with histograms_lock:
+        found = histograms.get((metric, label))
+        if found is None:
+            found = histograms[(metric, label)] = Histogram()
+        return found
+
+
+def instrument(function, metric):
+    """
+    Wrap function to record its time in metric, labelled with its qualified name. With timings disabled the
+    function is returned unwrapped, so instrumented code costs nothing unless PWD_METRICS was set before the
+    engine was imported
+    """
+    if not metrics_enabled:
+        return function
+    observed = histogram(metric, function.__qualname__)
+
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        start = perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            observed.observe(perf_counter() - start)
+    return wrapper
+
+
+def timed(function):
+    """
+    Decorator recording the time of each call of an engine function
+    """
+    return instrument(function, FUNCTION_METRIC)
+
+
+def timed_query(function):
+    """
+    Decorator recording the time of each call of a db_access query function
+    """
+    return instrument(function, QUERY_METRIC)
+
+
+def timer(label, metric=QUERY_METRIC):
+    """
+    Context manager recording the time of a block, for queries run inline rather than through a db_access function
+    :return: context manager, a shared no-op when timings are disabled
+    """
+    if not metrics_enabled:
+        return NULL_TIMER
+    return observe_block(histogram(metric, label))
+
+
+@contextmanager
+def observe_block(observed):
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        observed.observe(perf_counter() - start)
+
+
+def metrics_json():
+    """
+    :return: {metric: {label: {'count', 'sum', 'buckets'}}} of every histogram recorded
+    """
+    with histograms_lock:
+        items = sorted(histograms.items())
+    result = {metric: {} for metric in METRICS}
+    for (metric, label), observed in items:
+        result[metric][label] = observed.snapshot()
+    return result
+
+
+def prometheus_text():
+    """
+    :return: every histogram recorded, in the Prometheus text exposition format
+    """
+    lines = []
+    for metric, labels in metrics_json().items():
+        label_name, help_text = METRICS[metric]
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} histogram')
+        for label, observed in labels.items():
+            for bound, count in observed['buckets'].items():
+                lines.append(f'{metric}_bucket{{{label_name}="{label}",le="{bound}"}} {count}')
+            lines.append(f'{metric}_sum{{{label_name}="{label}"}} {observed["sum"]:.9f}')
+            lines.append(f'{metric}_count{{{label_name}="{label}"}} {observed["count"]}')
+    return '\n'.join(lines) + '\n'
+
+
+def reset_metrics():
+    with histograms_lock:
+        for observed in histograms.values():
+            observed.reset()
+
+
+def write_metrics(path):
+    with open(path, 'w') as file:
+        if path.endswith('.json'):
+            json.dump(metrics_json(), file, indent=2)
+        else:
+            file.write(prometheus_text())
+
+
+def start_profiling(path):
+    """
+    Profile the session with cProfile, written to path at exit. Before Python 3.12 cProfile sees a single thread,
+    so each thread started afterwards is given a profile of its own and the profiles are merged at exit
+    :param path: pstats file, read with python -m pstats
+    """
+    profile = cProfile.Profile()
+    profiles.append(profile)
+    if sys.version_info < (3, 12):
+        threading.setprofile(profile_new_thread)
+    atexit.register(write_profile, path)
+    profile.enable()
+
+
+def profile_new_thread(frame, event, arg):
+    # threading profile hook, called once in each new thread where it is replaced by a cProfile profile
+    profile = cProfile.Profile()
+    with profiles_lock:
+        profiles.append(profile)
+    profile.enable()
+
+
+@contextmanager
+def profile_thread():
+    """
+    Profile the block when run on a thread not started through threading (e.g. the Qt thread pool)
+    Only needed before Python 3.12, and a no-op unless the session is being profiled
+    """
+    if not profiles or sys.version_info >= (3, 12) or sys.getprofile() is not None:
+        yield
+        return
+    profile = cProfile.Profile()
+    with profiles_lock:
+        profiles.append(profile)
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+
+
+def write_profile(path):
+    """
+    Merge the profile of each thread, write it to path and report the most expensive functions to stderr
+    """
+    with profiles_lock:
+        collected = list(profiles)
+    stats = pstats.Stats(collected[0], stream=sys.stderr)
+    for profile in collected[1:]:
+        stats.add(profile)
+    stats.dump_stats(path)
+    print(f'Profile written to {path}', file=sys.stderr)
+    stats.sort_stats('cumulative').print_stats(PROFILE_LINES)
+
+
+def configure_from_environment():
+    """
+    Enable timings and profiling as set in the environment. The file settings are removed from the environment,
+    so worker processes started by the engine do not overwrite the reports of this process
+    """
+    global metrics_enabled
+
+    metrics_file = os.environ.pop(METRICS_FILE_ENV, None)
+    metrics_enabled = os.environ.get(METRICS_ENV, '').strip().lower() in METRICS_ENV_ON or bool(metrics_file)
+    if metrics_file:
+        atexit.register(write_metrics, metrics_file)
+    profile_file = os.environ.pop(PROFILE_ENV, None)
+    if profile_file:
+        start_profiling(profile_file)
+
+
+configure_from_environment()
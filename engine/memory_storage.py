@@ -0,0 +1,236 @@
+#  File: memory_storage.py
+#  Description: Storage held in process memory, for tests, benchmarks and load tests without database I/O
+#  Author: Christopher Hindson
+#  Date: 18/10/2026
+
+# Imports
+import heapq
+import itertools
+import secrets
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import datetime, timedelta
+from .db_access import EXPIRY_ACTIVE
+from .storage import Storage
+from .text_hashing import invalidate_verifications
+
+# Consts
+MEMORY_SCHEMA_VERSION = 5  # Matches the SQLite schema after db/migrations/005
+
+# Globals
+
+
+# Main processing
+def as_stored(value):
+    # Dates are held as the text SQLite stores them as, so results and comparisons match SQLiteStorage
+    return str(value) if isinstance(value, datetime) else value
+
+
+class MemoryStorage(Storage):
+    """
+    Users, credentials, password history and common passwords in dicts behind a single lock.
+    Behaves as SQLiteStorage, including the history written when a password is changed (migration 002)
+    """
+
+    persistent = False
+
+    def __init__(self, common_passwords=()):
+        """
+        :param common_passwords: (id, password_text) rows, most common first
+        """
+        self._lock = threading.RLock()
+        self._user_ids = itertools.count(1)
+        self._audit_ids = itertools.count(1)
+        self._users = {}  # user_name: [user_id, forename, surname, created_date]
+        self._credentials = {}  # user_id: [user_cred, expiry_date, last_updated, expiry_state]
+        self._history = {}  # user_id: list of [audit_id, user_cred, date_of_change], oldest first
+        self._names = {}  # user_id: user_name
+        self._common = list(common_passwords)
+        self._common_token = secrets.token_hex(8)
+        self._common_changes = 0
+
+    def __getstate__(self):
+        # Picklable for spawned workers, each worker then holds its own copy
+        with self._lock:
+            state = self.__dict__.copy()
+            state['_user_ids'] = next(self._user_ids)
+            state['_audit_ids'] = next(self._audit_ids)
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+        self._user_ids = itertools.count(state['_user_ids'])
+        self._audit_ids = itertools.count(state['_audit_ids'])
+
+    def worker_storage(self):
+        return self
+
+    def apply_migrations(self):
+        return MEMORY_SCHEMA_VERSION
+
+    def load_database(self, db_path):
+        """
+        Copy the users, credentials, password history and common passwords of a SQLite database, migrated to
+        version 4 or later
+        :param db_path: database to copy
+        :return: self
+        """
+        with closing(sqlite3.connect(db_path)) as conn, self._lock:
+            self._common = conn.execute("SELECT id, password_text FROM common_passwords ORDER BY id;").fetchall()
+            self._common_changes += 1
+            for user_id, user_name, forename, surname, created_date in conn.execute(
+                    "SELECT user_id, user_name, forename, surname, created_date FROM user_accounts ORDER BY user_id;"):
+                self._users[user_name] = [user_id, forename, surname, created_date]
+                self._names[user_id] = user_name
+            for user_id, user_cred, expiry_date, last_updated, expiry_state in conn.execute(
+                    "SELECT user_id, user_cred, expiry_date, last_updated, expiry_state FROM user_credentials;"):
+                self._credentials[user_id] = [user_cred, expiry_date, last_updated, expiry_state]
+            for audit_id, user_id, user_cred, date_of_change in conn.execute(
+                    "SELECT audit_id, user_id, user_cred, date_of_change FROM user_cred_audit ORDER BY audit_id;"):
+                self._history.setdefault(user_id, []).append([audit_id, user_cred, date_of_change])
+            self._user_ids = itertools.count(max(self._names, default=0) + 1)
+            self._audit_ids = itertools.count(max((rows[-1][0] for rows in self._history.values()), default=0) + 1)
+        return self
+
+    # Users
+    def check_username(self, username):
+        with self._lock:
+            if username in self._users:
+                return False, "Username is unavailable"
+        return True, "Username is available"
+
+    def existing_usernames(self, usernames):
+        with self._lock:
+            return {username for username in usernames if username in self._users}
+
+    def _add_user(self, username, forename, surname, password, expiry_days, creation_date):
+        if username in self._users:
+            return False
+        user_id = next(self._user_ids)
+        self._users[username] = [user_id, forename, surname, as_stored(creation_date)]
+        self._names[user_id] = username
+        self._credentials[user_id] = [password, as_stored(creation_date + timedelta(days=expiry_days)),
+                                      as_stored(creation_date), EXPIRY_ACTIVE]
+        return True
+
+    def create_new_user(self, username, forename, surname, password, expiry_days):
+        with self._lock:
+            if not self._add_user(username, forename, surname, password, expiry_days, datetime.now(tz=None)):
+                return False, "There was a problem creating user account"
+        return True, f"User account successfully created. Your password will expire in {expiry_days} days"
+
+    def create_new_users(self, users):
+        creation_date = datetime.now(tz=None)
+        with self._lock:
+            return [(index, "Username is unavailable") for index, user in enumerate(users)
+                    if not self._add_user(*user, creation_date)]
+
+    def user_list(self):
+        with self._lock:
+            return sorted((username, user[1], user[2]) for username, user in self._users.items())
+
+    def user_detail(self, username):
+        with self._lock:
+            user = self._users.get(username)
+            return None if user is None else (username, user[1], user[2])
+
+    # Credentials and password history
+    def _user_credential(self, username):
+        user = self._users.get(username)
+        return None if user is None else self._credentials.get(user[0])
+
+    def current_credentials(self, username):
+        with self._lock:
+            credential = self._user_credential(username)
+            return [] if credential is None else [credential[0]]
+
+    def credential_history(self, username, since, depth):
+        since = as_stored(since)
+        with self._lock:
+            user = self._users.get(username)
+            if user is None:
+                return []
+            history = [row for row in self._history.get(user[0], ()) if row[2] > since]
+            history.sort(key=lambda row: row[2], reverse=True)
+            hashes = [user_cred for _, user_cred, _ in history[:depth]]
+            credential = self._credentials.get(user[0])
+            if credential is not None:
+                hashes.append(credential[0])
+            return hashes
+
+    def credential_update(self, password, username, expiry_date):
+        now = as_stored(datetime.now(tz=None))
+        with self._lock:
+            user = self._users.get(username)
+            credential = None if user is None else self._credentials.get(user[0])
+            if credential is None:
+                # As an UPDATE matching no rows
+                return True
+            replaced = credential[0]
+            if credential[2] != now:
+                self._history.setdefault(user[0], []).append([next(self._audit_ids), replaced, now])
+            credential[:] = [password, as_stored(expiry_date), now, EXPIRY_ACTIVE]
+        invalidate_verifications(replaced)
+        return True
+
+    def credential_rehash(self, username, hashed, new_hash):
+        with self._lock:
+            credential = self._user_credential(username)
+            if credential is None or credential[0] != hashed:
+                return False
+            credential[0] = new_hash
+        invalidate_verifications(hashed)
+        return True
+
+    def flag_due_credentials(self, due_date, state, after=None, page_size=500):
+        due_date = as_stored(due_date)
+        after = after or ('', 0)
+        with self._lock:
+            # Dates not held as text are never flagged, as in SQLite. state is at most EXPIRY_RESET
+            page = heapq.nsmallest(page_size, ((credential[1], user_id) for user_id, credential
+                                               in self._credentials.items()
+                                               if credential[3] < state
+                                               and isinstance(credential[1], str)
+                                               and after < (credential[1], user_id) and credential[1] <= due_date))
+            for _, user_id in page:
+                self._credentials[user_id][3] = state
+            return [(expiry_date, user_id, self._names[user_id]) for expiry_date, user_id in page]
+
+    def purge_credential_history(self, cutoff, keep_count, after_user=0, batch_size=500, archive_path=None):
+        cutoff = as_stored(cutoff)
+        with self._lock:
+            purged = []
+            for user_id in sorted(user_id for user_id in self._history if user_id >= after_user):
+                history = sorted(self._history[user_id], key=lambda row: row[2], reverse=True)
+                expired = [row for position, row in enumerate(history) if position >= keep_count or row[2] <= cutoff]
+                purged.extend((user_id, row) for row in expired[:batch_size - len(purged)])
+                if len(purged) == batch_size:
+                    break
+            if not purged:
+                return 0, after_user
+            if archive_path is not None:
+                try:
+                    with closing(sqlite3.connect(archive_path)) as archive, archive:
+                        archive.execute("CREATE TABLE IF NOT EXISTS user_cred_audit "
+                                        "(audit_id integer PRIMARY KEY, user_id, user_cred, date_of_change, "
+                                        "archived_date);")
+                        archive.executemany("INSERT OR IGNORE INTO user_cred_audit VALUES (?, ?, ?, ?, ?);",
+                                            [(row[0], user_id, row[1], row[2], as_stored(datetime.now()))
+                                             for user_id, row in purged])
+                except sqlite3.Error:
+                    return None
+            for user_id, row in purged:
+                self._history[user_id].remove(row)
+            return len(purged), purged[-1][0]
+
+    # Common passwords
+    def common_passwords(self):
+        with self._lock:
+            return list(self._common)
+
+    def common_passwords_state(self):
+        with self._lock:
+            return self._common_token, len(self._common), self._common_changes
@@ -4,21 +4,48 @@
 #  Date: 31/10/2020
 
 # Imports
-import re
+import os
+import string
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from math import log2
-from .db_access import *
-from .text_hashing import verify_hashed_password, hash_password
+from .db_access import HISTORY_DAYS, HISTORY_DEPTH
+from .bloom_filter import BloomFilter
+from .common_matcher import CommonPasswordMatcher
+from .common_snapshot import CommonPasswordSnapshot, load_snapshot, read_wordlist, wordlist_state
+from .hash_index import HashIndex
+from .instrumentation import timed
+from .storage import get_storage
+from .text_hashing import verify_hashed_password, verify_any_hashed_password, hash_password, needs_rehash
 
 # Consts
+PARALLEL_HISTORY_CHECK = False  # If True verify the password history across the text_hashing verification pool
+BREACH_FILTER_PATH = 'db/breached.bloom'  # Optional Bloom filter of breached passwords, see bloom_filter.py
+HASH_INDEX_PATH = 'db/breached.idx'  # Optional sorted index of breached password hashes, see hash_index.py
+COMMON_SNAPSHOT_PATH = 'db/common_passwords.snap'  # Mapped common password list and matcher, see common_snapshot.py
+COMMON_WORDLIST_PATH = None  # Word list (one per line, most common first) used in place of common_passwords
+BREACH_PLACEMENT = 1000  # Breached passwords rank as the least common entry of the common password list
+REHASH_ON_VERIFY = True  # Replace stale hashes (fewer rounds than configured) after a successful credential_verify
 
 # Globals
-common_password_list = []
-user_details = []
+common_password_list = []  # (id, password_text) rows, the mapped snapshot once loaded
+common_matcher = CommonPasswordMatcher(common_password_list)
+breach_filter = None
+hash_index = None
+user_details = {}
+lazy_user_details = False  # Set by get_user_list, look users up on demand rather than holding them all
+rehash_executor = None
+rehash_executor_lock = threading.Lock()
 VIABLE_PASSWORD = True
 user_credential_list = []
 SPECIAL_SET = 33  # special characters
 NUMBER_SET = 10  # numbers only
 ALPHA_SET = 26  # alpha characters, used for both upper and lower case instances
+UPPER_CHARS = frozenset(string.ascii_uppercase)
+LOWER_CHARS = frozenset(string.ascii_lowercase)
+NUMBER_CHARS = frozenset(string.digits)
+WORD_CHARS = frozenset(string.ascii_letters + string.digits + '_')  # ASCII fast path for regex \w
 
 # password strength list and characteristics
 strength_list = ({'id': 0, 'strength_desc': '', 'strength_color': '', 'expiry_days': 0},
@@ -27,6 +54,7 @@ strength_list = ({'id': 0, 'strength_desc': '', 'strength_color': '', 'expiry_da
                  {'id': 3, 'strength_desc': 'OK', 'strength_color': '#E5E500', 'expiry_days': 90},
                  {'id': 4, 'strength_desc': 'STRONG', 'strength_color': '#008000', 'expiry_days': 180},
                  {'id': 5, 'strength_desc': 'VERY STRONG', 'strength_color': '#00FF00', 'expiry_days': 365})
+REJECTED_STRENGTHS = ('', 'VERY WEAK', 'WEAK')  # strength_desc of passwords that cannot be used, by every entry point
 # Sequential character lists
 sequences = (
     'abcdefghijklmnopqrstuvwxyz'  # Alphabet
@@ -39,21 +67,97 @@ sequences = sequences + sequences[::-1]
 
 
 # Main processing
-def check_common_passwords(password_input):
+def build_sequence_transitions(sequence_string):
     """
-    Check the password supplied by the user against a list of the 1000 most commonly used passwords
-    :param password_input: password candidate
+    Build the successor table used by sequence_check from the sequences string
+    Each state represents the set of positions within sequence_string that the current run could be following,
+    so extending a run by one character is a single dictionary lookup
+    :param sequence_string: string of sequential characters, i.e. sequences
+    :return: start state for each character, and list of successor dicts (character: next state) per state
+    """
+    state_ids = {}
+    successors = []
+    pending = []
+
+    def state_for(positions):
+        # Assign an id to each distinct set of positions, exploring its successors on first sight
+        if positions not in state_ids:
+            state_ids[positions] = len(successors)
+            successors.append({})
+            pending.append(positions)
+        return state_ids[positions]
+
+    start_states = {}
+    for char in set(sequence_string):
+        start_states[char] = state_for(frozenset(i for i, c in enumerate(sequence_string) if c == char))
+    while pending:
+        positions = pending.pop()
+        next_positions = {}
+        for position in positions:
+            if position + 1 < len(sequence_string):
+                next_positions.setdefault(sequence_string[position + 1], set()).add(position + 1)
+        successors[state_ids[positions]] = {char: state_for(frozenset(found))
+                                            for char, found in next_positions.items()}
+    return start_states, successors
+
+
+sequence_starts, sequence_successors = build_sequence_transitions(sequences)
+
+
+@timed
+def check_common_passwords(password_input, breached=None):
+    """
+    Check the password supplied by the user against a list of the 1000 most commonly used passwords, and
+    for an exact match against the breached passwords where loaded
+    :param password_input: password candidate (lower case)
+    :param breached: breached_password of the original password candidate, looked up from password_input if None
     :return: If password is found in common list, if exact or contains commonly used phrased,
     Position within list where 1 = Most common - 1000 Least common (within list only)
     """
-    for common in common_password_list:
-        if password_input == common[1]:
-            return True, f'Exact Match Common Placement: {common[0]}/{len(common_password_list)}', common[0]
-        elif common[1] in password_input:
-            return True, f'Contains Common Placement: {common[0]}/{len(common_password_list)}', common[0] / 10
-    return False, 0, 0.0
+    if breached is None:
+        breached = breached_password(password_input)
+    return common_match_result(common_matcher.search(password_input), len(password_input), breached)
+
+
+def breached_password(password_input):
+    """
+    Check the password candidate against the breached password filter (lower case) and hash index (exact)
+    :return: If either is loaded and holds the password True, else False
+    """
+    if breach_filter is not None and password_input.lower() in breach_filter:
+        return True
+    return breach_count(password_input) > 0
+
+
+def breach_count(password_input):
+    """
+    Number of times the password candidate was seen in the breach dumps of the hash index
+    :param password_input: password candidate, case sensitive
+    :return: breach count, 0 if not found or no hash index is loaded
+    """
+    if hash_index is None:
+        return 0
+    return hash_index.password_count(password_input)
 
 
+def common_match_result(match, password_len, breached=False):
+    """
+    Describe the common password found within a password candidate
+    :param match: (id, length) of the most common password found by common_matcher, or None
+    :param password_len: length of the (lower case) password candidate
+    :param breached: If the password candidate is in the breached password filter True, else False
+    :return: as check_common_passwords
+    """
+    if match is not None and match[1] == password_len:
+        return True, f'Exact Match Common Placement: {match[0]}/{len(common_matcher)}', match[0]
+    if breached:
+        return True, 'Exact Match Breached Password', BREACH_PLACEMENT
+    if match is None:
+        return False, 0, 0.0
+    return True, f'Contains Common Placement: {match[0]}/{len(common_matcher)}', match[0] / 10
+
+
+@timed
 def sequence_check(password_input):
     """
     check for sequential characters within the password string
@@ -62,58 +166,151 @@ def sequence_check(password_input):
     :return: the length of sequential characters
     """
     sequences_length = 0
+    password_len = len(password_input)
 
-    # Iterate through the password candidate
+    # Iterate through the password candidate, each character is visited once
     i = 0
-    while i < len(password_input):
-        # Check password from index i
-        password = password_input[i:]
-
-        # Pass through the sequence to find any similarities
-        j = -1
-        common_length = 1
-        while True:
-            # Find the first instance of the character being searched, may appear multiple times
-            j = sequences.find(password[0], j + 1)
-            # if not found break
-            if j == -1:
-                break
-            # Find the longest common prefix
-            common_here = ''
-            for a, b in zip(password, sequences[j:]):
-                if a != b:
+    while i < password_len:
+        # Follow the successor table from the character at index i for as long as the sequence continues
+        state = sequence_starts.get(password_input[i])
+        j = i + 1
+        if state is not None:
+            while j < password_len:
+                state = sequence_successors[state].get(password_input[j])
+                if state is None:
                     break
-                else:
-                    common_here += a
-            # Store the max common found
-            common_length = max(common_length, len(common_here))
+                j += 1
+        common_length = j - i
 
         # Does the password contain a sequence, if so, is it greater than 2?
         if common_length > 2:
             sequences_length += common_length
 
         # Move beyond the current existing sequence
-        i += common_length
+        i = j
 
     return sequences_length
 
 
+def is_word_char(char):
+    """
+    Match the regex \\w class for a single character
+    :param char: character to be classified
+    :return: True if the character is a word character, else False
+    """
+    return char in WORD_CHARS or char.isalnum()
+
+
+class CharacterScan:
+    """
+    State of character_scan part way through a password candidate, so a candidate typed a character at a time is
+    scanned in pieces (see strength_evaluator.PasswordEvaluator) by the same rules as a whole candidate
+    Character classes are only gathered up to the first line break, matching the original (?=.*[...]) lookaheads
+    """
+
+    def __init__(self):
+        self.upper_check = self.lower_check = self.number_check = self.special_check = False
+        self.repeated_count = 0
+        self.run_char = None
+        self.run_length = 0
+        self.classify = True
+
+    def feed(self, characters):
+        """
+        Advance the scan by the characters following those already fed
+        :param characters: next characters of the password candidate
+        :return: None
+        """
+        # Held in locals for the loop, stored back once the characters are scanned
+        upper_check, lower_check, number_check, special_check = \
+            self.upper_check, self.lower_check, self.number_check, self.special_check
+        repeated_count, run_char, run_length, classify = \
+            self.repeated_count, self.run_char, self.run_length, self.classify
+
+        for char in characters:
+            if char == run_char:
+                run_length += 1
+                continue
+            # Character differs from the previous run, count the run if it was three or more word characters
+            if run_length > 2 and is_word_char(run_char):
+                repeated_count += run_length
+            run_char = char
+            run_length = 1
+
+            if classify:
+                if char in LOWER_CHARS:
+                    lower_check = True
+                elif char in UPPER_CHARS:
+                    upper_check = True
+                elif char in NUMBER_CHARS:
+                    number_check = True
+                elif char == '\n':
+                    special_check = True
+                    classify = False
+                elif not is_word_char(char):
+                    special_check = True
+
+        self.upper_check, self.lower_check, self.number_check, self.special_check = \
+            upper_check, lower_check, number_check, special_check
+        self.repeated_count, self.run_char, self.run_length, self.classify = \
+            repeated_count, run_char, run_length, classify
+
+    def result(self):
+        """
+        :return: as character_scan, for the characters fed so far
+        """
+        repeated_count = self.repeated_count
+        if self.run_length > 2 and is_word_char(self.run_char):
+            repeated_count += self.run_length
+        return self.upper_check, self.lower_check, self.number_check, self.special_check, repeated_count
+
+
+def character_scan(password_input):
+    """
+    Classify the characters of the password candidate and find repeated characters in a single pass
+    :param password_input: input from user as potential password
+    :return: upper, lower, number and special character flags, and the total length of any runs of three or more
+    repeated word characters
+    """
+    scan = CharacterScan()
+    scan.feed(password_input)
+    return scan.result()
+
+
+@timed
 def user_details_check(username, password):
     """
     check if username, forename or surname are used within the user password candidate, search is case insensitive
+    and literal, so names containing regex characters are matched as typed
     :param username: the username being used to amend password, or username of account being created
     :param password: the password candidate for the user
     :return: If username, forename or surname appears in the password, True, else False
     """
-    for user_detail in user_details:
-        if user_detail[0] == username:
-            if re.search(user_detail[0], password, re.IGNORECASE) or \
-                    re.search(user_detail[1], password, re.IGNORECASE) or \
-                    re.search(user_detail[2], password, re.IGNORECASE):
-                return True
+    details = user_detail_lookup(username)
+    if details is None:
+        return False
+    password = password.casefold()
+    for detail in details:
+        if detail in password:
+            return True
     return False
 
 
+def user_detail_lookup(username):
+    """
+    Find the case folded details of a user, from user_details or from the storage when loaded lazily
+    :param username: username of the account
+    :return: case folded (user_name, forename, surname), None if the user is not known
+    """
+    if lazy_user_details:
+        user_detail = get_storage().user_detail(username)
+        if user_detail is None:
+            return None
+        return tuple(detail.casefold() for detail in user_detail)
+    return user_details.get(username)
+
+
+@timed
 def criteria_check(username, password_input):
     """
     Check the string against criteria, to highlight to user potential areas to improve
@@ -132,32 +329,43 @@ def criteria_check(username, password_input):
     :return: suggested improvement string detailing potential methods to increase password strength,
             strength :returns the details from strength_list (id, strength_desc, strength_color, expiry_days)
     """
+    lowered_input = password_input.lower()
+    # Check password for upper case, lower case, numbers, special characters and repeated characters
+    # longer than two repetitions
+    character_checks = character_scan(password_input)
+    # check the password for sequential characters and the total amount
+    sequence_count = sequence_check(lowered_input)
+    # check password against common password list, and return position in list of 1000
+    # exact match is penalised more heavily
+    common_result = check_common_passwords(lowered_input, breached_password(password_input))
+    # determine if the username, forename or surname are used within the password
+    user_details_used = user_details_check(username, password_input)
+
+    return criteria_feedback(len(password_input), character_checks, sequence_count, common_result,
+                             user_details_used)
+
+
+def criteria_feedback(password_len, character_checks, sequence_count, common_result, user_details_used):
+    """
+    Build the suggested improvements and strength from the individual checks made against a password candidate
+    Shared by criteria_check and the incremental PasswordEvaluator, so both produce identical feedback
+    :param password_len: length of the password candidate
+    :param character_checks: upper, lower, number, special flags and repeated count, as returned by character_scan
+    :param sequence_count: total length of sequential characters, as returned by sequence_check
+    :param common_result: common password details, as returned by check_common_passwords
+    :param user_details_used: If username, forename or surname appear in the password, True, else False
+    :return: suggested improvement string and strength, as returned by criteria_check
+    """
     char_set_val = 0
     entropy = 0
-    repeated_count = 0
     common_deduction = 1.0
     user_deduction = 0
-    password_len = len(password_input)
     improve_str = 'Suggestions for improvement:'
 
-    # Check password for upper case characters
-    upper_check = bool(re.match(r'(?=.*[A-Z])', password_input))
-    # Check password for lower case characters
-    lower_check = bool(re.match(r'(?=.*[a-z])', password_input))
-    # Check password for numbers
-    number_check = bool(re.match(r'(?=.*[0-9])', password_input))
-    # check password for special characters
-    special_check = bool(re.match(r'(?=.*[\W])', password_input))
-    # Find repeated characters longer than two repetitions
-    repeated_char = bool(re.findall(r'((\w)\2{2,})', password_input))
+    upper_check, lower_check, number_check, special_check, repeated_count = character_checks
+    common_check, common_text, common_position = common_result
+    repeated_char = repeated_count > 0
     length_check = password_len < 8
-    # check the password for sequential characters and the total amount
-    sequence_count = sequence_check(password_input.lower())
-    # check password against common password list, and return position in list of 1000
-    # exact match is penalised more heavily
-    common_check, common_text, common_position = check_common_passwords(password_input.lower())
-    # determine if the username, forename or surname are used within the password
-    user_details_used = user_details_check(username, password_input)
 
     # Check booleans to suggest potential improvements to the password strength
     if length_check:
@@ -171,10 +379,6 @@ def criteria_check(username, password_input):
     if user_details_used:
         improve_str += f'\n * Do not include username, forename or surname'
         user_deduction = 10
-    if repeated_char:
-        # determine the total count of repeated characters within the password
-        for match in re.findall(r'((\w)\2{2,})', password_input):
-            repeated_count += len(match[0])
 
     # Add potential characters within password to char_set_val, used to calculate entropy
     # OR suggest inclusion to improve password strength
@@ -200,11 +404,16 @@ def criteria_check(username, password_input):
         improve_str += '\n * No more than 2 repeated characters'
 
     if password_len != 0:
-        # Possible combinations is char_set_val to power of password length
-        # Adapted within this system to account for use of sequential characters, repeated characters and user info
-        combinations = char_set_val ** (password_len - (sequence_count + repeated_count + user_deduction))
-        overall_entropy = log2(combinations)
-        entropy_per_char = log2(char_set_val)
+        if char_set_val == 0:
+            # Only characters outside of the counted sets, i.e. underscores or accented letters, no entropy to measure
+            combinations, overall_entropy, entropy_per_char = 0, 0.0, 0.0
+        else:
+            # Possible combinations is char_set_val to power of password length
+            # Adapted within this system to account for use of sequential characters, repeated characters and
+            # user info
+            combinations = char_set_val ** (password_len - (sequence_count + repeated_count + user_deduction))
+            overall_entropy = log2(combinations)
+            entropy_per_char = log2(char_set_val)
         # Calculated entropy used to grade the strength of the password supplied
         calculated_entropy = (password_len - (sequence_count + repeated_count)) * entropy_per_char
         entropy = {'combinations': combinations,
@@ -244,32 +453,34 @@ def determine_strength(entropy):
     return strength_list[rating]
 
 
-def credential_amend(username, password, expiry_days):
+@timed
+def credential_amend(username, password, expiry_days, history_depth=None, parallel=None, pool_size=None):
     """
     Check if the password has been used previously
     :param username: username of attempted password amend
     :param password: potential new password
     :param expiry_days: the days until the password expires
+    :param history_depth: number of previous passwords to check, defaults to HISTORY_DEPTH
+    :param parallel: If True verify the history in parallel, defaults to PARALLEL_HISTORY_CHECK
+    :param pool_size: worker processes used when parallel, defaults to text_hashing VERIFY_POOL_SIZE
     :return: If password is verified, True, else False
     """
-    sql_string = credential_retrieval()
-    expiration_date = datetime.now(tz=None) - timedelta(days=365)
-    with closing(sql_connection()) as db:
-        with closing(db.cursor()) as cursor:
-            try:
-                user_credentials = cursor.execute(sql_string, (expiration_date, username))
-                expiry_date = datetime.now(tz=None) + timedelta(days=expiry_days)
-                for user_cred in user_credentials:
-                    if verify_hashed_password(password, user_cred[1]):
-                        return False
-            except Error:
-                print(Error.mro())
-                return False
+    expiration_date = datetime.now(tz=None) - timedelta(days=HISTORY_DAYS)
+    expiry_date = datetime.now(tz=None) + timedelta(days=expiry_days)
+    history_depth = HISTORY_DEPTH if history_depth is None else history_depth
+    parallel = PARALLEL_HISTORY_CHECK if parallel is None else parallel
+    storage = get_storage()
+    user_credentials = storage.credential_history(username, expiration_date, history_depth)
+    if user_credentials is None:
+        return False
+    if verify_any_hashed_password(password, user_credentials, parallel=parallel, pool_size=pool_size):
+        return False
     hashed_password = hash_password(password)
-    user_update = credential_update(hashed_password, username, expiry_date)
+    user_update = storage.credential_update(hashed_password, username, expiry_date)
     return user_update
 
 
+@timed
 def credential_verify(username, password):
     """
     Check that the current password supplied matches the database record before updating to new password
@@ -277,31 +488,139 @@ def credential_verify(username, password):
     :param password: current password required to authorise the change of password
     :return: if password can be verified, True, else False
     """
-    sql_string = credential_find()
-    with closing(sql_connection()) as db:
-        with closing(db.cursor()) as cursor:
-            user_credentials = cursor.execute(sql_string, (username, ))
-            for user_cred in user_credentials:
-                if verify_hashed_password(password, user_cred[1]):
-                    return True
+    return verify_current_credentials(username, password, get_storage().current_credentials(username))
+
+
+def verify_current_credentials(username, password, user_credentials):
+    """
+    Verify the password against the current password hashes of the user, read by credential_verify (or async_db)
+    :param username: username of attempted password amend
+    :param password: current password required to authorise the change of password
+    :param user_credentials: hashes of the current password, as returned by current_credentials
+    :return: if password can be verified, True, else False
+    """
+    for user_cred in user_credentials:
+        if verify_hashed_password(password, user_cred):
+            if REHASH_ON_VERIFY and needs_rehash(user_cred):
+                rehash_in_background(username, password, user_cred)
+            return True
     return False
 
 
-def get_common_password_list():
+def rehash_in_background(username, password, hashed):
     """
-    Gather common password list from database
-    :return: Common password list
+    Replace the stored hash of a verified password with one at the configured rounds, without delaying the caller
+    :param username: username the password was verified for
+    :param password: verified password
+    :param hashed: stale hash currently stored, the replacement is skipped if it has changed in the meantime
+    :return: future, result True if the hash was replaced
     """
-    global common_password_list
+    global rehash_executor
+
+    with rehash_executor_lock:
+        if rehash_executor is None:
+            rehash_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='rehash')
+    return rehash_executor.submit(lambda: get_storage().credential_rehash(username, hashed, hash_password(password)))
 
-    common_password_list = common_passwords()
+
+def get_common_password_list():
+    """
+    Map the common password snapshot used by check_common_passwords, rebuilt from the database (or word list)
+    only when the source has changed since it was written. Should the snapshot not be writable the matcher is
+    compiled in memory from the rows
+    :return: None
+    """
+    global common_password_list, common_matcher
+
+    # The previous snapshot is unmapped first, so its mapping is not leaked and the file can be replaced
+    if isinstance(common_matcher, CommonPasswordSnapshot):
+        common_matcher.close()
+        common_password_list = []
+        common_matcher = CommonPasswordMatcher(common_password_list)
+    storage = get_storage()
+    if COMMON_WORDLIST_PATH:
+        state, read_rows = wordlist_state(COMMON_WORDLIST_PATH), lambda: read_wordlist(COMMON_WORDLIST_PATH)
+    else:
+        state, read_rows = storage.common_passwords_state(), storage.common_passwords
+    # The snapshot is only written for a persistent store, as it would be rebuilt on every run of an in-memory one
+    snapshot = load_snapshot(COMMON_SNAPSHOT_PATH, state, read_rows) if storage.persistent else None
+    if snapshot is not None:
+        common_password_list = common_matcher = snapshot
+    else:
+        common_password_list = read_rows() or []
+        common_matcher = CommonPasswordMatcher(common_password_list)
+    load_breach_filter()
+    load_hash_index()
 
 
-def get_user_list():
+def load_breach_filter(path=BREACH_FILTER_PATH):
+    """
+    Memory-map the breached password filter used by check_common_passwords, if the file exists
+    :param path: filter file built by bloom_filter.py
+    :return: If the filter was loaded True, else False
+    """
+    global breach_filter
+
+    if breach_filter is not None:
+        breach_filter.close()
+        breach_filter = None
+    if not os.path.exists(path):
+        return False
+    try:
+        breach_filter = BloomFilter(path)
+    except (OSError, ValueError) as error:
+        print(error)
+        return False
+    return True
+
+
+def load_hash_index(path=HASH_INDEX_PATH):
+    """
+    Memory-map the breached password hash index used by breach_count, if the file exists
+    :param path: index file built by hash_index.py
+    :return: If the index was loaded True, else False
+    """
+    global hash_index
+
+    if hash_index is not None:
+        hash_index.close()
+        hash_index = None
+    if not os.path.exists(path):
+        return False
+    try:
+        hash_index = HashIndex(path)
+    except (OSError, ValueError) as error:
+        print(error)
+        return False
+    return True
+
+
+def get_user_list(lazy=False):
     """
     Gather list of existing users to verify user information not included in password for current user only (matched)
-    :return: User details list
+    Details are indexed by username and case folded once here, so user_details_check is a single dict lookup
+    :param lazy: If True, do not load the user table, users are instead read on demand through the storage
+    :return: User details dict
     """
-    global user_details
+    global user_details, lazy_user_details
 
-    user_details = user_list()
+    lazy_user_details = lazy
+    if lazy:
+        user_details = {}
+    else:
+        user_details = {user_detail[0]: tuple(detail.casefold() for detail in user_detail)
+                        for user_detail in get_storage().user_list() or []}
+
+
+def refresh_user_details(username):
+    """
+    Bring the details of a single, newly created, user up to date without reloading the whole user list
+    :param username: username of the account
+    :return: None
+    """
+    storage = get_storage()
+    storage.invalidate_user_detail(username)
+    if not lazy_user_details:
+        user_detail = storage.user_detail(username)
+        if user_detail is not None:
+            user_details[username] = tuple(detail.casefold() for detail in user_detail)
@@ -0,0 +1,282 @@
+#  File: storage.py
+#  Description: Storage interface used by the engine for users, credentials, password history and common passwords,
+#  with the SQLite implementation (db_access) selected by default
+#  Author: Christopher Hindson
+#  Date: 18/10/2026
+
+# Imports
+import threading
+from abc import ABC, abstractmethod
+from . import db_access
+from .text_hashing import invalidate_verifications
+
+# Consts
+
+# Globals
+storage = None
+storage_lock = threading.Lock()
+
+
+# Main processing
+class Storage(ABC):
+    """
+    Operations the engine needs from its store. Return values follow the db_access functions of the same name,
+    failures are reported by return value (False, None or a message) rather than raised. A backend must implement
+    every abstract method, or it cannot be instantiated
+    """
+
+    persistent = True  # False where the data is lost with the process, derived files (snapshots) are then not written
+
+    def open(self):
+        """
+        Prepare the store for use in this process, called by configure_storage
+        :return: None
+        """
+
+    @abstractmethod
+    def worker_storage(self):
+        """
+        :return: picklable Storage for a spawned worker process to pass to configure_storage
+        """
+
+    @abstractmethod
+    def apply_migrations(self):
+        """
+        :return: schema version, None if the store could not be brought up to date
+        """
+
+    # Users
+    @abstractmethod
+    def check_username(self, username):
+        """
+        :return: True if available, False if already in use, and message string about result
+        """
+
+    @abstractmethod
+    def existing_usernames(self, usernames):
+        """
+        :return: set of the usernames already in use, None if the check failed
+        """
+
+    @abstractmethod
+    def create_new_user(self, username, forename, surname, password, expiry_days):
+        """
+        :return: True if created, else False, and a message string
+        """
+
+    @abstractmethod
+    def create_new_users(self, users):
+        """
+        :param users: list of (username, forename, surname, hashed password, expiry_days)
+        :return: list of (index in users, message) of the users not created
+        """
+
+    @abstractmethod
+    def user_list(self):
+        """
+        :return: list of (user_name, forename, surname) ordered by user_name, None on failure
+        """
+
+    @abstractmethod
+    def user_detail(self, username):
+        """
+        :return: (user_name, forename, surname) of the user, None if the user does not exist
+        """
+
+    def invalidate_user_detail(self, username):
+        """
+        Drop any cached details of the user, so the next user_detail reads the store
+        :return: None
+        """
+
+    # Credentials and password history
+    @abstractmethod
+    def current_credentials(self, username):
+        """
+        :return: list of the hashes of the current password of the user, empty if there is none
+        """
+
+    @abstractmethod
+    def credential_history(self, username, since, depth):
+        """
+        :return: hashes of the current password and up to depth previous passwords changed after since, newest first,
+            None on failure
+        """
+
+    @abstractmethod
+    def credential_update(self, password, username, expiry_date):
+        """
+        Replace the password of the user, adding the replaced password to the history and clearing the expiry state
+        Verification outcomes of the replaced hash are forgotten (text_hashing.invalidate_verifications)
+        :return: True if updated, else False
+        """
+
+    @abstractmethod
+    def credential_rehash(self, username, hashed, new_hash):
+        """
+        Replace hashed, if still current, with new_hash of the same password, without adding to the history
+        Verification outcomes of hashed are forgotten
+        :return: True if the hash was replaced, else False
+        """
+
+    @abstractmethod
+    def flag_due_credentials(self, due_date, state, after=None, page_size=500):
+        """
+        Move the next page of credentials expiring on or before due_date, and not yet at state, to state
+        :param after: last key of the previous page, None for the first page
+        :return: list of (expiry_date, key, user_name) in expiry order, None on failure
+        """
+
+    @abstractmethod
+    def purge_credential_history(self, cutoff, keep_count, after_user=0, batch_size=500, archive_path=None):
+        """
+        Delete the next batch of history changed on or before cutoff or beyond the keep_count most recent of a user
+        :return: (rows purged, user to continue from), None on failure
+        """
+
+    def database_space(self):
+        """
+        :return: (auto_vacuum mode, page count, free page count, page size), None where not applicable
+        """
+        return None
+
+    def incremental_vacuum(self, pages):
+        """
+        :return: free pages remaining, None where not applicable
+        """
+        return None
+
+    def enable_incremental_vacuum(self):
+        """
+        :return: True if space freed by purges can be reclaimed incrementally, else False
+        """
+        return False
+
+    # Common passwords
+    @abstractmethod
+    def common_passwords(self):
+        """
+        :return: list of (id, password_text) ordered by id, None on failure
+        """
+
+    @abstractmethod
+    def common_passwords_state(self):
+        """
+        :return: value changing whenever the common passwords change, None if not known
+        """
+
+
+class SQLiteStorage(Storage):
+    """
+    Storage in the SQLite database through the db_access connection pool
+    """
+
+    def __init__(self, db_path=None, pool_size=None):
+        """
+        :param db_path: database to open, None to use the db_access pool as configured (by default DB_PATH)
+        :param pool_size: maximum connections of the pool, used with db_path
+        """
+        self.db_path = db_path
+        self.pool_size = pool_size
+
+    def open(self):
+        if self.db_path is not None:
+            db_access.configure_pool(size=self.pool_size or db_access.POOL_SIZE, db_path=self.db_path)
+
+    def worker_storage(self):
+        pool = db_access.connection_pool
+        return SQLiteStorage(pool.db_path if pool is not None else db_access.DB_PATH, pool_size=1)
+
+    def apply_migrations(self):
+        return db_access.apply_migrations()
+
+    def check_username(self, username):
+        return db_access.check_username(username)
+
+    def existing_usernames(self, usernames):
+        return db_access.existing_usernames(usernames)
+
+    def create_new_user(self, username, forename, surname, password, expiry_days):
+        return db_access.create_new_user(username, forename, surname, password, expiry_days)
+
+    def create_new_users(self, users):
+        return db_access.create_new_users(users)
+
+    def user_list(self):
+        return db_access.user_list()
+
+    def user_detail(self, username):
+        return db_access.cached_user_detail(username)
+
+    def invalidate_user_detail(self, username):
+        db_access.invalidate_user_detail(username)
+
+    def current_credentials(self, username):
+        return db_access.current_credentials(username)
+
+    def credential_history(self, username, since, depth):
+        return db_access.credential_history(username, since, depth)
+
+    def credential_update(self, password, username, expiry_date):
+        replaced = db_access.current_credentials(username)
+        if not db_access.credential_update(password, username, expiry_date):
+            return False
+        # Verification outcomes of the replaced password are no longer wanted
+        for hashed in replaced:
+            invalidate_verifications(hashed)
+        return True
+
+    def credential_rehash(self, username, hashed, new_hash):
+        if not db_access.credential_rehash(username, hashed, new_hash):
+            return False
+        invalidate_verifications(hashed)
+        return True
+
+    def flag_due_credentials(self, due_date, state, after=None, page_size=500):
+        return db_access.flag_due_credentials(due_date, state, after, page_size)
+
+    def purge_credential_history(self, cutoff, keep_count, after_user=0, batch_size=500, archive_path=None):
+        return db_access.purge_credential_history(cutoff, keep_count, after_user, batch_size, archive_path)
+
+    def database_space(self):
+        return db_access.database_space()
+
+    def incremental_vacuum(self, pages):
+        return db_access.incremental_vacuum(pages)
+
+    def enable_incremental_vacuum(self):
+        return db_access.enable_incremental_vacuum()
+
+    def common_passwords(self):
+        return db_access.common_passwords()
+
+    def common_passwords_state(self):
+        return db_access.common_passwords_state()
+
+
+def configure_storage(new_storage):
+    """
+    Replace the storage used by the engine, e.g. with a MemoryStorage for load tests and benchmarks
+    :param new_storage: Storage instance
+    :return: the new storage
+    """
+    global storage
+
+    new_storage.open()
+    with storage_lock:
+        storage = new_storage
+        return storage
+
+
+def get_storage():
+    """
+    Storage used by the engine, a SQLiteStorage of the db_access pool unless configure_storage was called
+    :return: Storage instance
+    """
+    global storage
+
+    if storage is None:
+        with storage_lock:
+            if storage is None:
+                storage = SQLiteStorage()
+    return storage
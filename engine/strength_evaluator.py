@@ -0,0 +1,108 @@
+#  File: strength_evaluator.py
+#  Description: Incremental password strength evaluation for keystroke driven feedback
+#  Author: Christopher Hindson
+#  Date: 18/10/2026
+
+# Imports
+from . import password_check
+from .common_matcher import ROOT_STATE, CommonPasswordMatcher
+from .instrumentation import timed
+from .password_check import (CharacterScan, sequence_starts, sequence_successors, breached_password,
+                             common_match_result, criteria_feedback, user_details_check)
+
+
+# Main processing
+
+class PasswordEvaluator:
+    """
+    Keep the state of criteria_check for the password typed so far, so that appending characters only evaluates
+    the new characters. Any other edit (deletion, paste into the middle, non ASCII input) is recomputed in full.
+    evaluate returns exactly what criteria_check would for the same username and password
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """
+        Clear the evaluator back to an empty password
+        """
+        self._password = ''
+        # Lower casing is only context free for ASCII, so non ASCII passwords are always recomputed
+        self._ascii = True
+        # Character classes and repeated character runs, see character_scan
+        self._character_scan = CharacterScan()
+        # Sequence state, see sequence_check
+        self._sequence_state = None
+        self._sequence_length = 0
+        self._sequence_count = 0
+        # Common password automaton state, see check_common_passwords
+        self._matcher = password_check.common_matcher
+        self._common_state = ROOT_STATE
+        self._common_match = None
+        self._lowered_len = 0
+
+    @timed
+    def evaluate(self, username, password_input):
+        """
+        Evaluate the password candidate, reusing the state of the previous call where the password was appended to
+        :param username: username supplied by user for credential update, or user creation
+        :param password_input: potential new password to associate to the account
+        :return: as criteria_check
+        """
+        previous = self._password
+        appended = password_input[len(previous):]
+        if self._matcher is not password_check.common_matcher or not self._ascii or \
+                not password_input.startswith(previous) or not appended.isascii():
+            self.reset()
+            self._feed(password_input, password_input.lower())
+            self._ascii = password_input.isascii()
+        elif appended:
+            self._feed(appended, appended.lower())
+        self._password = password_input
+
+        return criteria_feedback(len(password_input), self.character_checks(), self.sequence_count(),
+                                 common_match_result(self._common_match, self._lowered_len,
+                                                     breached_password(password_input)),
+                                 user_details_check(username, password_input))
+
+    def character_checks(self):
+        """
+        :return: character class flags and repeated count for the current password, as character_scan
+        """
+        return self._character_scan.result()
+
+    def sequence_count(self):
+        """
+        :return: total length of sequential characters for the current password, as sequence_check
+        """
+        if self._sequence_length > 2:
+            return self._sequence_count + self._sequence_length
+        return self._sequence_count
+
+    def _feed(self, characters, lowered):
+        """
+        Advance the state by the supplied characters
+        :param characters: characters appended to the password
+        :param lowered: lower case form of characters, used for the sequence and common password checks
+        """
+        self._character_scan.feed(characters)
+
+        matcher = self._matcher
+        for char in lowered:
+            # Extend the current sequence if the successor table allows, otherwise start a new one
+            state = None
+            if self._sequence_state is not None:
+                state = sequence_successors[self._sequence_state].get(char)
+            if state is not None:
+                self._sequence_state = state
+                self._sequence_length += 1
+            else:
+                if self._sequence_length > 2:
+                    self._sequence_count += self._sequence_length
+                self._sequence_state = sequence_starts.get(char)
+                self._sequence_length = 1
+
+            self._common_state, found = matcher.step(self._common_state, char)
+            self._common_match = CommonPasswordMatcher.best_match(self._common_match, found)
+        self._lowered_len += len(lowered)
@@ -5,30 +5,319 @@
 #  Date: 31/10/2020
 
 # Imports
-from passlib.context import CryptContext
+import argparse
+import atexit
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from .instrumentation import timed
 
 # CONSTANTS
-HASH_ROUNDS = 294611  # Number of rounds of encryption most closely linked to 0.35 seconds (noted user tolerance)
+HASH_ROUNDS = 294611  # Default rounds of encryption, linked to 0.35 seconds on the original host
+HASH_TARGET_SECONDS = 0.35  # Noted user tolerance for a single hash, the default calibration target
+HASH_ROUNDS_FLOOR = 29000  # Calibration never picks fewer rounds than this (passlib pbkdf2_sha256 default)
+CALIBRATION_ROUNDS = 20000  # Rounds hashed per calibration sample
+CALIBRATION_SAMPLES = 5  # Fastest sample is used, so other load on the host inflates the result least
+ROUNDS_ENV = 'PWD_HASH_ROUNDS'  # Environment variable fixing the rounds for this host
+TARGET_ENV = 'PWD_HASH_TARGET'  # Environment variable holding a latency target (seconds) to calibrate rounds for
 SALT_SIZE = 128  # Size of random salt to be added
+VERIFY_POOL_SIZE = os.cpu_count() or 1  # Worker processes used to verify password history in parallel
+VERIFY_CACHE_SIZE = 1024  # Verification outcomes remembered, 0 disables the cache
+VERIFY_CACHE_TTL = 300  # Seconds a verification outcome is remembered
 
 # Globals
-pwd_context = CryptContext(schemes=["sha256_crypt", "pbkdf2_sha256"], default="pbkdf2_sha256")
+hash_rounds = HASH_ROUNDS
+pwd_context = None  # Created on first use by crypt_context, so passlib is only imported once hashing is needed
+pwd_context_lock = threading.Lock()
+verify_executor = None  # Process pool, see verification_pool
+verify_executor_size = 0
+verify_executor_lock = threading.Lock()
+# Verification outcomes keyed by HMAC of (password, hash) under a per process random key, so no plaintext is held
+verify_cache = OrderedDict()
+verify_cache_lock = threading.Lock()
+verify_cache_key = os.urandom(32)
 
 
+def build_context(rounds):
+    """
+    Create the context used to hash and verify passwords, new hashes use pbkdf2_sha256 with rounds
+    Hashes with fewer rounds, or of a deprecated scheme (any but the default), are reported by needs_update
+    :param rounds: pbkdf2_sha256 rounds for new hashes, and the minimum accepted without a rehash
+    :return: CryptContext
+    """
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["sha256_crypt", "pbkdf2_sha256"], default="pbkdf2_sha256", deprecated="auto",
+                        pbkdf2_sha256__default_rounds=rounds, pbkdf2_sha256__min_rounds=rounds,
+                        pbkdf2_sha256__salt_size=SALT_SIZE)
+
+
+def calibrate_rounds(target_seconds=HASH_TARGET_SECONDS, samples=CALIBRATION_SAMPLES):
+    """
+    Measure pbkdf2_sha256 throughput on this host, and scale the rounds to the latency target
+    :param target_seconds: time a single hash should take
+    :param samples: number of timed hashes, the fastest is used
+    :return: rounds closest to target_seconds per hash, not less than HASH_ROUNDS_FLOOR
+    """
+    from passlib.hash import pbkdf2_sha256
+
+    handler = pbkdf2_sha256.using(rounds=CALIBRATION_ROUNDS, salt_size=SALT_SIZE)
+    elapsed = None
+    for _ in range(samples):
+        start = time.perf_counter()
+        handler.hash('calibration')
+        sample = time.perf_counter() - start
+        elapsed = sample if elapsed is None else min(elapsed, sample)
+    return max(HASH_ROUNDS_FLOOR, int(CALIBRATION_ROUNDS * target_seconds / elapsed))
+
+
+def configure_hash_rounds(rounds=None, target_seconds=None):
+    """
+    Set the rounds used for new hashes, existing hashes with fewer rounds are rehashed by needs_rehash callers
+    :param rounds: rounds to use, if None calibrated for target_seconds
+    :param target_seconds: latency target for calibrate_rounds, if both are None HASH_ROUNDS is used
+    :return: rounds now in use
+    """
+    global hash_rounds, pwd_context
+
+    if rounds is None:
+        rounds = calibrate_rounds(target_seconds) if target_seconds else HASH_ROUNDS
+    hash_rounds = rounds
+    pwd_context = build_context(rounds)
+    return rounds
+
+
+def configure_from_environment():
+    """
+    Apply PWD_HASH_ROUNDS, or calibrate for PWD_HASH_TARGET, falling back to HASH_ROUNDS
+    Calibrated rounds are written back to PWD_HASH_ROUNDS, so spawned verification processes do not recalibrate
+    """
+    rounds = os.environ.get(ROUNDS_ENV)
+    target = os.environ.get(TARGET_ENV)
+    rounds = configure_hash_rounds(int(rounds) if rounds else None, float(target) if target else None)
+    os.environ[ROUNDS_ENV] = str(rounds)
+
+
+def crypt_context():
+    """
+    Return the context used to hash and verify passwords, configured from the environment on first use
+    :return: CryptContext
+    """
+    if pwd_context is None:
+        with pwd_context_lock:
+            if pwd_context is None:
+                configure_from_environment()
+    return pwd_context
+
+
+@timed
 def hash_password(password):
     """
     Hash the supplied password using the created context above
     :param password: user supplied details for replacement/new password
     :return: hashed string of password for database input
     """
-    return pwd_context.hash(password, salt_size=SALT_SIZE, rounds=HASH_ROUNDS)
+    return crypt_context().hash(password)
 
 
+@timed
 def verify_hashed_password(password, hashed):
     """
     Verify that the supplied password matches the previously hashed password from the database
+    The outcome is remembered for VERIFY_CACHE_TTL seconds, so an immediate retry does not hash again
     :param password: user supplied details for current password
     :param hashed: current password hash from database
     :return: If password and hashed match, True, else False
     """
-    return pwd_context.verify(password, hashed)
+    key = verification_key(password, hashed)
+    verified = cached_verification(key)
+    if verified is None:
+        verified = crypt_context().verify(password, hashed)
+        remember_verification(key, hashed, verified)
+    return verified
+
+
+def verify_uncached(password, hashed):
+    """
+    Verify without the verification cache, run by the verification_pool worker processes
+    """
+    return crypt_context().verify(password, hashed)
+
+
+def verification_key(password, hashed):
+    """
+    Key of the verification cache for a password and hash, the password is length prefixed so pairs cannot collide
+    :return: HMAC-SHA256 digest under verify_cache_key
+    """
+    password = password.encode('utf-8')
+    message = len(password).to_bytes(8, 'big') + password + hashed.encode('utf-8')
+    return hmac.new(verify_cache_key, message, hashlib.sha256).digest()
+
+
+def hash_tag(hashed):
+    # Identifies the entries of a stored hash, for invalidate_verifications
+    return hmac.new(verify_cache_key, hashed.encode('utf-8'), hashlib.sha256).digest()
+
+
+def cached_verification(key):
+    """
+    :param key: verification_key of the password and hash
+    :return: remembered outcome, None if not cached or expired
+    """
+    with verify_cache_lock:
+        entry = verify_cache.get(key)
+        if entry is None:
+            return None
+        expires, _, verified = entry
+        if expires < time.monotonic():
+            del verify_cache[key]
+            return None
+        verify_cache.move_to_end(key)
+        return verified
+
+
+def remember_verification(key, hashed, verified):
+    """
+    Remember a verification outcome, dropping the least recently used entries beyond VERIFY_CACHE_SIZE
+    """
+    if VERIFY_CACHE_SIZE <= 0:
+        return
+    with verify_cache_lock:
+        verify_cache[key] = (time.monotonic() + VERIFY_CACHE_TTL, hash_tag(hashed), verified)
+        verify_cache.move_to_end(key)
+        while len(verify_cache) > VERIFY_CACHE_SIZE:
+            verify_cache.popitem(last=False)
+
+
+def invalidate_verifications(hashed=None):
+    """
+    Forget the verification outcomes of a stored hash, used when the hash is replaced
+    :param hashed: hash being replaced, if None the whole cache is cleared
+    :return: None
+    """
+    with verify_cache_lock:
+        if hashed is None:
+            verify_cache.clear()
+            return
+        tag = hash_tag(hashed)
+        for key in [key for key, (_, entry_tag, _) in verify_cache.items() if entry_tag == tag]:
+            del verify_cache[key]
+
+
+def needs_rehash(hashed):
+    """
+    Check whether a stored hash is weaker than this host is configured for
+    :param hashed: password hash from database
+    :return: True if the hash uses fewer rounds than hash_rounds or a deprecated scheme, else False
+    """
+    return crypt_context().needs_update(hashed)
+
+
+def verification_pool(pool_size=None):
+    """
+    Return the shared process pool used for parallel verification, created on first use and shut down at exit
+    Processes are spawned rather than forked, as the GUI process is multi-threaded
+    :param pool_size: number of worker processes, defaults to VERIFY_POOL_SIZE. A pool of another size, or a broken
+    pool, is replaced, verifications already submitted to the replaced pool still complete
+    :return: process pool executor
+    """
+    global verify_executor, verify_executor_size
+
+    # Imported here, multiprocessing is only needed once history is verified in parallel
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    pool_size = pool_size or VERIFY_POOL_SIZE
+    with verify_executor_lock:
+        if verify_executor is not None and (verify_executor_size != pool_size or verify_executor._broken):
+            verify_executor.shutdown(wait=False)
+            verify_executor = None
+        if verify_executor is None:
+            verify_executor = ProcessPoolExecutor(max_workers=pool_size,
+                                                  mp_context=multiprocessing.get_context('spawn'))
+            verify_executor_size = pool_size
+        return verify_executor
+
+
+def shutdown_verification_pool(executor=None):
+    """
+    Shut down the shared verification pool, registered to run at exit
+    :param executor: only shut down the shared pool if it is this pool, e.g. one found to be broken
+    :return: None
+    """
+    global verify_executor
+
+    with verify_executor_lock:
+        if verify_executor is None or (executor is not None and executor is not verify_executor):
+            return
+        executor, verify_executor = verify_executor, None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+atexit.register(shutdown_verification_pool)
+
+
+@timed
+def verify_any_hashed_password(password, hashes, parallel=False, pool_size=None):
+    """
+    Verify the supplied password against several hashes, such as the password history of a user
+    :param password: user supplied password
+    :param hashes: hashed strings from the database
+    :param parallel: If True, spread the verifications across the verification_pool, cancelling the outstanding
+    verifications on the first match
+    :param pool_size: number of worker processes when parallel, defaults to VERIFY_POOL_SIZE
+    :return: If password matches any of the hashes, True, else False, remembered outcomes are not verified again
+    """
+    # Remembered outcomes are used first, only the remaining hashes are verified
+    keys = {}
+    for hashed in hashes:
+        key = verification_key(password, hashed)
+        verified = cached_verification(key)
+        if verified:
+            return True
+        if verified is None:
+            keys[hashed] = key
+    if not parallel or len(keys) < 2:
+        return any(verify_hashed_password(password, hashed) for hashed in keys)
+
+    executor = verification_pool(pool_size)
+    pending = {}
+    submitted = False
+    try:
+        for hashed in keys:
+            pending[executor.submit(verify_uncached, password, hashed)] = hashed
+        submitted = True
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                hashed = pending.pop(future)
+                remember_verification(keys[hashed], hashed, future.result())
+                if future.result():
+                    return True
+        return False
+    except BrokenProcessPool:
+        # A worker died or could not be spawned, the pool is dropped so the next call gets a new one
+        shutdown_verification_pool(executor)
+    except RuntimeError:
+        # Raised by submit when another pool size replaced the pool after it was returned here
+        if submitted:
+            raise
+    finally:
+        # Verifications already running complete in the background, the queued ones are dropped
+        for future in pending:
+            future.cancel()
+    # Verified here instead, outcomes the pool returned are remembered and not verified again
+    return any(verify_hashed_password(password, hashed) for hashed in keys)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Calibrate pbkdf2_sha256 rounds for this host')
+    parser.add_argument('--target', type=float, default=HASH_TARGET_SECONDS, help='seconds per hash')
+    args = parser.parse_args()
+    calibrated = calibrate_rounds(args.target)
+    print(f'{calibrated} rounds for {args.target}s per hash, apply with {ROUNDS_ENV}={calibrated}')
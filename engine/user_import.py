@@ -0,0 +1,165 @@
+#  File: user_import.py
+#  Description: Bulk creation of user accounts (e.g. from HR exports), checked, hashed and inserted in chunks
+#  Author: Christopher Hindson
+#  Date: 18/10/2026
+
+# Imports
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from . import text_hashing
+from .password_check import REJECTED_STRENGTHS, criteria_check, get_common_password_list
+from .storage import configure_storage, get_storage
+from .text_hashing import configure_hash_rounds, crypt_context, hash_password
+
+# Consts
+IMPORT_CHUNK_SIZE = 1000  # Users checked in one query, hashed by one worker and inserted in one transaction
+CHUNKS_PER_WORKER = 2  # Chunks queued per worker, bounds memory to workers * CHUNKS_PER_WORKER * IMPORT_CHUNK_SIZE
+MIN_USERNAME_LENGTH = 5
+
+
+# Main processing
+def record_error(record, seen):
+    """
+    Check a user record as the Create New User form does, before any database or hashing work
+    :param record: (username, forename, surname, password)
+    :param seen: usernames earlier in the import, the username is added if the record is valid
+    :return: message if the record cannot be created, else None
+    """
+    if len(record) != 4 or not all(isinstance(field, str) for field in record):
+        return 'Record must have username, forename, surname and password'
+    username, forename, surname, password = record
+    if len(username) < MIN_USERNAME_LENGTH:
+        return f'Username must be at least {MIN_USERNAME_LENGTH} characters'
+    if ' ' in username:
+        return 'Username cannot contain spaces'
+    if not forename or not surname or not password:
+        return 'Forename, surname and password are required'
+    if username in seen:
+        return 'Username appears earlier in the import'
+    seen.add(username)
+    return None
+
+
+def prepare_users(credentials):
+    """
+    Judge and hash the passwords of a chunk of users, run in the worker processes
+    :param credentials: list of (username, password)
+    :return: list in the same order, of (hashed password, expiry days), or a message where the password is too weak
+    """
+    prepared = []
+    for username, password in credentials:
+        strength = criteria_check(username, password)['strength']
+        if strength['strength_desc'] in REJECTED_STRENGTHS:
+            prepared.append(f"Password is too weak ({strength['strength_desc'] or 'too short'})")
+        else:
+            prepared.append((hash_password(password), strength['expiry_days']))
+    return prepared
+
+
+def start_worker(rounds, storage):
+    """
+    Process pool initializer, hash with the rounds and use the storage of the importing process, and load the
+    common password list
+    """
+    configure_hash_rounds(rounds)
+    configure_storage(storage)
+    get_common_password_list()
+
+
+def checked_chunks(records, chunk_size, errors):
+    """
+    Read the records a chunk at a time, dropping invalid records and usernames already in use
+    Each chunk is checked against user_accounts with a single query
+    :param records: iterable of (row number, record)
+    :param errors: list that (row number, username, message) of each dropped record is appended to
+    :return: generator of lists of (row number, record)
+    """
+    seen = set()
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            return
+        valid = []
+        for row, record in chunk:
+            message = record_error(record, seen)
+            if message is None:
+                valid.append((row, record))
+            else:
+                errors.append((row, record[0] if record else '', message))
+        existing = get_storage().existing_usernames([record[0] for _, record in valid])
+        if existing is None:
+            errors.extend((row, record[0], 'There was a problem checking the username') for row, record in valid)
+            continue
+        for row, record in valid:
+            if record[0] in existing:
+                errors.append((row, record[0], 'Username is unavailable'))
+        valid = [(row, record) for row, record in valid if record[0] not in existing]
+        if valid:
+            yield valid
+
+
+def insert_chunk(chunk, prepared, errors):
+    """
+    Create the users of a chunk whose passwords were accepted, in one transaction
+    :return: number of users created
+    """
+    users = []
+    rows = []
+    for (row, (username, forename, surname, _)), result in zip(chunk, prepared):
+        if isinstance(result, str):
+            errors.append((row, username, result))
+        else:
+            users.append((username, forename, surname) + result)
+            rows.append(row)
+    if not users:
+        return 0
+    failed = get_storage().create_new_users(users)
+    for index, message in failed:
+        errors.append((rows[index], users[index][0], message))
+    return len(users) - len(failed)
+
+
+def import_users(records, workers=None, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Create user accounts in bulk. Records are streamed a chunk at a time: checked (one query per chunk),
+    judged and hashed across a process pool, then inserted one transaction per chunk while later chunks hash.
+    A record that cannot be created is reported and the import carries on
+    The common password list must be loaded (get_common_password_list) when workers is 1
+    :param records: iterable of (username, forename, surname, password), e.g. rows of an HR export
+    :param workers: number of worker processes, defaults to all cores, 1 hashes in the current process
+    :param chunk_size: number of users per chunk
+    :return: number of users created, and a list of (row number from 1, username, message) of those not created
+    """
+    workers = workers or os.cpu_count() or 1
+    errors = []
+    created = 0
+    chunks = checked_chunks(enumerate(records, 1), chunk_size, errors)
+    if workers == 1:
+        for chunk in chunks:
+            prepared = prepare_users([(record[0], record[3]) for _, record in chunk])
+            created += insert_chunk(chunk, prepared, errors)
+        return created, sorted(errors)
+
+    # Spawned rather than forked, as the GUI process is multi-threaded
+    crypt_context()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=start_worker,
+                             initargs=(text_hashing.hash_rounds, get_storage().worker_storage())) as executor:
+        in_flight = deque()
+        exhausted = False
+        while True:
+            while not exhausted and len(in_flight) < workers * CHUNKS_PER_WORKER:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    exhausted = True
+                    break
+                in_flight.append((chunk, executor.submit(prepare_users,
+                                                         [(record[0], record[3]) for _, record in chunk])))
+            if not in_flight:
+                break
+            chunk, future = in_flight.popleft()
+            created += insert_chunk(chunk, future.result(), errors)
+    return created, sorted(errors)
@@ -0,0 +1,184 @@
+#  File: vector_scoring.py
+#  Description: Vectorised (NumPy) password strength scoring for bulk audits
+#  Author: Christopher Hindson
+#  Date: 18/10/2026
+
+# Imports
+from math import log2
+import numpy as np
+from .password_check import (ALPHA_SET, NUMBER_SET, SPECIAL_SET, WORD_CHARS, sequence_check, sequence_starts,
+                             sequence_successors)
+
+# Consts
+CHUNK_SIZE = 100000  # Passwords held in a single code point matrix
+ASCII_LIMIT = 128
+NEWLINE = ord('\n')
+# Record returned per password, mirroring the values criteria_check uses to grade strength
+SCORE_DTYPE = np.dtype([('length', np.int32),
+                        ('upper', np.bool_),
+                        ('lower', np.bool_),
+                        ('number', np.bool_),
+                        ('special', np.bool_),
+                        ('repeated_count', np.int32),
+                        ('sequence_count', np.int32),
+                        ('character_set', np.int32),
+                        ('calculated_entropy', np.float64),
+                        ('strength_id', np.int8)])
+
+# Globals
+# log2 of each possible character set size, taken from math.log2 so values match criteria_check exactly
+log2_character_set = np.array([log2(size) if size else 0.0 for size in range(2 * ALPHA_SET + NUMBER_SET +
+                                                                               SPECIAL_SET + 1)])
+ascii_word = np.array([chr(code) in WORD_CHARS for code in range(ASCII_LIMIT)])
+
+
+# Main processing
+def build_sequence_table():
+    """
+    Convert the sequence_check successor table into dense arrays over ASCII code points
+    State 0 is 'no sequence in progress', the sequence_check states are numbered from 1
+    :return: start state per code point, and next state per (state, code point), 0 where the sequence ends
+    """
+    starts = np.zeros(ASCII_LIMIT, dtype=np.int32)
+    successors = np.zeros((len(sequence_successors) + 1, ASCII_LIMIT), dtype=np.int32)
+    for char, state in sequence_starts.items():
+        starts[ord(char)] = state + 1
+    for state, next_states in enumerate(sequence_successors):
+        for char, next_state in next_states.items():
+            successors[state + 1, ord(char)] = next_state + 1
+    return starts, successors
+
+
+sequence_start_table, sequence_successor_table = build_sequence_table()
+
+
+def code_points(passwords):
+    """
+    Pack the passwords into a zero padded uint32 matrix of code points, one row per password
+    :param passwords: list of password strings
+    :return: code point matrix, and length of each password
+    """
+    lengths = np.fromiter(map(len, passwords), dtype=np.int32, count=len(passwords))
+    width = max(int(lengths.max()), 1) if len(passwords) else 1
+    matrix = np.array(passwords, dtype=f'<U{width}').view(np.uint32).reshape(len(passwords), width)
+    return matrix, lengths
+
+
+def word_characters(matrix):
+    """
+    Match the regex \\w class for each code point of the matrix
+    """
+    word = ascii_word[np.minimum(matrix, ASCII_LIMIT - 1)]
+    high = matrix >= ASCII_LIMIT
+    if high.any():
+        codes = np.unique(matrix[high])
+        alnum = codes[np.fromiter((chr(code).isalnum() for code in codes), dtype=np.bool_, count=len(codes))]
+        word[high] = np.isin(matrix[high], alnum)
+    return word
+
+
+def repeated_counts(matrix, valid, word):
+    """
+    Total length of the runs of three or more repeated word characters in each row, as character_scan
+    """
+    rows = matrix.shape[0]
+    same = np.zeros_like(valid)
+    same[:, 1:] = (matrix[:, 1:] == matrix[:, :-1]) & valid[:, 1:]
+    starts = valid & ~same
+    # Number the runs across the flattened (valid only) cells, rows never share a run as each row starts one
+    run_ids = np.cumsum(starts[valid]) - 1
+    run_lengths = np.bincount(run_ids)
+    run_rows = np.nonzero(starts)[0]
+    counted = (run_lengths > 2) & word[starts]
+    return np.bincount(run_rows[counted], weights=run_lengths[counted], minlength=rows).astype(np.int32)
+
+
+def sequence_counts(matrix):
+    """
+    Total length of sequential characters in each row of a lower case ASCII matrix, as sequence_check
+    Every row is advanced a column at a time through the dense successor table. Padding never continues a sequence,
+    so it closes the last sequence of a row and then only starts runs of length 1, leaving the total unchanged
+    """
+    rows, width = matrix.shape
+    state = np.zeros(rows, dtype=np.intp)
+    run = np.zeros(rows, dtype=np.int32)
+    total = np.zeros(rows, dtype=np.int32)
+    codes = np.minimum(matrix, ASCII_LIMIT - 1).astype(np.intp)
+    successors = sequence_successor_table.ravel()
+    for column in range(width):
+        char = codes[:, column]
+        next_state = successors.take(state * ASCII_LIMIT + char)
+        extend = next_state != 0
+        total += run * (~extend & (run > 2))
+        run = np.where(extend, run + 1, 1)
+        state = np.where(extend, next_state, sequence_start_table.take(char))
+    total += run * (run > 2)
+    return total
+
+
+def score_chunk(passwords):
+    """
+    Score a list of passwords held in memory at once, see score_batch
+    """
+    scores = np.zeros(len(passwords), dtype=SCORE_DTYPE)
+    if not passwords:
+        return scores
+    matrix, lengths = code_points(passwords)
+    columns = np.arange(matrix.shape[1])
+    valid = columns < lengths[:, None]
+    word = word_characters(matrix)
+
+    # Character classes are only gathered up to the first line break, as character_scan
+    newline = (matrix == NEWLINE) & valid
+    has_newline = newline.any(axis=1)
+    classify_to = np.where(has_newline, newline.argmax(axis=1), lengths)
+    classified = columns < classify_to[:, None]
+    scores['upper'] = ((matrix >= ord('A')) & (matrix <= ord('Z')) & classified).any(axis=1)
+    scores['lower'] = ((matrix >= ord('a')) & (matrix <= ord('z')) & classified).any(axis=1)
+    scores['number'] = ((matrix >= ord('0')) & (matrix <= ord('9')) & classified).any(axis=1)
+    scores['special'] = (~word & classified).any(axis=1) | has_newline
+    scores['repeated_count'] = repeated_counts(matrix, valid, word)
+
+    # Sequences are checked against the lower case password, lower casing is only per character for ASCII
+    ascii_rows = ~(valid & (matrix >= ASCII_LIMIT)).any(axis=1)
+    upper_case = (matrix >= ord('A')) & (matrix <= ord('Z'))
+    lowered = np.where(upper_case, matrix + (ord('a') - ord('A')), matrix)
+    sequence_count = sequence_counts(lowered)
+    for row in np.nonzero(~ascii_rows)[0]:
+        sequence_count[row] = sequence_check(passwords[row].lower())
+    scores['sequence_count'] = sequence_count
+
+    scores['length'] = lengths
+    character_set = (scores['upper'] * ALPHA_SET + scores['lower'] * ALPHA_SET + scores['number'] * NUMBER_SET +
+                     scores['special'] * SPECIAL_SET)
+    scores['character_set'] = character_set
+    entropy = (lengths - (scores['sequence_count'] + scores['repeated_count'])) * log2_character_set[character_set]
+    scores['calculated_entropy'] = entropy
+
+    # Grade as determine_strength
+    strength = np.select([lengths == 0, (lengths < 8) | (entropy < 20), entropy < 40, entropy < 60, entropy < 100],
+                         [0, 1, 2, 3, 4], default=5)
+    scores['strength_id'] = strength
+    return scores
+
+
+def score_batch(passwords, chunk_size=CHUNK_SIZE):
+    """
+    Score many passwords at once with NumPy, giving the same strength_list ids as criteria_check
+    No username is applied, and the common password list does not affect the strength grade so is not checked
+    :param passwords: list or array of password strings
+    :param chunk_size: passwords packed into a single code point matrix, bounds memory for very large batches
+    :return: structured array of SCORE_DTYPE, one record per password
+    """
+    passwords = [str(password) for password in passwords]
+    return np.concatenate([score_chunk(passwords[start:start + chunk_size])
+                           for start in range(0, len(passwords), chunk_size)] or [score_chunk([])])
+
+
+def strength_ids(passwords):
+    """
+    Vectorised equivalent of batch_scoring.score_chunk, for use by score_stream worker processes
+    :param passwords: list of password candidates
+    :return: list of strength ids, index into strength_list
+    """
+    return score_batch(passwords)['strength_id'].tolist()
@@ -5,11 +5,13 @@
 #  Date: 31/10/2020
 
 # Imports
-from PyQt5.Qt import QGridLayout, QMessageBox, Qt
+from PyQt5.QtCore import Qt, pyqtSignal
 from PyQt5.QtGui import QIcon
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QPushButton, QLabel, QLineEdit
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QPushButton, QLabel, QLineEdit, QGridLayout, QMessageBox
 from .new_user import NewUser
-from engine.password_check import criteria_check, credential_amend, credential_verify
+from .workers import start_job
+from engine.password_check import REJECTED_STRENGTHS, credential_amend, credential_verify
+from engine.strength_evaluator import PasswordEvaluator
 
 # CONSTANTS
 WIN_LEFT = 200
@@ -21,13 +23,41 @@ WIN_HEIGHT = 400
 # Globals
 
 # Main processing
+def amend_password(progress, username, current_password, new_password, expiry_days):
+    """
+    Verify the current password and amend to the new password, run off the event loop by start_job
+    :param progress: callback for progress messages
+    :param username: username of attempted password amend
+    :param current_password: current password required to authorise the change of password
+    :param new_password: potential new password
+    :param expiry_days: the days until the new password expires
+    :return: If password was updated True, else False, and message string about the result
+    """
+    progress('Verifying current password...')
+    # Validate existing credentials function
+    if not credential_verify(username=username, password=current_password):
+        # User password does not match supplier user, or user was not found
+        return False, 'No matching username or password found'
+    progress('Checking password history...')
+    if credential_amend(username=username, password=new_password, expiry_days=expiry_days):
+        return True, f'Password successfully updated. Your password will expire in {expiry_days} days'
+    return False, 'Password was previously used'
 
 
 class MainWindow(QWidget):
+    # Emitted once load_data completes, True if the data was loaded
+    ready = pyqtSignal(bool)
+
     def __init__(self):
         super().__init__()
         # set default expiry days for password, will be updated on keystroke on new password
         self._expiry_days = 30
+        # Keeps the strength state of the new password between keystrokes
+        self._evaluator = PasswordEvaluator()
+        # Background job (data load or amend), None when no job is in flight
+        self._job = None
+        # Set once the common password list and database are ready, see load_data
+        self._ready = False
         self.init_ui()
 
     def init_ui(self):
@@ -45,6 +75,7 @@ class MainWindow(QWidget):
         self.signup_label = QLabel('Create new user? ')
         self.instructions_label = QLabel(instructions)
         self.suggestions_label = QLabel()
+        self.status_label = QLabel(None)
 
         # Create Buttons
         self.amend_button = QPushButton('Amend Password')
@@ -98,6 +129,7 @@ class MainWindow(QWidget):
         # Add above layouts into the main form
         user_form.addLayout(login_area)
         user_form.addLayout(button_grid)
+        user_form.addWidget(self.status_label)
         user_form.addLayout(signup_grid)
         user_form.addStretch(0)
 
@@ -123,30 +155,61 @@ class MainWindow(QWidget):
         # return username input
         return self.user_box.text()
 
+    def load_data(self, function):
+        """
+        Load the data the engine needs in the background, the window stays responsive while it loads but
+        amend and create are unavailable until data_loaded
+        :param function: function to run, called as function(progress)
+        :return: the started job
+        """
+        self._job = start_job(function, on_progress=self.status_label.setText, on_finished=self.data_loaded,
+                              on_failed=self.data_failed)
+        self.set_amend_button_state()
+        self.signup_button.setEnabled(False)
+        return self._job
+
+    def data_loaded(self, result):
+        self._ready = True
+        self.end_job()
+        # The common password list has been loaded, judge the password typed so far against it
+        self.criteria_list()
+        self.ready.emit(True)
+
+    def data_failed(self, error):
+        self.end_job()
+        self.signup_button.setEnabled(False)
+        self.ready.emit(False)
+        QMessageBox.warning(self, "Password Change Unavailable", error, QMessageBox.Ok, QMessageBox.Ok)
+
     def amend_attempt(self):
         """
         Validate the existing password, if correct, then update the user_credentials table with new
         password, after encryption, supplied by user.
         A database trigger will append the current password to the user_cred_audit table
+        Hashing and database work run in the background, with the buttons disabled until amend_finished
         :return:
         """
-        pass_update = False
+        if self._job is not None or not self._ready:
+            return
         current_password = self.get_current_password_value()
         new_password = self.get_new_password_value()
         username = self.get_username_value()
         expiry_days = self._expiry_days
-        # Validate existing credentials function
-        user_correct = credential_verify(username=username, password=current_password)
 
-        if not user_correct:  # User password does not match supplier user, or user was not found
-            response_str = 'No matching username or password found'
-        else:
-            pass_update = credential_amend(username=username, password=new_password, expiry_days=expiry_days)
-            if pass_update:
-                response_str = f'Password successfully updated. Your password will expire in {expiry_days} days'
-            else:
-                response_str = 'Password was previously used'
+        self._job = start_job(amend_password, username, current_password, new_password, expiry_days,
+                              on_progress=self.status_label.setText, on_finished=self.amend_finished,
+                              on_failed=self.amend_failed)
+        self.set_amend_button_state()
+        self.signup_button.setEnabled(False)
 
+    def amend_finished(self, result):
+        """
+        Report the result of the background amend to the user
+        :param result: pass_update, response string as returned by amend_password
+        :return: None
+        """
+        pass_update, response_str = result
+        self.end_job()
         if pass_update:
             QMessageBox.information(self, "Password Successfully Changed", response_str, QMessageBox.Ok, QMessageBox.Ok)
         else:
@@ -155,6 +218,18 @@ class MainWindow(QWidget):
         # reset the MainDisplay form and clear as appropriate
         self.clear_down(pass_update)
 
+    def amend_failed(self, error):
+        self.end_job()
+        QMessageBox.warning(self, "Password Not Updated", error, QMessageBox.Ok, QMessageBox.Ok)
+        self.clear_down(False)
+
+    def end_job(self):
+        # Background job complete, allow another attempt
+        self._job = None
+        self.status_label.setText(None)
+        self.signup_button.setEnabled(self._ready)
+        self.set_amend_button_state()
+
     def user_released(self, key_pressed):
         """
         Function to judge password input length, prior to passing to password strength calculation function
@@ -182,7 +257,7 @@ class MainWindow(QWidget):
         """
         username = self.get_username_value()
         password_input = self.get_new_password_value()
-        criteria_match = criteria_check(username, password_input)
+        criteria_match = self._evaluator.evaluate(username, password_input)
 
         self.suggestions_label.setText(criteria_match['suggested_improvements'])
         self.strength_feedback_label.setText(criteria_match['strength']['strength_desc'])
@@ -208,11 +283,13 @@ class MainWindow(QWidget):
         Set the amend password button to enabled/disabled dependant on if both inputs are greater in length than 0
         :return: None
         """
-        if len(self.get_new_password_value()) == 0 or len(self.get_username_value()) == 0 or \
+        if self._job is not None or not self._ready:
+            self.amend_button.setEnabled(False)
+        elif len(self.get_new_password_value()) == 0 or len(self.get_username_value()) == 0 or \
                 len(self.get_current_password_value()) == 0:
             self.amend_button.setEnabled(False)
-        # If password is WEAK or VERY WEAK do not allow update attempt
-        elif self.strength_feedback_label.text() == 'VERY WEAK' or self.strength_feedback_label.text() == 'WEAK':
+        # If password strength is rejected (e.g. WEAK or VERY WEAK) do not allow update attempt
+        elif self.strength_feedback_label.text() in REJECTED_STRENGTHS:
             self.amend_button.setEnabled(False)
         else:
             self.amend_button.setEnabled(True)
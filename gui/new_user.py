@@ -6,11 +6,13 @@
 
 # Imports
 from PyQt5 import QtCore
-from PyQt5.Qt import QGridLayout, Qt
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QPushButton, QLabel, QLineEdit, QMessageBox
-from engine.db_access import create_new_user, check_username
-from engine.password_check import criteria_check, get_user_list
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QPushButton, QLabel, QLineEdit, QMessageBox, QGridLayout
+from engine.password_check import REJECTED_STRENGTHS, refresh_user_details
+from engine.storage import get_storage
+from engine.strength_evaluator import PasswordEvaluator
 from engine.text_hashing import hash_password
+from .workers import start_job
 
 # CONSTANTS
 WIN_LEFT = 200
@@ -23,12 +25,28 @@ USERNAME_AVAILABLE = False
 
 
 # Main processing
+def create_user(progress, username, forename, surname, password, expiry_days):
+    """
+    Hash the password and create the user, run off the event loop by start_job
+    :param progress: callback for progress messages
+    :return: If creation successful, True, else False, and message string about the result
+    """
+    progress('Securing password...')
+    hashed_password = hash_password(password)
+    progress('Creating user account...')
+    return get_storage().create_new_user(username=username, forename=forename, surname=surname,
+                                         password=hashed_password, expiry_days=expiry_days)
+
 
 class NewUser(QWidget):
     def __init__(self):
         super().__init__()
         self.raise_()
         self._expiry_days = 90
+        # Keeps the strength state of the password between keystrokes
+        self._evaluator = PasswordEvaluator()
+        # Background creation job, None when no creation is in flight
+        self._job = None
         self.setWindowModality(QtCore.Qt.ApplicationModal)
         self.setFocusPolicy(QtCore.Qt.StrongFocus)
 
@@ -45,6 +63,7 @@ class NewUser(QWidget):
         self.strength_feedback_label = QLabel(None)
         self.strength_feedback_label.setAutoFillBackground(True)
         self.strength_feedback_label.setAlignment(Qt.AlignCenter)
+        self.status_label = QLabel(None)
 
         # Buttons
         self.create_button = QPushButton('Create User')
@@ -97,6 +116,7 @@ class NewUser(QWidget):
 
         user_form.addLayout(creation_area)
         user_form.addLayout(button_grid)
+        user_form.addWidget(self.status_label)
         user_form.addStretch(0)
 
         self.clear_down(True)
@@ -121,7 +141,7 @@ class NewUser(QWidget):
             USERNAME_AVAILABLE = False
             feedback = 'Username cannot contain spaces'
         elif len(username) >= 5:
-            USERNAME_AVAILABLE, feedback = check_username(username)
+            USERNAME_AVAILABLE, feedback = get_storage().check_username(username)
         self.user_feedback_label.setText(feedback)
         # USERNAME_AVAILABLE = username_avail
         self.criteria_list()
@@ -160,7 +180,7 @@ class NewUser(QWidget):
         """
         username = self.get_username()
         password_input = self.get_password()
-        criteria_match = criteria_check(username, password_input)
+        criteria_match = self._evaluator.evaluate(username, password_input)
 
         self.feedback_label.setText(criteria_match['suggested_improvements'])
         self.strength_feedback_label.setText(criteria_match['strength']['strength_desc'])
@@ -206,10 +226,12 @@ class NewUser(QWidget):
 
     def create_attempt(self):
         """
-        Create user within the database
+        Create user within the database, hashing and database work run in the background
         :return: None, display message box if success, then close the form
         if false, clear password fields
         """
+        if self._job is not None:
+            return
         forename = self.get_forename()
         surname = self.get_surname()
         username = self.get_username()
@@ -218,14 +240,30 @@ class NewUser(QWidget):
         expiry_days = self._expiry_days
 
         if password != verify_password:
-            create_success = False
-            response_str = "Passwords do not match"
-        else:
-            create_success, response_str = create_new_user(username=username, forename=forename, surname=surname,
-                                                           password=hash_password(password), expiry_days=expiry_days)
+            self.create_finished((False, "Passwords do not match"), username)
+            return
+        self._job = start_job(create_user, username, forename, surname, password, expiry_days,
+                              on_progress=self.status_label.setText,
+                              on_finished=lambda result: self.create_finished(result, username),
+                              on_failed=lambda error: self.create_finished((False, error), username))
+        self.set_create_enabled()
+        self.cancel_button.setEnabled(False)
+
+    def create_finished(self, result, username):
+        """
+        Report the result of the user creation
+        :param result: create_success, response string as returned by create_new_user
+        :param username: username of the account created
+        :return: None, display message box if success, then close the form
+        """
+        create_success, response_str = result
+        self._job = None
+        self.status_label.setText(None)
+        self.cancel_button.setEnabled(True)
+        self.set_create_enabled()
         if create_success:
             QMessageBox.information(self, "User created", response_str, QMessageBox.Ok, QMessageBox.Ok)
-            get_user_list()
+            refresh_user_details(username)
             self.close()
         else:
             QMessageBox.warning(self, "Trouble creating user", response_str, QMessageBox.Ok, QMessageBox.Ok)
@@ -236,7 +274,9 @@ class NewUser(QWidget):
         :return: None, Update Create button enabled state
         """
         self.password_match_label.setText(None)
-        if len(self.get_username()) == 0 or len(self.get_forename()) == 0 or len(self.get_surname()) == 0 or len(
+        if self._job is not None:
+            self.create_button.setEnabled(False)
+        elif len(self.get_username()) == 0 or len(self.get_forename()) == 0 or len(self.get_surname()) == 0 or len(
                 self.get_password()) == 0 or len(self.get_verify_password()) == 0:
             self.create_button.setEnabled(False)
         # Set enabled to False if passwords do not match
@@ -246,8 +286,8 @@ class NewUser(QWidget):
         # Set enabled to False is username already exists
         elif not USERNAME_AVAILABLE:
             self.create_button.setEnabled(False)
-        # If password is WEAK or VERY WEAK do not allow update attempt
-        elif self.strength_feedback_label.text() == 'VERY WEAK' or self.strength_feedback_label.text() == 'WEAK':
+        # If password strength is rejected (e.g. WEAK or VERY WEAK) do not allow update attempt
+        elif self.strength_feedback_label.text() in REJECTED_STRENGTHS:
             self.create_button.setEnabled(False)
         else:
             self.create_button.setEnabled(True)
@@ -0,0 +1,68 @@
+#!/usr/bin/python3
+#  File: workers.py
+#  Description: Run engine calls (hashing and database work) off the Qt event loop
+#  Author: Christopher Hindson
+#  Date: 18/10/2026
+
+# Imports
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
+from engine.instrumentation import profile_thread
+
+# CONSTANTS
+
+# Globals
+
+
+# Main processing
+
+class JobSignals(QObject):
+    """
+    Signals emitted from an EngineJob, delivered on the thread of the connected window
+    """
+    progress = pyqtSignal(str)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+
+class EngineJob(QRunnable):
+    """
+    Run a function on the Qt thread pool, the function is passed a progress callback as its first argument
+    """
+
+    def __init__(self, function, *args, **kwargs):
+        super().__init__()
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = JobSignals()
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            # Qt pool threads are not started through threading, so are only profiled when asked
+            with profile_thread():
+                result = self.function(self.signals.progress.emit, *self.args, **self.kwargs)
+        except Exception as error:
+            self.signals.failed.emit(str(error))
+        else:
+            self.signals.finished.emit(result)
+
+
+def start_job(function, *args, on_progress=None, on_finished=None, on_failed=None, **kwargs):
+    """
+    Start function in the background, connecting the supplied callbacks to the job signals
+    :param function: function to run, called as function(progress, *args, **kwargs)
+    :param on_progress: called with progress message strings
+    :param on_finished: called with the return value of function
+    :param on_failed: called with the error message if function raises
+    :return: the started job, keep a reference while it is in flight
+    """
+    job = EngineJob(function, *args, **kwargs)
+    if on_progress is not None:
+        job.signals.progress.connect(on_progress)
+    if on_finished is not None:
+        job.signals.finished.connect(on_finished)
+    if on_failed is not None:
+        job.signals.failed.connect(on_failed)
+    QThreadPool.globalInstance().start(job)
+    return job
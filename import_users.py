@@ -0,0 +1,76 @@
+#!/usr/bin/python3
+#  File: import_users.py
+#  Description: Bulk creation of user accounts from a CSV export, without the GUI
+#  Author: Christopher Hindson
+#  Date: 18/10/2026
+
+# Imports
+import argparse
+import csv
+import sys
+import time
+from engine.password_check import get_common_password_list
+from engine.storage import get_storage
+from engine.user_import import IMPORT_CHUNK_SIZE, import_users
+
+# CONSTANTS
+FIELDS = ('username', 'forename', 'surname', 'password')
+
+
+# Globals
+
+# Main processing
+def read_users(stream):
+    """
+    Read user records from CSV, the header row must name the username, forename, surname and password columns
+    :param stream: text file or stdin
+    :return: generator of (username, forename, surname, password)
+    """
+    reader = csv.DictReader(stream)
+    missing = [field for field in FIELDS if field not in (reader.fieldnames or ())]
+    if missing:
+        raise ValueError(f'CSV header is missing {", ".join(missing)}')
+    for row in reader:
+        yield tuple(row[field] or '' for field in FIELDS)
+
+
+def main():
+    """
+    Create the users of a CSV export, reporting those that could not be created
+    :return:
+    """
+    parser = argparse.ArgumentParser(description='Create user accounts in bulk from CSV')
+    parser.add_argument('input', nargs='?', default='-', help='CSV file of users, - for stdin')
+    parser.add_argument('-e', '--errors', default='-', help='CSV of users not created, - for stderr')
+    parser.add_argument('-w', '--workers', type=int, default=None, help='worker processes, defaults to all cores')
+    parser.add_argument('-c', '--chunk-size', type=int, default=IMPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    if get_storage().apply_migrations() is None:
+        sys.exit('Database could not be updated')
+    get_common_password_list()
+    source = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8', newline='')
+    start = time.perf_counter()
+    try:
+        created, errors = import_users(read_users(source), workers=args.workers, chunk_size=args.chunk_size)
+    except ValueError as error:
+        sys.exit(str(error))
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    elapsed = time.perf_counter() - start
+
+    output = sys.stderr if args.errors == '-' else open(args.errors, 'w', encoding='utf-8', newline='')
+    try:
+        writer = csv.writer(output)
+        writer.writerow(('row', 'username', 'error'))
+        writer.writerows(errors)
+    finally:
+        if output is not sys.stderr:
+            output.close()
+    print(f'{created} users created, {len(errors)} not created, in {elapsed:.1f}s '
+          f'({created / elapsed if elapsed else 0:.0f} users/s)', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
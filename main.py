@@ -5,29 +5,61 @@
 #  Date: 31/10/2020
 
 # Imports
+import os
 import sys
-from PyQt5.QtWidgets import QApplication
-from gui.main_window import MainWindow
+import time
+from engine.storage import get_storage
 from engine.password_check import get_common_password_list, get_user_list
 
 
 # CONSTANTS
+STARTUP_PROBE_ENV = 'PWD_STARTUP_PROBE'  # If set, print first paint and data loaded times then exit
 
 
 # Globals
 
 # Main processing
+def load_engine_data(progress):
+    """
+    Prepare the database and the data used to judge password candidates, run off the event loop by start_job
+    :param progress: callback for progress messages
+    :return: None
+    """
+    # Bring the database schema up to date before it is used
+    progress('Updating database...')
+    if get_storage().apply_migrations() is None:
+        raise RuntimeError('Database could not be updated')
+    # Get common passwords, used to judge password candidate
+    progress('Loading common passwords...')
+    get_common_password_list()
+    # User details are used to judge password against the user details of the supplied username only,
+    # read on demand per username rather than loading the whole user table
+    get_user_list(lazy=True)
+
+
+def probe(event):
+    # Startup probe output, read by benchmarks/bench_startup.py
+    print(f'{event} {time.time():.6f}', flush=True)
+
+
 def main():
     """
     Create the GUI for the Main Password change program
+    The window is shown straight away, with the data it needs loaded in the background
     :return:
     """
-    # Get common passwords, used to judge password candidate
-    get_common_password_list()
-    # Get user list details, used to judge password against the user details of the supplied username only
-    get_user_list()
+    # Imported here, so importing main (e.g. spawned worker processes re-running it) does not load Qt
+    from PyQt5.QtCore import QTimer
+    from PyQt5.QtWidgets import QApplication
+    from gui.main_window import MainWindow
+
     app = QApplication([])
     window = MainWindow()
+    if os.environ.get(STARTUP_PROBE_ENV):
+        # Runs on the first pass of the event loop, once the window has been painted
+        QTimer.singleShot(0, lambda: probe('first_paint'))
+        window.ready.connect(lambda loaded: (probe('data_loaded' if loaded else 'data_failed'), app.quit()))
+    window.load_data(load_engine_data)
     sys.exit(app.exec_())
 
 
@@ -0,0 +1,261 @@
+#!/usr/bin/python3
+#  File: service.py
+#  Description: Local HTTP/JSON service for strength scoring, username availability and password change
+#  Author: Christopher Hindson
+#  Date: 18/10/2026
+
+# Imports
+import argparse
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import parse_qs, urlsplit
+from engine import async_db, instrumentation
+from engine.db_access import DB_PATH
+from engine.expiry_scheduler import (SWEEP_INTERVAL, outbox_notifier, print_notifications, start_expiry_scheduler,
+                                     stop_expiry_scheduler)
+from engine.memory_storage import MemoryStorage
+from engine.password_check import REJECTED_STRENGTHS, criteria_check, get_common_password_list, get_user_list
+from engine.storage import configure_storage, get_storage
+
+# CONSTANTS
+HOST = '127.0.0.1'
+PORT = 8080
+EXECUTOR_WORKERS = 16  # Threads for scoring and hashing work, pbkdf2 releases the GIL while hashing
+MAX_BODY = 65536
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large',
+           500: 'Internal Server Error'}
+
+# Globals
+executor = None
+parallel_history = False  # Set by --parallel-history, see password_check.PARALLEL_HISTORY_CHECK
+
+
+# Main processing
+class RequestError(Exception):
+    """
+    Error returned to the client as a JSON response with the given HTTP status
+    """
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+async def run_blocking(function, *args, **kwargs):
+    """
+    Run an engine call on the executor, so scoring and hashing work never block the event loop
+    Database calls are made through async_db instead
+    """
+    return await asyncio.get_running_loop().run_in_executor(executor, partial(function, *args, **kwargs))
+
+
+def strength_response(criteria_match):
+    strength = criteria_match['strength']
+    return {'strength_id': strength['id'],
+            'strength_desc': strength['strength_desc'],
+            'expiry_days': strength['expiry_days'],
+            'suggested_improvements': criteria_match['suggested_improvements']}
+
+
+async def strength_route(query, body):
+    """
+    POST /strength {"username": ..., "password": ...}
+    """
+    criteria_match = await run_blocking(criteria_check, body.get('username', ''), required(body, 'password'))
+    return strength_response(criteria_match)
+
+
+async def username_route(query, body):
+    """
+    GET /username?name=...
+    """
+    name = query.get('name', [''])[0]
+    if len(name) < 5 or ' ' in name:
+        return {'available': False, 'message': 'Username must be at least 5 characters, without spaces'}
+    available, message = await async_db.check_username(name)
+    return {'available': available, 'message': message}
+
+
+async def password_route(query, body):
+    """
+    POST /password {"username": ..., "current_password": ..., "new_password": ...}
+    """
+    username = required(body, 'username')
+    new_password = required(body, 'new_password')
+    criteria_match = await run_blocking(criteria_check, username, new_password)
+    expiry_days = criteria_match['strength']['expiry_days']
+    if criteria_match['strength']['strength_desc'] in REJECTED_STRENGTHS:
+        return {'updated': False, 'message': 'Password is too weak', **strength_response(criteria_match)}
+    if not await async_db.credential_verify(username, required(body, 'current_password'), executor=executor):
+        return {'updated': False, 'message': 'No matching username or password found'}
+    if not await async_db.credential_amend(username, new_password, expiry_days, parallel=parallel_history,
+                                          executor=executor):
+        return {'updated': False, 'message': 'Password was previously used'}
+    return {'updated': True, 'expiry_days': expiry_days,
+            'message': f'Password successfully updated. Your password will expire in {expiry_days} days'}
+
+
+async def metrics_route(query, body):
+    """
+    GET /metrics, timings in the Prometheus text format, or JSON with ?format=json. Requires PWD_METRICS
+    """
+    if not instrumentation.metrics_enabled:
+        raise RequestError(404, f'Metrics are disabled, set {instrumentation.METRICS_ENV}=1')
+    if query.get('format', [''])[0] == 'json':
+        return instrumentation.metrics_json()
+    return instrumentation.prometheus_text()
+
+
+ROUTES = {('POST', '/strength'): strength_route,
+          ('GET', '/username'): username_route,
+          ('POST', '/password'): password_route,
+          ('GET', '/metrics'): metrics_route}
+
+
+def required(body, field):
+    value = body.get(field)
+    if not isinstance(value, str):
+        raise RequestError(400, f'{field} is required')
+    return value
+
+
+async def read_request(reader):
+    """
+    Read a single HTTP/1.1 request
+    :return: method, target, HTTP version, headers dict (lower case names) and body bytes, None if the client closed
+    """
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    try:
+        method, target, version = request_line.decode('latin-1').split()
+    except ValueError:
+        raise RequestError(400, 'Malformed request line')
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get('content-length', 0) or 0)
+    except ValueError:
+        raise RequestError(400, 'Malformed Content-Length')
+    if length < 0:
+        raise RequestError(400, 'Malformed Content-Length')
+    if length > MAX_BODY:
+        raise RequestError(413, 'Request body too large')
+    body = await reader.readexactly(length) if length else b''
+    return method, target, version, headers, body
+
+
+async def dispatch(method, target, body):
+    url = urlsplit(target)
+    if not any(path == url.path for _, path in ROUTES):
+        raise RequestError(404, 'Not found')
+    handler = ROUTES.get((method, url.path))
+    if handler is None:
+        raise RequestError(405, 'Method not allowed')
+    try:
+        payload = json.loads(body) if body else {}
+    except ValueError:
+        raise RequestError(400, 'Body must be JSON')
+    if not isinstance(payload, dict):
+        raise RequestError(400, 'Body must be a JSON object')
+    return await handler(parse_qs(url.query), payload)
+
+
+def write_response(writer, status, payload, keep_alive):
+    # Text payloads (the Prometheus metrics) are sent as they are, anything else as JSON
+    if isinstance(payload, str):
+        body, content_type = payload.encode('utf-8'), 'text/plain; version=0.0.4'
+    else:
+        body, content_type = json.dumps(payload).encode('utf-8'), 'application/json'
+    writer.write(f'HTTP/1.1 {status} {REASONS[status]}\r\n'
+                 f'Content-Type: {content_type}\r\n'
+                 f'Content-Length: {len(body)}\r\n'
+                 f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'.encode('latin-1') + body)
+
+
+async def handle_client(reader, writer):
+    """
+    Serve requests on a connection until the client closes it, keep-alive is supported
+    """
+    try:
+        while True:
+            keep_alive = False
+            try:
+                request = await read_request(reader)
+                if request is None:
+                    break
+                method, target, version, headers, body = request
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection == 'keep-alive' or (version == 'HTTP/1.1' and connection != 'close')
+                status, payload = 200, await dispatch(method, target, body)
+            except RequestError as error:
+                status, payload = error.status, {'error': str(error)}
+            except (asyncio.IncompleteReadError, ConnectionError):
+                break
+            except Exception as error:
+                status, payload = 500, {'error': str(error)}
+            write_response(writer, status, payload, keep_alive)
+            await writer.drain()
+            if not keep_alive:
+                break
+    finally:
+        writer.close()
+
+
+async def serve(host, port):
+    server = await asyncio.start_server(handle_client, host, port)
+    print(f'Serving on http://{host}:{port}', flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    """
+    Run the service on localhost
+    :return:
+    """
+    global executor, parallel_history
+
+    parser = argparse.ArgumentParser(description='Password strength and change service')
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--workers', type=int, default=EXECUTOR_WORKERS, help='threads for scoring and hashing')
+    parser.add_argument('--expiry-interval', type=float, default=SWEEP_INTERVAL,
+                        help='seconds between password expiry sweeps, 0 to not sweep')
+    parser.add_argument('--expiry-outbox', help='append expiry notices to this file as JSON lines')
+    parser.add_argument('--memory', action='store_true',
+                        help='serve from an in-memory copy of the database, e.g. for load tests, changes are not saved')
+    parser.add_argument('--parallel-history', action='store_true',
+                        help='verify the password history across worker processes, one per CPU')
+    args = parser.parse_args()
+
+    parallel_history = args.parallel_history
+    get_storage().apply_migrations()
+    if args.memory:
+        configure_storage(MemoryStorage().load_database(DB_PATH))
+    get_common_password_list()
+    get_user_list(lazy=True)
+    executor = ThreadPoolExecutor(max_workers=args.workers)
+    async_db.start_database_thread()
+    if args.expiry_interval > 0:
+        start_expiry_scheduler(args.expiry_interval,
+                               outbox_notifier(args.expiry_outbox) if args.expiry_outbox else print_notifications)
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_expiry_scheduler()
+        async_db.stop_database_thread()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+#  File: test_query_plan.py
+#  Description: Query plan checks of the password history query against a migrated temporary database
+#  Author: Christopher Hindson
+#  Date: 18/10/2026
+
+# Imports
+from datetime import datetime, timedelta
+import pytest
+from engine import db_access
+from benchmarks.bench_credential_history import build_database
+
+# Consts
+USER_COUNT = 200
+HISTORY_PER_USER = 20
+USERNAME = 'user_7'
+
+
+# Main processing
+@pytest.fixture
+def history_database(tmp_path, monkeypatch):
+    """
+    Generated database migrated to the latest schema, served by its own connection pool
+    """
+    path = str(tmp_path / 'history.sqlite')
+    build_database(path, USER_COUNT, HISTORY_PER_USER, seed=1)
+    pool = db_access.ConnectionPool(path)
+    monkeypatch.setattr(db_access, 'connection_pool', pool)
+    assert db_access.apply_migrations() is not None
+    yield pool
+    pool.close()
+
+
+def query_plan(sql_string, parameters):
+    # Flatten EXPLAIN QUERY PLAN output to its detail column
+    with db_access.pooled_connection() as conn:
+        return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql_string}", parameters)]
+
+
+def test_history_index_is_user_then_newest_first(history_database):
+    with db_access.pooled_connection() as conn:
+        columns = [(row[2], row[3]) for row in conn.execute("PRAGMA index_xinfo('user_cred_audit_history');")
+                   if row[5]]
+    assert columns[:2] == [('user_id', 0), ('date_of_change', 1)]
+
+
+def test_history_query_uses_history_index(history_database):
+    since = datetime.now() - timedelta(days=db_access.HISTORY_DAYS)
+    plan = query_plan(db_access.credential_retrieval(), (USERNAME, since, db_access.HISTORY_DEPTH, USERNAME))
+    assert any('user_cred_audit_history' in step for step in plan), plan
+    # Scanning the (at most HISTORY_DEPTH row) subquery result is expected, scanning a table is not
+    assert not any(step.startswith('SCAN') and not step.startswith('SCAN (') for step in plan), plan
+    assert not any('TEMP B-TREE' in step for step in plan), plan
+
+
+def test_history_is_newest_of_user_only(history_database):
+    since = datetime.now() - timedelta(days=db_access.HISTORY_DAYS)
+    history = db_access.credential_history(USERNAME, since, db_access.HISTORY_DEPTH)
+    with db_access.pooled_connection() as conn:
+        expected = [row[0] for row in conn.execute(
+            "SELECT user_cred FROM user_cred_audit WHERE user_id = 7 AND date_of_change > ? "
+            "ORDER BY date_of_change DESC LIMIT ?;", (since, db_access.HISTORY_DEPTH))]
+        current = conn.execute("SELECT user_cred FROM user_credentials WHERE user_id = 7;").fetchone()[0]
+    assert history == expected + [current]
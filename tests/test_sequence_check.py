@@ -0,0 +1,37 @@
+#  File: test_sequence_check.py
+#  Description: Property test of the successor table sequence_check against the original implementation
+#  Author: Christopher Hindson
+#  Date: 18/10/2026
+
+# Imports
+import random
+from itertools import product
+import pytest
+from engine.password_check import sequence_check, sequences
+from benchmarks.bench_sequence_check import original_sequence_check, random_input
+
+# Consts
+RANDOM_CASES = 20000
+SEEDS = (1, 2, 3)
+SHORT_ALPHABET = 'abcdzyx1 '  # Forward and backward runs, a break in the alphabet and a non sequence character
+
+
+# Main processing
+@pytest.mark.parametrize('seed', SEEDS)
+def test_matches_original_on_random_inputs(seed):
+    rng = random.Random(seed)
+    for _ in range(RANDOM_CASES // len(SEEDS)):
+        candidate = random_input(rng, rng.randint(0, 60))
+        assert sequence_check(candidate) == original_sequence_check(candidate), candidate
+
+
+def test_matches_original_on_all_short_inputs():
+    for length in range(6):
+        for characters in product(SHORT_ALPHABET, repeat=length):
+            candidate = ''.join(characters)
+            assert sequence_check(candidate) == original_sequence_check(candidate), candidate
+
+
+@pytest.mark.parametrize('candidate', ['', sequences, sequences[::-1], sequences * 2, 'aaaa', 'abcabc'])
+def test_matches_original_on_edge_cases(candidate):
+    assert sequence_check(candidate) == original_sequence_check(candidate)